@@ -0,0 +1,572 @@
+"""
+Receiver-quality reports from recorded logs.
+
+    python -m GNSserver.analytics logs/ --reference 52.0116,4.3571 --format csv
+
+Inputs are log files or directories (searched recursively for .nmea, .log and
+.txt files, optionally gzipped). Logs are decoded with
+columnar.iter_log_columns in chunks, so memory per worker is bounded by the
+chunk size, not the log size. Uncompressed logs larger than --split-mb are
+cut into byte ranges; files and ranges are spread over a process pool.
+
+Every statistic is kept in a form whose merge is exact, so the per-log and
+total figures do not depend on how the work was split:
+
+    ttff_s        first epoch of the log to the first epoch with a fix
+    availability  share of epochs with a fix: GGA quality 1-5, or GSA mode
+                  2D/3D where GGA is missing
+    cep50/cep95   radius around the reference holding 50%/95% of the fixes
+    2drms         twice the RMS horizontal distance from the reference
+    dop           PDOP/HDOP/VDOP histograms of the fixed epochs
+    cn0           C/N0 histograms per constellation, all tracked and used
+
+The reference is the mean fix unless a surveyed point is given. Fix
+positions are counted on a latitude/longitude grid (1e-7 degrees, about
+1 cm, made coarser only when a log covers more than MAX_CELLS cells, i.e. a
+moving receiver), so CEP is exact to the grid resolution reported with it;
+the mean and 2DRMS come from running moments. DOPs are binned at 0.01 and
+C/N0 at 1 dB-Hz, the resolution NMEA reports them in.
+
+Needs numpy, like the columnar decoder.
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional; checked in main()
+    np = None
+
+from .columnar import LogColumns, iter_log_columns
+from .simplify import metres_per_degree
+from .wire import GNSS_CODES
+
+LOG_SUFFIXES = (".nmea", ".log", ".txt")
+DEFAULT_CHUNK_MB = 16.0
+DEFAULT_SPLIT_MB = 256.0
+
+GRID_DEG = 1e-7
+MAX_CELLS = 1 << 18
+DOP_NAMES = ("pdop", "hdop", "vdop")
+DOP_STEP = 0.01
+# 0.00-99.99; larger values land in the last bin.
+DOP_BINS = 10000
+CN0_BINS = 100
+# GGA quality 0-8 as the web UI names them.
+QUALITY_NAMES = ("invalid", "gps", "dgps", "pps", "rtk", "float_rtk", "estimated", "manual", "simulation")
+
+# Grid keys pack the offset latitude and longitude cell indices into an int64
+# (|lat| / GRID_DEG < 2**30, |lon| / GRID_DEG < 2**31).
+_LAT_OFFSET = 1 << 30
+_LON_OFFSET = 1 << 31
+_LON_MASK = (1 << 32) - 1
+
+Task = Tuple[str, int, Optional[int]]
+
+
+class PositionGrid:
+    # Fix counts per grid cell as sorted key/count arrays. The grid starts at
+    # GRID_DEG and doubles its cell size while more than max_cells are used,
+    # so the final level is the smallest one holding all the data in
+    # max_cells, whichever way the data was split.
+
+    __slots__ = ("level", "keys", "counts", "max_cells")
+
+    def __init__(self, max_cells: int = MAX_CELLS) -> None:
+        self.level = 0
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.max_cells = max_cells
+
+    @property
+    def cell_deg(self) -> float:
+        return GRID_DEG * (1 << self.level)
+
+    def add(self, lat: "np.ndarray", lon: "np.ndarray") -> None:
+        cell = self.cell_deg
+        lat_i = np.floor(lat / cell).astype(np.int64)
+        lon_i = np.floor(lon / cell).astype(np.int64)
+        keys = (lat_i + _LAT_OFFSET) << 32 | (lon_i + _LON_OFFSET)
+        self._combine(keys, np.ones(len(keys), dtype=np.int64))
+
+    def merge(self, other: "PositionGrid") -> None:
+        keys, counts = other.keys, other.counts
+        if other.level < self.level:
+            keys, counts = _coarsen(keys, counts, self.level - other.level)
+        elif other.level > self.level:
+            self.keys, self.counts = _coarsen(self.keys, self.counts, other.level - self.level)
+            self.level = other.level
+        self._combine(keys, counts)
+
+    def _combine(self, keys: "np.ndarray", counts: "np.ndarray") -> None:
+        keys = np.concatenate((self.keys, keys))
+        counts = np.concatenate((self.counts, counts))
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse.ravel(), weights=counts, minlength=len(self.keys)).astype(np.int64)
+        while len(self.keys) > self.max_cells:
+            self.keys, self.counts = _coarsen(self.keys, self.counts, 1)
+            self.level += 1
+
+    def radii(self, ref_lat: float, ref_lon: float, fractions: Sequence[float]) -> List[Optional[float]]:
+        # Smallest radius (m) around the reference holding each fraction of
+        # the fixes, measured to the cell centres.
+        total = int(self.counts.sum())
+        if not total:
+            return [None for _ in fractions]
+        cell = self.cell_deg
+        lat = ((self.keys >> 32) - _LAT_OFFSET + 0.5) * cell
+        lon = ((self.keys & _LON_MASK) - _LON_OFFSET + 0.5) * cell
+        north_m, east_m = metres_per_degree(ref_lat)
+        distance = np.hypot((lat - ref_lat) * north_m, (lon - ref_lon) * east_m)
+        order = np.argsort(distance)
+        cumulative = np.cumsum(self.counts[order])
+        return [float(distance[order[np.searchsorted(cumulative, f * total)]]) for f in fractions]
+
+
+def _coarsen(keys: "np.ndarray", counts: "np.ndarray", levels: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    # Floor-halve the cell indices; equal to gridding at the coarser level.
+    lat_i = ((keys >> 32) - _LAT_OFFSET) >> levels
+    lon_i = ((keys & _LON_MASK) - _LON_OFFSET) >> levels
+    merged, inverse = np.unique((lat_i + _LAT_OFFSET) << 32 | (lon_i + _LON_OFFSET), return_inverse=True)
+    return merged, np.bincount(inverse.ravel(), weights=counts, minlength=len(merged)).astype(np.int64)
+
+
+class LogStats:
+    # Partial statistics of one log or a run of its epochs. update() takes
+    # the decoded parts in log order; merge() appends the statistics of the
+    # epochs that follow.
+
+    __slots__ = (
+        "lines",
+        "bad_checksum",
+        "epochs",
+        "fixed",
+        "quality",
+        "first_utc",
+        "first_time",
+        "fix_utc",
+        "fix_time",
+        "last_utc",
+        "last_time",
+        "positions",
+        "mean",
+        "m2",
+        "grid",
+        "dop",
+        "dop_sum",
+        "cn0",
+    )
+
+    def __init__(self) -> None:
+        self.lines = 0
+        self.bad_checksum = 0
+        self.epochs = 0
+        self.fixed = 0
+        # Counts for GGA quality -1 (missing) to 9 (anything above 8).
+        self.quality = np.zeros(11, dtype=np.int64)
+        self.first_utc: Optional[float] = None
+        self.first_time: Optional[float] = None
+        self.fix_utc: Optional[float] = None
+        self.fix_time: Optional[float] = None
+        self.last_utc: Optional[float] = None
+        self.last_time: Optional[float] = None
+        # Fix position moments: count, mean and summed squared deviation
+        # of (lat, lon) in degrees.
+        self.positions = 0
+        self.mean = np.zeros(2)
+        self.m2 = np.zeros(2)
+        self.grid = PositionGrid()
+        self.dop = np.zeros((len(DOP_NAMES), DOP_BINS), dtype=np.int64)
+        self.dop_sum = np.zeros(len(DOP_NAMES))
+        # [constellation, used, dB-Hz]
+        self.cn0 = np.zeros((len(GNSS_CODES), 2, CN0_BINS), dtype=np.int64)
+
+    def update(self, part: LogColumns) -> None:
+        self.lines += part.lines
+        self.bad_checksum += part.bad_checksum
+        epochs = part.epochs
+        n = len(part)
+        if n:
+            quality, fix_mode = epochs["quality"], epochs["fix_mode"]
+            fixed = np.where(quality >= 0, (quality >= 1) & (quality <= 5), fix_mode >= 2)
+            utc, t = epochs["utc_s"], epochs["time"]
+            if not self.epochs:
+                self.first_utc, self.first_time = float(utc[0]), float(t[0])
+            if self.fix_utc is None and fixed.any():
+                i = int(np.argmax(fixed))
+                self.fix_utc, self.fix_time = float(utc[i]), float(t[i])
+            self.last_utc, self.last_time = float(utc[-1]), float(t[-1])
+            self.epochs += n
+            self.fixed += int(np.count_nonzero(fixed))
+            self.quality += np.bincount(np.clip(quality, -1, 9).astype(np.int64) + 1, minlength=11)
+
+            lat, lon = epochs["lat"][fixed], epochs["lon"][fixed]
+            located = ~(np.isnan(lat) | np.isnan(lon))
+            lat, lon = lat[located], lon[located]
+            if len(lat):
+                mean = np.array([lat.mean(), lon.mean()])
+                m2 = np.array([np.square(lat - mean[0]).sum(), np.square(lon - mean[1]).sum()])
+                self._add_moments(len(lat), mean, m2)
+                self.grid.add(lat, lon)
+
+            for d, name in enumerate(DOP_NAMES):
+                values = epochs[name][fixed]
+                values = values[~np.isnan(values)]
+                bins = np.clip(np.rint(values / DOP_STEP), 0, DOP_BINS - 1).astype(np.int64)
+                self.dop[d] += np.bincount(bins, minlength=DOP_BINS)
+                self.dop_sum[d] += values.sum()
+
+        sats = part.sats
+        snr = sats["snr"]
+        tracked = ~np.isnan(snr)
+        if tracked.any():
+            cn0 = np.clip(np.rint(snr[tracked]), 0, CN0_BINS - 1).astype(np.int64)
+            index = (sats["constellation"][tracked].astype(np.int64) * 2 + sats["used"][tracked]) * CN0_BINS + cn0
+            self.cn0 += np.bincount(index, minlength=self.cn0.size).reshape(self.cn0.shape)
+
+    def merge(self, other: "LogStats") -> None:
+        if other.epochs:
+            if not self.epochs:
+                self.first_utc, self.first_time = other.first_utc, other.first_time
+            if self.fix_utc is None:
+                self.fix_utc, self.fix_time = other.fix_utc, other.fix_time
+            self.last_utc, self.last_time = other.last_utc, other.last_time
+        self.lines += other.lines
+        self.bad_checksum += other.bad_checksum
+        self.epochs += other.epochs
+        self.fixed += other.fixed
+        self.quality += other.quality
+        if other.positions:
+            self._add_moments(other.positions, other.mean, other.m2)
+        self.grid.merge(other.grid)
+        self.dop += other.dop
+        self.dop_sum += other.dop_sum
+        self.cn0 += other.cn0
+
+    def _add_moments(self, n: int, mean: "np.ndarray", m2: "np.ndarray") -> None:
+        # Chan et al. pairwise update of count, mean and M2.
+        total = self.positions + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + m2 + np.square(delta) * (self.positions * n / total)
+        self.positions = total
+
+    @property
+    def ttff_s(self) -> Optional[float]:
+        return _elapsed(self.first_utc, self.first_time, self.fix_utc, self.fix_time)
+
+    @property
+    def duration_s(self) -> Optional[float]:
+        return _elapsed(self.first_utc, self.first_time, self.last_utc, self.last_time)
+
+    def report(self, reference: Optional[Tuple[float, float]] = None, dop_bin: float = 0.5) -> Dict[str, object]:
+        return {
+            "lines": self.lines,
+            "bad_checksum": self.bad_checksum,
+            "epochs": self.epochs,
+            "fixed_epochs": self.fixed,
+            "duration_s": _round(self.duration_s, 3),
+            "availability_pct": round(100.0 * self.fixed / self.epochs, 3) if self.epochs else None,
+            "quality": {
+                _quality_name(q): int(count) for q, count in zip(range(-1, 10), self.quality.tolist()) if count
+            },
+            "accuracy": self._accuracy(reference),
+            "dop": {name: _dop_summary(self.dop[d], self.dop_sum[d], dop_bin) for d, name in enumerate(DOP_NAMES)},
+            "cn0": {
+                GNSS_CODES[c]: {"all": _cn0_summary(hist.sum(axis=0)), "used": _cn0_summary(hist[1])}
+                for c, hist in enumerate(self.cn0)
+                if hist.any()
+            },
+        }
+
+    def _accuracy(self, reference: Optional[Tuple[float, float]]) -> Dict[str, object]:
+        if not self.positions:
+            return {"fixes": 0}
+        mean_lat, mean_lon = self.mean.tolist()
+        ref_lat, ref_lon = reference if reference is not None else (mean_lat, mean_lon)
+        north_m, east_m = metres_per_degree(ref_lat)
+        # Mean square distance from the reference: spread plus offset of the
+        # mean.
+        var_north = self.m2[0] / self.positions * north_m**2
+        var_east = self.m2[1] / self.positions * east_m**2
+        bias_north = (mean_lat - ref_lat) * north_m
+        bias_east = (mean_lon - ref_lon) * east_m
+        cep50, cep95 = self.grid.radii(ref_lat, ref_lon, (0.5, 0.95))
+        return {
+            "fixes": self.positions,
+            "reference": "surveyed" if reference is not None else "mean",
+            "ref_lat": round(ref_lat, 9),
+            "ref_lon": round(ref_lon, 9),
+            "mean_lat": round(mean_lat, 9),
+            "mean_lon": round(mean_lon, 9),
+            "mean_offset_m": round(math.hypot(bias_north, bias_east), 4),
+            "cep50_m": _round(cep50, 4),
+            "cep95_m": _round(cep95, 4),
+            "drms2_m": round(2.0 * math.sqrt(var_north + var_east + bias_north**2 + bias_east**2), 4),
+            "grid_m": round(self.grid.cell_deg * north_m, 4),
+        }
+
+
+def _elapsed(
+    first_utc: Optional[float], first_time: Optional[float], utc: Optional[float], t: Optional[float]
+) -> Optional[float]:
+    # Prefer full timestamps; before the first RMC date only seconds of day
+    # are known.
+    if first_utc is None or utc is None:
+        return None
+    if first_time is not None and t is not None and not (math.isnan(first_time) or math.isnan(t)):
+        return t - first_time
+    return (utc - first_utc) % 86400.0
+
+
+def _quality_name(quality: int) -> str:
+    if quality < 0:
+        return "missing"
+    return QUALITY_NAMES[quality] if quality < len(QUALITY_NAMES) else "other"
+
+
+def _round(value: Optional[float], digits: int) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+def _percentile(hist: "np.ndarray", fraction: float) -> int:
+    # Lowest bin holding the given fraction of the samples.
+    return int(np.searchsorted(np.cumsum(hist), fraction * hist.sum()))
+
+
+def _dop_summary(hist: "np.ndarray", total: float, bin_width: float) -> Dict[str, object]:
+    samples = int(hist.sum())
+    if not samples:
+        return {"samples": 0}
+    step = max(int(round(bin_width / DOP_STEP)), 1)
+    last = int(np.flatnonzero(hist)[-1])
+    counts = np.add.reduceat(hist[: last + 1], np.arange(0, last + 1, step))
+    return {
+        "samples": samples,
+        "mean": round(total / samples, 3),
+        "p50": round(_percentile(hist, 0.5) * DOP_STEP, 2),
+        "p95": round(_percentile(hist, 0.95) * DOP_STEP, 2),
+        "max": round(last * DOP_STEP, 2),
+        "bin_width": round(step * DOP_STEP, 2),
+        "counts": counts.tolist(),
+    }
+
+
+def _cn0_summary(hist: "np.ndarray") -> Dict[str, object]:
+    samples = int(hist.sum())
+    if not samples:
+        return {"samples": 0}
+    last = int(np.flatnonzero(hist)[-1])
+    return {
+        "samples": samples,
+        "mean": round(float(hist @ np.arange(CN0_BINS)) / samples, 2),
+        "p10": _percentile(hist, 0.1),
+        "p50": _percentile(hist, 0.5),
+        "p90": _percentile(hist, 0.9),
+        "counts": hist[: last + 1].tolist(),
+    }
+
+
+def find_logs(inputs: Iterable[str]) -> List[str]:
+    # Files are taken as given; directories are searched for log suffixes.
+    logs = []
+    for path in inputs:
+        if not os.path.isdir(path):
+            logs.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                base = name[:-3] if name.endswith(".gz") else name
+                if base.endswith(LOG_SUFFIXES):
+                    logs.append(os.path.join(root, name))
+    return logs
+
+
+def plan_tasks(logs: Sequence[str], split_bytes: int) -> List[Task]:
+    # Uncompressed logs above split_bytes become equal byte ranges.
+    tasks: List[Task] = []
+    for path in logs:
+        size = os.path.getsize(path)
+        pieces = 1 if path.endswith(".gz") else max(math.ceil(size / max(split_bytes, 1)), 1)
+        if pieces == 1:
+            tasks.append((path, 0, None))
+            continue
+        cuts = [size * i // pieces for i in range(pieces + 1)]
+        tasks.extend((path, start, end if end < size else None) for start, end in zip(cuts[:-1], cuts[1:]))
+    return tasks
+
+
+def analyze_range(task: Task, chunk_bytes: int) -> LogStats:
+    path, start, end = task
+    stats = LogStats()
+    for part in iter_log_columns(path, chunk_bytes, start, end):
+        stats.update(part)
+    return stats
+
+
+def _run_task(args: Tuple[Task, int]) -> LogStats:
+    return analyze_range(*args)
+
+
+def analyze_logs(logs: Sequence[str], workers: int, chunk_bytes: int, split_bytes: int) -> Dict[str, LogStats]:
+    # Statistics per log, in input order.
+    tasks = plan_tasks(logs, split_bytes)
+    jobs = [(task, chunk_bytes) for task in tasks]
+    if workers <= 1 or len(tasks) <= 1:
+        results: Iterable[LogStats] = map(_run_task, jobs)
+        return _collect(tasks, results)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return _collect(tasks, pool.map(_run_task, jobs))
+
+
+def _collect(tasks: Sequence[Task], results: Iterable[LogStats]) -> Dict[str, LogStats]:
+    # Tasks of one log are planned in order, so merging as they come keeps
+    # the epochs in log order.
+    per_log: Dict[str, LogStats] = {}
+    for (path, _, _), stats in zip(tasks, results):
+        if path in per_log:
+            per_log[path].merge(stats)
+        else:
+            per_log[path] = stats
+    return per_log
+
+
+def build_report(
+    per_log: Dict[str, LogStats], reference: Optional[Tuple[float, float]], dop_bin: float
+) -> Dict[str, object]:
+    total = LogStats()
+    for stats in per_log.values():
+        total.merge(stats)
+    # TTFF and duration are per log; the total sums durations and
+    # summarizes the logs' TTFFs.
+    ttffs = sorted(t for t in (stats.ttff_s for stats in per_log.values()) if t is not None)
+    total_report = total.report(reference, dop_bin)
+    total_report["logs"] = len(per_log)
+    total_report["duration_s"] = round(sum(stats.duration_s or 0.0 for stats in per_log.values()), 3)
+    total_report["ttff_s"] = {
+        "logs_with_fix": len(ttffs),
+        "min": _round(ttffs[0], 3) if ttffs else None,
+        "median": _round(ttffs[len(ttffs) // 2], 3) if ttffs else None,
+        "mean": _round(sum(ttffs) / len(ttffs), 3) if ttffs else None,
+        "max": _round(ttffs[-1], 3) if ttffs else None,
+    }
+    logs = []
+    for path, stats in per_log.items():
+        entry: Dict[str, object] = {"log": path, "ttff_s": _round(stats.ttff_s, 3)}
+        entry.update(stats.report(reference, dop_bin))
+        logs.append(entry)
+    return {"logs": logs, "total": total_report}
+
+
+CSV_FIELDS = (
+    "log",
+    "epochs",
+    "fixed_epochs",
+    "availability_pct",
+    "ttff_s",
+    "duration_s",
+    "bad_checksum",
+    "fixes",
+    "cep50_m",
+    "cep95_m",
+    "drms2_m",
+    "mean_offset_m",
+)
+
+
+def write_csv(report: Dict[str, object], out) -> None:
+    # One row per log and a "TOTAL" row (its ttff_s is the median) of the
+    # scalar figures; histograms are only in the JSON report.
+    rows = list(report["logs"])  # type: ignore[arg-type]
+    total = dict(report["total"])  # type: ignore[arg-type]
+    total["log"] = "TOTAL"
+    total["ttff_s"] = total["ttff_s"]["median"]
+    rows.append(total)
+    constellations = sorted({c for row in rows for c in row["cn0"]}, key=GNSS_CODES.index)
+    fields = list(CSV_FIELDS)
+    fields += [f"{name}_{stat}" for name in DOP_NAMES for stat in ("mean", "p95")]
+    fields += [f"cn0_{c.lower()}_{stat}" for c in constellations for stat in ("mean", "used_mean")]
+    writer = csv.DictWriter(out, fieldnames=fields)
+    writer.writeheader()
+    for row in rows:
+        flat = {name: row.get(name) for name in CSV_FIELDS}
+        flat.update({name: row["accuracy"].get(name) for name in CSV_FIELDS[7:]})
+        for name in DOP_NAMES:
+            flat[f"{name}_mean"] = row["dop"][name].get("mean")
+            flat[f"{name}_p95"] = row["dop"][name].get("p95")
+        for c in constellations:
+            cn0 = row["cn0"].get(c, {})
+            flat[f"cn0_{c.lower()}_mean"] = cn0.get("all", {}).get("mean")
+            flat[f"cn0_{c.lower()}_used_mean"] = cn0.get("used", {}).get("mean")
+        writer.writerow(flat)
+
+
+def parse_reference(text: str) -> Tuple[float, float]:
+    try:
+        lat, lon = (float(value) for value in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected LAT,LON in decimal degrees") from None
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise argparse.ArgumentTypeError("LAT,LON out of range")
+    return lat, lon
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="NavScope log analytics")
+    parser.add_argument("paths", nargs="+", help="Log files or directories of logs")
+    parser.add_argument("--reference", type=parse_reference, help="Surveyed LAT,LON for CEP/2DRMS (default: mean fix)")
+    parser.add_argument("--format", choices=("json", "csv"), default="json")
+    parser.add_argument("--output", help="Write the report here instead of stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--chunk-mb", type=float, default=DEFAULT_CHUNK_MB, help="Decode chunk size per worker")
+    parser.add_argument("--split-mb", type=float, default=DEFAULT_SPLIT_MB, help="Split uncompressed logs above this")
+    parser.add_argument("--dop-bin", type=float, default=0.5, help="DOP histogram bin width in the report")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if np is None:
+        print("[Analytics] numpy is required (pip install numpy)", file=sys.stderr)
+        return 1
+    logs = find_logs(args.paths)
+    missing = [path for path in logs if not os.path.isfile(path)]
+    if missing:
+        print(f"[Analytics] Not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    if not logs:
+        print("[Analytics] No logs found", file=sys.stderr)
+        return 1
+    size_mb = sum(os.path.getsize(path) for path in logs) / (1024 * 1024)
+    print(f"[Analytics] {len(logs)} logs, {size_mb:.1f} MB, {args.workers} workers", file=sys.stderr)
+    started = time.monotonic()
+    per_log = analyze_logs(
+        logs, args.workers, int(args.chunk_mb * 1024 * 1024), int(args.split_mb * 1024 * 1024)
+    )
+    report = build_report(per_log, args.reference, args.dop_bin)
+    elapsed = time.monotonic() - started
+    print(f"[Analytics] Done in {elapsed:.1f} s ({size_mb / max(elapsed, 1e-9):.1f} MB/s)", file=sys.stderr)
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            write_csv(report, out)
+        else:
+            json.dump(report, out, indent=2)
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,112 @@
+"""
+Serial ingestion benchmark.
+
+Feeds an NMEA log through a pseudo-terminal at a simulated baud rate and
+compares NmeaReader's line and bulk read modes: read calls, reader CPU time,
+and receive latency per sentence. POSIX only (needs a pty).
+
+    python -m GNSserver.bench_serial --file path/to/log.nmea --seconds 10
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+import tty
+from typing import Dict, List
+
+from .nmea_reader import READ_MODES, NmeaReader
+
+DEFAULT_BAUDS = (9600, 115200, 460800)
+# USB CDC receivers deliver data in packets; write the same way.
+PACKET_SIZE = 64
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="NavScope serial ingestion benchmark")
+    parser.add_argument("--file", dest="file_path", required=True, help="NMEA log to stream")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration per run")
+    parser.add_argument("--baud", type=int, action="append", help="Baud rate (repeatable)")
+    return parser.parse_args()
+
+
+def _writer(fd: int, data: bytes, baud: int, seconds: float, sent: Dict[int, float], stop: threading.Event) -> None:
+    # Write packets paced to the baud rate (10 bits per byte on the wire) and
+    # remember when each sentence's final byte went out.
+    bytes_per_s = baud / 10.0
+    start = time.monotonic()
+    offset = 0
+    total = 0
+    line_no = 0
+    while not stop.is_set() and time.monotonic() - start < seconds:
+        packet = data[offset : offset + PACKET_SIZE]
+        if len(packet) < PACKET_SIZE:
+            packet += data[: PACKET_SIZE - len(packet)]
+        offset = (offset + PACKET_SIZE) % len(data)
+        due = start + (total + len(packet)) / bytes_per_s
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        os.write(fd, packet)
+        t_sent = time.monotonic()
+        for _ in range(packet.count(b"\n")):
+            sent[line_no] = t_sent
+            line_no += 1
+        total += len(packet)
+
+
+def run_once(data: bytes, baud: int, mode: str, seconds: float) -> Dict[str, float]:
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    port = os.ttyname(slave)
+    reader = NmeaReader(port, baud, None, 1.0, read_mode=mode)
+    sent: Dict[int, float] = {}
+    latencies: List[float] = []
+    stop = threading.Event()
+    writer = threading.Thread(target=_writer, args=(master, data, baud, seconds, sent, stop), daemon=True)
+    cpu_start = time.thread_time()
+    writer.start()
+    count = 0
+    deadline = time.monotonic() + seconds
+    for _, t_rx in reader.iter_lines():
+        t_sent = sent.get(count)
+        if t_sent is not None:
+            latencies.append((t_rx - t_sent) * 1000)
+        count += 1
+        if t_rx >= deadline:
+            break
+    cpu = time.thread_time() - cpu_start
+    stop.set()
+    writer.join()
+    os.close(master)
+    os.close(slave)
+    latencies.sort()
+    return {
+        "sentences": count,
+        "read_calls": reader.read_calls,
+        "cpu_ms": cpu * 1000,
+        "cpu_us_per_sentence": cpu * 1e6 / max(count, 1),
+        "lat_ms_p50": statistics.median(latencies) if latencies else 0.0,
+        "lat_ms_p99": latencies[int(len(latencies) * 0.99)] if latencies else 0.0,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    with open(args.file_path, "rb") as f:
+        data = f.read()
+    bauds = args.baud or list(DEFAULT_BAUDS)
+    print(f"{'baud':>7} {'mode':>5} {'lines':>7} {'reads':>8} {'cpu_ms':>8} {'us/line':>8} {'p50_ms':>7} {'p99_ms':>7}")
+    for baud in bauds:
+        for mode in READ_MODES:
+            r = run_once(data, baud, mode, args.seconds)
+            print(
+                f"{baud:>7} {mode:>5} {r['sentences']:>7} {r['read_calls']:>8} {r['cpu_ms']:>8.1f} "
+                f"{r['cpu_us_per_sentence']:>8.1f} {r['lat_ms_p50']:>7.2f} {r['lat_ms_p99']:>7.2f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,253 @@
+"""
+Map breadcrumb trail.
+
+Fixes are simplified as they arrive, once per level of detail: each level
+runs a StreamSimplifier whose tolerance is about a screen pixel at the
+level's zoom, so hours of 10 Hz track shrink to what a map at that zoom can
+show. The most detailed level takes the fixes and every other level the
+final points of the level below it, so coarse levels are not held to one
+point per window of raw fixes; deviations add up to under 1.5 pixels. A
+request at any zoom is served from the first level at least as detailed.
+
+Each level keeps its final points in a fixed-capacity ring (a NaN latitude
+marks a break in the track) and counts them in `seq`. Final points never
+change, so a client holding a trail only needs the points stored since its
+last copy, plus the level's "tail": the simplified points of its open window
+and of the finer levels' open windows, which are not final yet and are
+replaced on every reply.
+"""
+
+import math
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from .simplify import StreamSimplifier, simplify_indices
+
+if TYPE_CHECKING:
+    from .tracker import GnssState
+
+# Level zooms (Web Mercator, 256-pixel tiles).
+ZOOMS = (4, 7, 10, 12, 14, 16, 18)
+# Allowed deviation from the track, in pixels at the level's zoom.
+PIXEL_TOLERANCE = 1.0
+# Final points kept per level; the oldest drop off.
+MAX_POINTS = 32768
+# Simplification window; bounds the tail sent with every reply.
+TAIL_WINDOW = 256
+# Fixes further apart in time than this start a new piece of track.
+GAP_S = 10.0
+
+# Metres per pixel at zoom 0 on the equator.
+_ZOOM0_M = 2 * math.pi * 6378137.0 / 256
+_NAN = float("nan")
+
+Point = Optional[List[float]]
+BBox = Tuple[float, float, float, float]
+
+
+def parse_bbox(spec: object) -> Optional[BBox]:
+    # "west,south,east,north" or a 4-item list in degrees; None/empty for no
+    # box. Raises ValueError.
+    if not spec:
+        return None
+    parts = spec.split(",") if isinstance(spec, str) else spec
+    try:
+        west, south, east, north = (float(part) for part in parts)  # type: ignore[union-attr]
+    except (TypeError, ValueError):
+        raise ValueError("bbox must be west,south,east,north") from None
+    if not (west <= east and south <= north):
+        raise ValueError("bbox must be west,south,east,north")
+    return west, south, east, north
+
+
+def _point(lat: float, lon: float) -> Point:
+    return None if lat != lat else [round(lat, 7), round(lon, 7)]
+
+
+class TrailLevel:
+    __slots__ = ("zoom", "finer", "lat", "lon", "seq", "oldest", "simplifier", "_tail_key", "_tail")
+
+    def __init__(self, zoom: int, capacity: int, finer: Optional["TrailLevel"] = None) -> None:
+        self.zoom = zoom
+        # The level feeding this one; None for the one taking fixes.
+        self.finer = finer
+        self.lat = array("d", bytes(8 * capacity))
+        self.lon = array("d", bytes(8 * capacity))
+        # Points ever stored; the ring holds absolute indices oldest..seq-1.
+        self.seq = 0
+        self.oldest = 0
+        self.simplifier: StreamSimplifier[Tuple[float, float]] = StreamSimplifier(0.0, TAIL_WINDOW)
+        self._tail_key: Optional[tuple] = None
+        self._tail: List[List[float]] = []
+
+    def clear(self) -> None:
+        # Skip a seq: a `since` from before the clear is then out of range
+        # and the client is sent the whole (empty) trail.
+        self.seq += 1
+        self.oldest = self.seq
+        self.simplifier = StreamSimplifier(0.0, TAIL_WINDOW)
+
+    def start_piece(self, lat: float) -> None:
+        # Pixels shrink with cos(latitude) on the map; set once per piece.
+        metres = _ZOOM0_M * math.cos(math.radians(lat)) / (1 << self.zoom)
+        self.simplifier.tolerance_m = PIXEL_TOLERANCE * metres
+
+    def add(self, points: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        # Returns the points that became final here, for the next level.
+        out = []
+        for lat, lon in points:
+            out += self.simplifier.push(lat, lon, (lat, lon))
+        self._store(out)
+        return out
+
+    def end_piece(self, points: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        out = self.add(points)
+        rest = self.simplifier.flush()
+        self._store(rest)
+        self._store([(_NAN, _NAN)])
+        return out + rest
+
+    def _store(self, points: Sequence[Tuple[float, float]]) -> None:
+        capacity = len(self.lat)
+        for lat, lon in points:
+            i = self.seq % capacity
+            self.lat[i] = lat
+            self.lon[i] = lon
+            self.seq += 1
+        self.oldest = max(self.oldest, self.seq - capacity)
+
+    def points(self, start: int) -> List[Point]:
+        # Final points from absolute index `start` on; None for breaks.
+        capacity = len(self.lat)
+        lats, lons = self.lat, self.lon
+        return [_point(lats[n % capacity], lons[n % capacity]) for n in range(start, self.seq)]
+
+    def clipped(self, bbox: BBox) -> List[Point]:
+        # Final points in the box and their neighbours, so lines leaving the
+        # box still reach its edge; None wherever points were left out.
+        west, south, east, north = bbox
+        capacity = len(self.lat)
+        lats, lons = self.lat, self.lon
+        slots = [n % capacity for n in range(self.oldest, self.seq)]
+        inside = [south <= lats[i] <= north and west <= lons[i] <= east for i in slots]
+        last = len(slots) - 1
+        out: List[Point] = []
+        for j, i in enumerate(slots):
+            lat = lats[i]
+            if lat == lat and (inside[j] or (j > 0 and inside[j - 1]) or (j < last and inside[j + 1])):
+                out.append([round(lat, 7), round(lons[i], 7)])
+            elif out and out[-1] is not None:
+                out.append(None)
+        return out
+
+    def tail_key(self) -> tuple:
+        # Changes whenever the tail of this or a finer level may have.
+        finer = self.finer.tail_key() if self.finer is not None else None
+        return self.simplifier.pushed, self.seq, finer
+
+    def tail(self) -> List[List[float]]:
+        # This level's open window followed by the finer levels' tail,
+        # simplified as if the piece ended now; it starts right after the
+        # last final point.
+        key = self.tail_key()
+        if key != self._tail_key:
+            self._tail_key = key
+            points = self.simplifier.peek()
+            if self.finer is not None:
+                points += [(lat, lon) for lat, lon in self.finer.tail()]
+            kept = simplify_indices([p[0] for p in points], [p[1] for p in points], self.simplifier.tolerance_m)
+            self._tail = [[round(points[i][0], 7), round(points[i][1], 7)] for i in kept]
+        return self._tail
+
+
+class Breadcrumbs:
+    # record() is called once per published epoch, like HistoryStore.
+
+    def __init__(self, capacity: int = MAX_POINTS) -> None:
+        # Coarsest first; each level is fed by the one after it.
+        levels: List[TrailLevel] = []
+        finer = None
+        for zoom in sorted(ZOOMS, reverse=True):
+            finer = TrailLevel(zoom, capacity, finer)
+            levels.append(finer)
+        self.levels = levels[::-1]
+        self.fixes = 0
+        self._last_t: Optional[float] = None
+
+    def clear(self) -> None:
+        for level in self.levels:
+            level.clear()
+        self.fixes = 0
+        self._last_t = None
+
+    def record(self, state: "GnssState", utc_s: float) -> None:
+        # utc_s: seconds of day parsed from state.t_utc. Epochs without a
+        # fix end the current piece of track.
+        if state.lat is None or state.lon is None or state.fix_status == "V" or state.quality == 0:
+            self.interrupt()
+            return
+        last = self._last_t
+        if last is not None:
+            # Across midnight the time of day wraps; backwards means a jump.
+            dt = (utc_s - last) % 86400.0
+            if dt == 0.0:
+                return
+            if dt > GAP_S:
+                self.interrupt()
+        if self._last_t is None:
+            for level in self.levels:
+                level.start_piece(state.lat)
+        self._last_t = utc_s
+        self.fixes += 1
+        points: List[Tuple[float, float]] = [(state.lat, state.lon)]
+        for level in reversed(self.levels):
+            points = level.add(points)
+            if not points:
+                break
+
+    def interrupt(self) -> None:
+        if self._last_t is None:
+            return
+        self._last_t = None
+        points: List[Tuple[float, float]] = []
+        for level in reversed(self.levels):
+            points = level.end_piece(points)
+
+    def level(self, zoom: float) -> TrailLevel:
+        # First level at or above the zoom, else the most detailed.
+        for level in self.levels:
+            if level.zoom >= zoom:
+                return level
+        return self.levels[-1]
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "fixes": self.fixes,
+            "levels": [
+                {
+                    "zoom": level.zoom,
+                    "points": level.seq - level.oldest,
+                    "pending": len(level.tail()),
+                    "tolerance_m": round(level.simplifier.tolerance_m, 3),
+                }
+                for level in self.levels
+            ],
+        }
+
+    def query(self, zoom: float, bbox: Optional[BBox] = None, since: Optional[int] = None) -> Dict[str, object]:
+        # With a `since` still held by the level, only the final points
+        # stored after it ("full": false; a leading None is a break, bbox is
+        # not applied). Otherwise the whole trail, clipped to bbox if given.
+        # "seq" is the `since` for the next request at the same zoom.
+        level = self.level(zoom)
+        full = since is None or not level.oldest <= since <= level.seq
+        if not full:
+            points = level.points(since)  # type: ignore[arg-type]
+        elif bbox is not None:
+            points = level.clipped(bbox)
+        else:
+            points = level.points(level.oldest)
+        if full:
+            while points and points[0] is None:
+                points.pop(0)
+        return {"zoom": level.zoom, "seq": level.seq, "full": full, "points": points, "tail": level.tail()}
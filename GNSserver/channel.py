@@ -0,0 +1,60 @@
+"""
+Asyncio channels for handing GNSS state between tasks on one event loop.
+"""
+
+import asyncio
+from typing import Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class LatestValue(Generic[T]):
+    # Single-slot channel: publishing overwrites the previous value, so slow
+    # readers coalesce to the newest one instead of queueing every update.
+
+    def __init__(self, value: Optional[T] = None) -> None:
+        self._value = value
+        self.version = 0
+        self._waiter: Optional[asyncio.Future] = None
+
+    @property
+    def value(self) -> Optional[T]:
+        return self._value
+
+    def publish(self, value: T) -> None:
+        self._value = value
+        self.version += 1
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait_newer(self, version: int, timeout: Optional[float] = None) -> bool:
+        # Wait until something newer than `version` is published. Returns False
+        # if the timeout expires first.
+        if self.version > version:
+            return True
+        loop = asyncio.get_running_loop()
+        if self._waiter is None:
+            self._waiter = loop.create_future()
+        shared = self._waiter
+        # Each reader waits on a future of its own, so timing out does not
+        # cancel the shared wait. Not wait_for(): on Python 3.11 it swallows a
+        # cancellation that lands as the wait completes, and the cancelled
+        # task then never stops.
+        woken = loop.create_future()
+
+        def wake(_: object = None) -> None:
+            if not woken.done():
+                woken.set_result(None)
+
+        shared.add_done_callback(wake)
+        timer = loop.call_later(timeout, wake) if timeout is not None else None
+        try:
+            await woken
+        finally:
+            shared.remove_done_callback(wake)
+            if timer is not None:
+                timer.cancel()
+        return self.version > version
@@ -0,0 +1,474 @@
+"""
+Columnar decoding of whole NMEA logs into NumPy arrays.
+
+decode_log() reads a log (plain or .gz, recorder TAG blocks allowed) in chunks
+and decodes each chunk with array operations over its bytes instead of one
+Python call per sentence: line, comma and TAG positions come from one scan
+each, checksums from an XOR reduction per line, and numeric fields are parsed
+a character column at a time across every sentence of a type at once. Epochs
+are opened by a new UTC time in RMC/GGA, as in GnssTracker; the last epoch of
+a chunk is carried into the next one so epochs never straddle chunks.
+
+start/end select the epochs whose first line starts in that byte range, so a
+large log can be split into ranges decoded independently (in separate
+processes); the ranges' results together equal decoding the whole log.
+
+LogColumns.epochs, one row per epoch:
+    time (Unix s, NaN until the first RMC date), utc_s (seconds of day), lat,
+    lon, alt_m, speed_knots, cog_deg, pdop, hdop, vdop (float64), quality
+    (GGA), fix_mode (GSA) (int8, -1 when missing), used (int16, -1)
+
+LogColumns.sats, one row per satellite per GSV report:
+    epoch (int32 index into epochs), time (float64), constellation (int8
+    index into wire.GNSS_CODES), prn (int16), el, az, snr (float32, NaN when
+    missing), used (bool, PRN listed in the epoch's GSA)
+
+Only RMC, GGA, GSA and GSV are decoded; UBX lines are skipped. numpy is
+needed for this module only.
+"""
+
+import gzip
+import io
+from dataclasses import dataclass, field
+from typing import IO, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # optional; only this module needs it
+    np = None
+
+from .wire import GNSS_CODES
+
+CHUNK_BYTES = 64 * 1024 * 1024
+# Read before a range start to see the epoch in progress there.
+LOOKBACK_BYTES = 64 * 1024
+# Longest numeric field parsed; longer ones count as missing.
+MAX_NUMBER_LEN = 16
+
+EPOCH_COLUMNS = (
+    "time",
+    "utc_s",
+    "lat",
+    "lon",
+    "alt_m",
+    "speed_knots",
+    "cog_deg",
+    "pdop",
+    "hdop",
+    "vdop",
+    "quality",
+    "fix_mode",
+    "used",
+)
+SAT_COLUMNS = ("epoch", "time", "constellation", "prn", "el", "az", "snr", "used")
+
+_TALKERS = {"GP": "GPS", "GL": "GLONASS", "GA": "GALILEO", "GB": "BEIDOU", "BD": "BEIDOU", "SB": "SBAS"}
+_RMC, _GGA, _GSA, _GSV = (int.from_bytes(name, "big") for name in (b"RMC", b"GGA", b"GSA", b"GSV"))
+# Used-PRN keys are epoch * _PRN_SPAN + prn.
+_PRN_SPAN = 4096
+# Most fields any decoded sentence has (GSA: 17, GSV: 20 or 21).
+_MAX_FIELDS = 24
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("columnar decoding needs numpy (pip install numpy)")
+
+
+@dataclass
+class LogColumns:
+    epochs: Dict[str, "np.ndarray"] = field(default_factory=dict)
+    sats: Dict[str, "np.ndarray"] = field(default_factory=dict)
+    lines: int = 0
+    bad_checksum: int = 0
+
+    def __len__(self) -> int:
+        return len(self.epochs["time"]) if self.epochs else 0
+
+
+def decode_log(
+    source: Union[str, bytes, IO[bytes]], chunk_bytes: int = CHUNK_BYTES, start: int = 0, end: Optional[int] = None
+) -> LogColumns:
+    # Whole log as one LogColumns; source is a path (".gz" is decompressed),
+    # a bytes buffer or a binary file object.
+    parts = list(iter_log_columns(source, chunk_bytes, start, end))
+    return _concat(parts)
+
+
+def iter_log_columns(
+    source: Union[str, bytes, IO[bytes]], chunk_bytes: int = CHUNK_BYTES, start: int = 0, end: Optional[int] = None
+) -> Iterator[LogColumns]:
+    # One LogColumns per chunk of complete epochs, for logs too large to
+    # hold decoded at once. Epoch indices in sats restart in every part.
+    # start/end are byte offsets into the (decompressed) log; a range start
+    # needs a seekable source.
+    _require_numpy()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        stream: IO[bytes] = io.BytesIO(source)
+    elif isinstance(source, str):
+        stream = gzip.open(source, "rb") if source.endswith(".gz") else open(source, "rb")
+    else:
+        stream = source
+    decoder = _ChunkDecoder()
+    pending = b""
+    # Log offset of pending[0] and of the next read.
+    offset = position = 0
+    done = False
+    try:
+        if start > 0:
+            offset = max(start - LOOKBACK_BYTES, 0)
+            stream.seek(offset)
+            if offset:
+                # Most likely mid-line; the partial line is never needed.
+                offset += len(stream.readline())
+            position = offset
+        while not done:
+            size = chunk_bytes
+            if end is not None:
+                # Past the range only the epoch open at its end is needed.
+                size = max(min(chunk_bytes, end - position), LOOKBACK_BYTES)
+            data = stream.read(size)
+            if not data:
+                break
+            position += len(data)
+            data = pending + data
+            last = data.rfind(b"\n") + 1
+            pending = data[last:]
+            if last:
+                part, consumed, done = decoder.decode(data[:last], False, start - offset, _relative(end, offset))
+                pending = data[consumed:last] + pending
+                offset += consumed
+                if len(part) or part.lines:
+                    yield part
+        if pending and not done:
+            data = pending if pending.endswith(b"\n") else pending + b"\n"
+            part, _, _ = decoder.decode(data, True, start - offset, _relative(end, offset))
+            if len(part) or part.lines:
+                yield part
+    finally:
+        if stream is not source:
+            stream.close()
+
+
+def _concat(parts: List[LogColumns]) -> LogColumns:
+    if not parts:
+        return _empty()
+    offsets = np.cumsum([0] + [len(part) for part in parts[:-1]])
+    epochs = {name: np.concatenate([part.epochs[name] for part in parts]) for name in EPOCH_COLUMNS}
+    sats = {name: np.concatenate([part.sats[name] for part in parts]) for name in SAT_COLUMNS}
+    sats["epoch"] = np.concatenate([part.sats["epoch"] + offset for part, offset in zip(parts, offsets)]).astype(
+        np.int32
+    )
+    return LogColumns(
+        epochs, sats, sum(part.lines for part in parts), sum(part.bad_checksum for part in parts)
+    )
+
+
+def _empty() -> LogColumns:
+    return _ChunkDecoder().decode(b"", final=True)[0]
+
+
+def _relative(end: Optional[int], offset: int) -> Optional[int]:
+    return None if end is None else end - offset
+
+
+class _ChunkDecoder:
+    # Holds what carries over between chunks (the last RMC date).
+
+    def __init__(self) -> None:
+        self.date_days = np.nan
+
+    def decode(
+        self, data: bytes, final: bool, skip: int = 0, stop: Optional[int] = None
+    ) -> Tuple[LogColumns, int, bool]:
+        # data is whole lines. Returns the complete epochs, how many bytes of
+        # data they consumed and whether an epoch starting at or after stop
+        # was seen; unless final or done, the last epoch is left for the next
+        # chunk. Only epochs whose first line starts in [skip, stop), and
+        # only lines there, are counted.
+        buf = np.frombuffer(data, dtype=np.uint8)
+        ends = np.flatnonzero(buf == 0x0A)
+        starts = np.empty_like(ends)
+        starts[:1] = 0
+        starts[1:] = ends[:-1] + 1
+        line_starts = starts
+        e = ends - (buf[np.maximum(ends - 1, 0)] == 0x0D)
+        s = starts.copy()
+        tagged = np.flatnonzero(buf[s] == 0x5C)
+        if len(tagged):
+            # Skip a TAG block: the sentence starts after its closing "\".
+            slashes = np.flatnonzero(buf == 0x5C)
+            j = np.minimum(np.searchsorted(slashes, s[tagged] + 1), len(slashes) - 1)
+            close = slashes[j]
+            s[tagged] = np.where(close < e[tagged], close + 1, e[tagged])
+
+        # "$" + talker + sentence + "," and one of the sentences decoded here.
+        keep = np.flatnonzero(e - s >= 7)
+        s, e, line_starts = s[keep], e[keep], line_starts[keep]
+        keep = np.flatnonzero((buf[s] == 0x24) & (buf[s + 6] == 0x2C))
+        s, e, line_starts = s[keep], e[keep], line_starts[keep]
+        sid = (buf[s + 3].astype(np.int32) << 16) | (buf[s + 4].astype(np.int32) << 8) | buf[s + 5]
+        keep = np.flatnonzero((sid == _RMC) | (sid == _GGA) | (sid == _GSA) | (sid == _GSV))
+        s, e, line_starts, sid = s[keep], e[keep], line_starts[keep], sid[keep]
+
+        # "*hh" checksums: XOR of the bytes between "$" and "*".
+        checked = buf[e - 3] == 0x2A
+        body_end = np.where(checked, e - 3, e)
+        good = np.ones(len(s), dtype=bool)
+        rows = np.flatnonzero(checked)
+        if len(rows):
+            bounds = np.empty(2 * len(rows), dtype=np.int64)
+            bounds[0::2] = s[rows] + 1
+            bounds[1::2] = e[rows] - 3
+            xor = np.bitwise_xor.reduceat(buf, bounds)[0::2]
+            hi = _HEX[buf[e[rows] - 2]]
+            lo = _HEX[buf[e[rows] - 1]]
+            good[rows] = (hi >= 0) & (lo >= 0) & (hi * 16 + lo == xor)
+        bad_starts = line_starts[~good]
+        keep = np.flatnonzero(good)
+        s, line_starts, sid, body_end = s[keep], line_starts[keep], sid[keep], body_end[keep]
+        talker = (buf[s + 1].astype(np.int32) << 8) | buf[s + 2]
+
+        lines = _Lines(buf, s, body_end)
+        # Epochs: a time line (RMC/GGA with a time) whose time differs from
+        # the previous time line opens one.
+        timed = np.flatnonzero((sid == _RMC) | (sid == _GGA))
+        t = _hhmmss(lines.number(timed, 0))
+        has_time = ~np.isnan(t)
+        timed, t = timed[has_time], t[has_time]
+        opens = np.ones(len(t), dtype=bool)
+        opens[1:] = t[1:] != t[:-1]
+        opening_rows, opening_t = timed[opens], t[opens]
+        opening_starts = line_starts[opening_rows]
+        flags = np.zeros(len(s), dtype=np.int32)
+        flags[opening_rows] = 1
+        epoch = np.cumsum(flags) - 1
+        n_epochs = len(opening_rows)
+        consumed = limit = len(data)
+        done = stop is not None and n_epochs > 0 and opening_starts[-1] >= stop
+        if done:
+            # Epochs before stop are all complete; the rest is not ours.
+            n_epochs = int(np.searchsorted(opening_starts, stop))
+            limit = stop
+        elif not final and n_epochs:
+            n_epochs -= 1
+            consumed = limit = int(opening_starts[-1])
+        if stop is not None:
+            limit = min(limit, stop)
+        in_range = (epoch >= 0) & (epoch < n_epochs)
+        skip = max(skip, 0)
+        total_lines = max(int(np.searchsorted(starts, limit) - np.searchsorted(starts, skip)), 0)
+        bad_checksum = int(np.count_nonzero((bad_starts >= skip) & (bad_starts < limit)))
+
+        def rows_of(code: int) -> "np.ndarray":
+            return np.flatnonzero((sid == code) & in_range)
+
+        rmc, gga, gsa, gsv = rows_of(_RMC), rows_of(_GGA), rows_of(_GSA), rows_of(_GSV)
+        cols: Dict[str, np.ndarray] = {name: np.full(n_epochs, np.nan) for name in EPOCH_COLUMNS[1:10]}
+        cols["utc_s"][:] = opening_t[:n_epochs]
+        # RMC first so GGA wins where both carry a value.
+        _assign(cols["lat"], epoch[rmc], lines.coordinate(rmc, 2))
+        _assign(cols["lon"], epoch[rmc], lines.coordinate(rmc, 4))
+        _assign(cols["speed_knots"], epoch[rmc], lines.number(rmc, 6))
+        _assign(cols["cog_deg"], epoch[rmc], lines.number(rmc, 7))
+        _assign(cols["lat"], epoch[gga], lines.coordinate(gga, 1))
+        _assign(cols["lon"], epoch[gga], lines.coordinate(gga, 3))
+        _assign(cols["hdop"], epoch[gga], lines.number(gga, 7))
+        _assign(cols["alt_m"], epoch[gga], lines.number(gga, 8))
+        _assign(cols["pdop"], epoch[gsa], lines.number(gsa, 14))
+        _assign(cols["hdop"], epoch[gsa], lines.number(gsa, 15))
+        _assign(cols["vdop"], epoch[gsa], lines.number(gsa, 16))
+        quality = np.full(n_epochs, np.nan)
+        fix_mode = np.full(n_epochs, np.nan)
+        used = np.full(n_epochs, np.nan)
+        _assign(quality, epoch[gga], lines.number(gga, 5))
+        _assign(used, epoch[gga], lines.number(gga, 6))
+        _assign(fix_mode, epoch[gsa], lines.number(gsa, 1))
+
+        # Dates: RMC ddmmyy, carried forward across epochs and chunks.
+        date_days = np.full(n_epochs, np.nan)
+        _assign(date_days, epoch[rmc], _ddmmyy_days(lines.number(rmc, 8)))
+        if n_epochs:
+            if np.isnan(date_days[0]):
+                date_days[0] = self.date_days
+            known = np.where(np.isnan(date_days), 0, np.arange(n_epochs))
+            date_days = date_days[np.maximum.accumulate(known)]
+            self.date_days = date_days[-1]
+        epoch_time = date_days * 86400.0 + cols["utc_s"]
+
+        # GSV: up to four satellite blocks after the three header fields,
+        # only whole ones (as in GnssTracker): NMEA 4.10 appends a signal ID
+        # that must not be read as a PRN.
+        blocks = [lines.number(gsv, 3 + 4 * b + k) for b in range(4) for k in range(4)]
+        prn = np.stack(blocks[0::4], axis=1).ravel()
+        el = np.stack(blocks[1::4], axis=1).ravel()
+        az = np.stack(blocks[2::4], axis=1).ravel()
+        snr = np.stack(blocks[3::4], axis=1).ravel()
+        sat_epoch = np.repeat(epoch[gsv], 4)
+        constellation = np.repeat(_TALKER_CODES[talker[gsv]], 4)
+        whole = np.repeat((lines.count[gsv] - 3) // 4, 4)
+        present = ~np.isnan(prn) & (np.tile(np.arange(4), len(gsv)) < whole)
+        prn, el, az, snr = prn[present], el[present], az[present], snr[present]
+        sat_epoch, constellation = sat_epoch[present], constellation[present]
+        # Used: PRN listed in any GSA of the same epoch (as in GnssTracker).
+        gsa_prns = np.stack([lines.number(gsa, k) for k in range(2, 14)], axis=1) if len(gsa) else np.empty((0, 12))
+        gsa_keys = np.repeat(epoch[gsa], 12) * _PRN_SPAN + gsa_prns.ravel()
+        gsa_keys = np.sort(gsa_keys[~np.isnan(gsa_keys)].astype(np.int64))
+        sat_keys = sat_epoch.astype(np.int64) * _PRN_SPAN + prn.astype(np.int64)
+        found = np.minimum(np.searchsorted(gsa_keys, sat_keys), max(len(gsa_keys) - 1, 0))
+        sat_used = gsa_keys[found] == sat_keys if len(gsa_keys) else np.zeros(len(sat_keys), dtype=bool)
+
+        epochs = {
+            "time": epoch_time,
+            **cols,
+            "quality": _small_int(quality, np.int8),
+            "fix_mode": _small_int(fix_mode, np.int8),
+            "used": _small_int(used, np.int16),
+        }
+        sats = {
+            "epoch": sat_epoch.astype(np.int32),
+            "time": epoch_time[sat_epoch] if len(sat_epoch) else np.empty(0),
+            "constellation": constellation,
+            "prn": prn.astype(np.int16),
+            "el": el.astype(np.float32),
+            "az": az.astype(np.float32),
+            "snr": snr.astype(np.float32),
+            "used": sat_used,
+        }
+        # Epochs begun before skip were only decoded for context (epoch
+        # boundaries, dates).
+        first = int(np.searchsorted(opening_starts[:n_epochs], skip))
+        if first:
+            epochs = {name: column[first:] for name, column in epochs.items()}
+            kept = sats["epoch"] >= first
+            sats = {name: column[kept] for name, column in sats.items()}
+            sats["epoch"] -= first
+        return LogColumns(epochs, sats, total_lines, bad_checksum), consumed, bool(done)
+
+
+class _Lines:
+    # Field access for a set of sentences. Separators are the commas plus
+    # each sentence's body end ("*" or line end), so field i (0 = first
+    # after the header) of a sentence always lies between its separators
+    # i and i + 1.
+
+    def __init__(self, buf: "np.ndarray", starts: "np.ndarray", body_ends: "np.ndarray") -> None:
+        # Zero padding lets fixed-width gathers run past the end unchecked.
+        self.buf = np.concatenate((buf, np.zeros(MAX_NUMBER_LEN + 1, dtype=np.uint8)))
+        is_sep = buf == 0x2C
+        is_sep[body_ends[body_ends < len(buf)]] = True
+        seps = np.flatnonzero(is_sep)
+        self.seps = np.concatenate((seps, np.full(_MAX_FIELDS + 2, len(buf), dtype=seps.dtype)))
+        self.first = np.searchsorted(seps, starts + 6)
+        self.count = np.searchsorted(seps, body_ends) - self.first
+        self._rows: Optional["np.ndarray"] = None
+        self._first = self._count = self.first
+
+    def span(self, rows: "np.ndarray", i: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        # Row sets are reused for many fields; their separator offsets are
+        # gathered once.
+        if self._rows is not rows:
+            self._rows = rows
+            self._first = self.first[rows]
+            self._count = self.count[rows]
+        index = self._first + i
+        fs = self.seps[index] + 1
+        fe = self.seps[index + 1]
+        missing = self._count <= i
+        fe[missing] = fs[missing]
+        return fs, fe
+
+    def number(self, rows: "np.ndarray", i: int) -> "np.ndarray":
+        return _numbers(self.buf, *self.span(rows, i))
+
+    def coordinate(self, rows: "np.ndarray", i: int) -> "np.ndarray":
+        # (D)DDMM.MMMM at field i, hemisphere at i + 1 -> signed degrees.
+        value = self.number(rows, i)
+        degrees = np.floor(value / 100.0)
+        value = degrees + (value - degrees * 100.0) / 60.0
+        hs, he = self.span(rows, i + 1)
+        hemi = self.buf[hs]
+        negative = (hemi == 0x53) | (hemi == 0x57)
+        value[negative] = -value[negative]
+        value[he <= hs] = np.nan
+        return value
+
+
+def _numbers(buf: "np.ndarray", starts: "np.ndarray", ends: "np.ndarray") -> "np.ndarray":
+    # Decimal fields [start, end) -> float64, NaN when empty or malformed;
+    # exact like float() for up to 15 digits. Walks character columns, one
+    # vectorized step per position up to the longest field, so short
+    # integer fields cost a few passes. buf must be zero-padded by
+    # MAX_NUMBER_LEN bytes.
+    n = len(starts)
+    lengths = ends - starts
+    width = int(min(lengths.max(initial=0), MAX_NUMBER_LEN))
+    mantissa = np.zeros(n, dtype=np.int64)
+    decimals = np.zeros(n, dtype=np.int64)
+    digits = np.zeros(n, dtype=np.int64)
+    seen_dot = np.zeros(n, dtype=bool)
+    invalid = (lengths <= 0) | (lengths > MAX_NUMBER_LEN)
+    negative = np.zeros(n, dtype=bool)
+    for k in range(width):
+        inside = k < lengths
+        ch = buf[starts + k]
+        digit = ch - np.uint8(0x30)
+        is_digit = inside & (digit <= 9)
+        is_dot = inside & (ch == 0x2E)
+        if k == 0:
+            negative = inside & (ch == 0x2D)
+            invalid |= inside & ~(is_digit | is_dot | negative)
+        else:
+            invalid |= inside & ~(is_digit | is_dot)
+        invalid |= is_dot & seen_dot
+        mantissa = np.where(is_digit, mantissa * 10 + digit, mantissa)
+        decimals += is_digit & seen_dot
+        digits += is_digit
+        seen_dot |= is_dot
+    invalid |= digits == 0
+    value = mantissa / _POW10[decimals]
+    value[negative] = -value[negative]
+    value[invalid] = np.nan
+    return value
+
+
+def _hhmmss(value: "np.ndarray") -> "np.ndarray":
+    hours = np.floor(value / 10000.0)
+    minutes = np.floor(value / 100.0) - hours * 100.0
+    return hours * 3600.0 + minutes * 60.0 + (value - hours * 10000.0 - minutes * 100.0)
+
+
+def _ddmmyy_days(value: "np.ndarray") -> "np.ndarray":
+    # ddmmyy -> days since 1970-01-01 (20yy), NaN where missing.
+    out = np.full(len(value), np.nan)
+    ok = ~np.isnan(value) & (value >= 10100)
+    v = value[ok].astype(np.int64)
+    day, month, year = v // 10000, v // 100 % 100, v % 100
+    ok_date = (day >= 1) & (day <= 31) & (month >= 1) & (month <= 12)
+    months = (year[ok_date] + 30) * 12 + month[ok_date] - 1
+    days = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + day[ok_date] - 1
+    idx = np.flatnonzero(ok)[ok_date]
+    out[idx] = days
+    return out
+
+
+def _assign(column: "np.ndarray", epochs: "np.ndarray", values: "np.ndarray") -> None:
+    # Per-epoch value; later sentences win, missing values never overwrite.
+    present = ~np.isnan(values)
+    column[epochs[present]] = values[present]
+
+
+def _small_int(values: "np.ndarray", dtype: type) -> "np.ndarray":
+    return np.where(np.isnan(values), -1, values).astype(dtype)
+
+
+if np is not None:
+    _HEX = np.full(256, -1, dtype=np.int64)
+    for _i, _c in enumerate(b"0123456789ABCDEF"):
+        _HEX[_c] = _i
+    for _i, _c in enumerate(b"abcdef"):
+        _HEX[_c] = 10 + _i
+    _POW10 = 10.0 ** np.arange(MAX_NUMBER_LEN + 1)
+    _TALKER_CODES = np.zeros(1 << 16, dtype=np.int8)
+    for _talker, _name in _TALKERS.items():
+        _TALKER_CODES[int.from_bytes(_talker.encode("ascii"), "big")] = GNSS_CODES.index(_name)
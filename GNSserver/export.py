@@ -0,0 +1,494 @@
+"""
+Track export to GPX, GeoJSON or CSV.
+
+    python -m GNSserver.export drive.nmea.gz --format gpx --tolerance-m 2 --output drive.gpx
+    python -m GNSserver.export recordings/ --format geojson --output tracks/
+
+Reads recorder output or any NMEA log (plain or .gz, TAG blocks and UBX
+lines allowed). Only the position messages (RMC, GGA and UBX NAV-PVT) are
+picked out of each chunk with one regular-expression scan; everything else
+is never split or parsed. Those go through the usual NMEA parser and are
+merged per epoch (GGA over RMC, as in the tracker) into one point per fix.
+
+Points are written as they are produced, so memory does not grow with the
+log. With --tolerance-m they are first run through
+simplify.StreamSimplifier: every recorded fix stays within the tolerance of
+the exported line. A gap of more than --gap-s without a fix starts a new
+segment (GPX trkseg, GeoJSON feature). Several logs are exported in
+parallel, one output file each.
+"""
+
+import argparse
+import calendar
+import gzip
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import IO, Dict, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from .nmea_parser import ParseStats, parse_lat_lon, parse_time_field, safe_float, safe_int, split_nmea_bytes
+from .simplify import StreamSimplifier
+from .ubx import UBX_TEXT_PREFIX, NavPvt, check_frame, decode_nav_pvt, ubx_from_text
+
+FORMATS = ("gpx", "geojson", "csv")
+SUFFIXES = {"gpx": ".gpx", "geojson": ".geojson", "csv": ".csv"}
+DEFAULT_GAP_S = 10.0
+READ_BYTES = 1024 * 1024
+
+# Whole lines holding a position message, TAG block allowed.
+_POSITION_LINE = re.compile(rb"^(?:\\[^\\\n]*\\)?(?:\$[A-Z]{2}(?:RMC|GGA),|UBX,[bB]5620107)[^\n]*", re.M)
+_SENTENCES = {"RMC": 9, "GGA": 9}
+# GGA qualities exported: all but invalid, manual input and simulation.
+_FIX_QUALITIES = frozenset((1, 2, 3, 4, 5, 6))
+# GPX <fix> for GGA quality; plain GPS fixes do not say 2D or 3D.
+_GPX_FIX = {2: "dgps", 3: "pps", 4: "dgps", 5: "dgps"}
+_KNOTS = 1.943844
+
+
+@dataclass(slots=True)
+class TrackPoint:
+    # Unix seconds; None until the log has given a date.
+    time: Optional[float]
+    utc_s: float
+    lat: float
+    lon: float
+    alt_m: Optional[float]
+    speed_knots: Optional[float]
+    cog_deg: Optional[float]
+    hdop: Optional[float]
+    quality: Optional[int]
+    sats: Optional[int]
+
+
+class _Epoch:
+    # Fields of the open epoch; GGA values win over RMC ones.
+
+    __slots__ = ("utc", "lat", "lon", "alt_m", "speed_knots", "cog_deg", "hdop", "quality", "sats", "rmc_valid")
+
+    def __init__(self, utc: Optional[str]) -> None:
+        self.utc = utc
+        self.lat: Optional[float] = None
+        self.lon: Optional[float] = None
+        self.alt_m: Optional[float] = None
+        self.speed_knots: Optional[float] = None
+        self.cog_deg: Optional[float] = None
+        self.hdop: Optional[float] = None
+        self.quality: Optional[int] = None
+        self.sats: Optional[int] = None
+        self.rmc_valid = False
+
+    def point(self, date_base: Optional[float]) -> Optional[TrackPoint]:
+        if self.lat is None or self.lon is None or self.utc is None:
+            return None
+        valid = self.quality in _FIX_QUALITIES if self.quality is not None else self.rmc_valid
+        utc_s = parse_time_field(self.utc)
+        if not valid or utc_s is None:
+            return None
+        t = date_base + utc_s if date_base is not None else None
+        return TrackPoint(
+            t, utc_s, self.lat, self.lon, self.alt_m, self.speed_knots, self.cog_deg, self.hdop, self.quality, self.sats
+        )
+
+    def rmc(self, fields: List[str]) -> None:
+        # fields: time, status, lat, N/S, lon, E/W, speed, track, date
+        self.rmc_valid = fields[1] == "A"
+        if self.lat is None:
+            self.lat, self.lon = parse_lat_lon(fields[2], fields[3], fields[4], fields[5])
+        if len(fields) > 7:
+            self.speed_knots = safe_float(fields[6])
+            self.cog_deg = safe_float(fields[7])
+
+    def gga(self, fields: List[str]) -> None:
+        # fields: time, lat, N/S, lon, E/W, quality, num_sats, hdop, alt
+        lat, lon = parse_lat_lon(fields[1], fields[2], fields[3], fields[4])
+        if lat is not None and lon is not None:
+            self.lat, self.lon = lat, lon
+        self.quality = safe_int(fields[5])
+        if len(fields) > 8:
+            self.sats = safe_int(fields[6])
+            self.hdop = safe_float(fields[7])
+            self.alt_m = safe_float(fields[8])
+
+    def nav_pvt(self, pvt: NavPvt) -> None:
+        # Quality mapped as the tracker does.
+        self.sats = pvt.num_sv
+        if not (pvt.fix_ok and pvt.fix_type in (1, 2, 3, 4)):
+            self.quality = 0
+            return
+        self.lat, self.lon, self.alt_m = pvt.lat, pvt.lon, pvt.alt_msl_m
+        self.speed_knots, self.cog_deg = pvt.speed_mps * _KNOTS, pvt.heading_deg
+        if pvt.carr_soln:
+            self.quality = 4 if pvt.carr_soln == 2 else 5
+        elif pvt.fix_type == 1:
+            self.quality = 6
+        else:
+            self.quality = 2 if pvt.diff_soln else 1
+
+
+def _line_chunks(stream: IO[bytes]) -> Iterator[bytes]:
+    # READ_BYTES at a time, cut after the last complete line.
+    pending = b""
+    while True:
+        data = stream.read(READ_BYTES)
+        if not data:
+            break
+        data = pending + data
+        end = data.rfind(b"\n") + 1
+        pending = data[end:]
+        yield data[:end]
+    if pending:
+        yield pending
+
+
+def iter_points(stream: IO[bytes], stats: Optional[ParseStats] = None) -> Iterator[TrackPoint]:
+    # One point per epoch with a valid fix, in log order.
+    epoch = _Epoch(None)
+    date_key: Optional[str] = None
+    date_base: Optional[float] = None
+    for data in _line_chunks(stream):
+        for match in _POSITION_LINE.finditer(data):
+            line = match.group()
+            pvt: Optional[NavPvt] = None
+            start = line.find(UBX_TEXT_PREFIX)
+            if start >= 0:
+                frame = ubx_from_text(line[start:].rstrip())
+                parts = check_frame(frame) if frame is not None else None
+                pvt = decode_nav_pvt(parts[1]) if parts is not None else None
+                if pvt is None or pvt.t_utc is None:
+                    if stats is not None:
+                        stats.bad_checksum += 1
+                    continue
+                t_utc, date = pvt.t_utc, pvt.date
+            else:
+                split = split_nmea_bytes(line, stats, _SENTENCES)
+                if split is None:
+                    continue
+                _, sentence, fields = split
+                if len(fields) < 6 or not fields[0]:
+                    continue
+                t_utc, date = fields[0], None
+                if sentence == "RMC" and len(fields) > 8 and len(fields[8]) == 6:
+                    date = f"20{fields[8][4:6]}-{fields[8][2:4]}-{fields[8][0:2]}"
+            if t_utc != epoch.utc:
+                point = epoch.point(date_base)
+                if point is not None:
+                    yield point
+                epoch = _Epoch(t_utc)
+            if date is not None and date != date_key:
+                date_key = date
+                try:
+                    year, month, day = (int(p) for p in date.split("-"))
+                    date_base = float(calendar.timegm((year, month, day, 0, 0, 0)))
+                except ValueError:
+                    date_base = None
+            if pvt is not None:
+                epoch.nav_pvt(pvt)
+            elif sentence == "RMC":
+                epoch.rmc(fields)
+            else:
+                epoch.gga(fields)
+    point = epoch.point(date_base)
+    if point is not None:
+        yield point
+
+
+def iso_time(t: Optional[float]) -> str:
+    if t is None:
+        return ""
+    # Centiseconds, the resolution NMEA times have.
+    whole, centis = divmod(round(t * 100), 100)
+    text = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(whole))
+    return f"{text}.{centis:02d}Z" if centis else text + "Z"
+
+
+def _num(value: Optional[float], fmt: str) -> str:
+    return "" if value is None else fmt % value
+
+
+class TrackWriter:
+    # Streaming writer; segment() opens a segment, points() appends to it,
+    # close() finishes the document.
+
+    def __init__(self, out: IO[str], name: str) -> None:
+        self.out = out
+        self.name = name
+        self.segments = 0
+        self.points_written = 0
+
+    def segment(self) -> None:
+        self.segments += 1
+
+    def points(self, points: Sequence[TrackPoint]) -> None:
+        self.points_written += len(points)
+
+    def close(self) -> None:
+        pass
+
+
+class GpxWriter(TrackWriter):
+    def __init__(self, out: IO[str], name: str) -> None:
+        super().__init__(out, name)
+        out.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<gpx version="1.1" creator="NavScope" xmlns="http://www.topografix.com/GPX/1/1">\n'
+            f"  <trk>\n    <name>{escape(name)}</name>\n"
+        )
+
+    def segment(self) -> None:
+        if self.segments:
+            self.out.write("    </trkseg>\n")
+        self.out.write("    <trkseg>\n")
+        super().segment()
+
+    def points(self, points: Sequence[TrackPoint]) -> None:
+        lines = []
+        for p in points:
+            inner = []
+            if p.alt_m is not None:
+                inner.append("<ele>%.2f</ele>" % p.alt_m)
+            if p.time is not None:
+                inner.append(f"<time>{iso_time(p.time)}</time>")
+            fix = _GPX_FIX.get(p.quality)  # type: ignore[arg-type]
+            if fix is not None:
+                inner.append(f"<fix>{fix}</fix>")
+            if p.sats is not None:
+                inner.append(f"<sat>{p.sats}</sat>")
+            if p.hdop is not None:
+                inner.append("<hdop>%.2f</hdop>" % p.hdop)
+            lines.append('      <trkpt lat="%.7f" lon="%.7f">%s</trkpt>\n' % (p.lat, p.lon, "".join(inner)))
+        self.out.write("".join(lines))
+        super().points(points)
+
+    def close(self) -> None:
+        if self.segments:
+            self.out.write("    </trkseg>\n")
+        self.out.write("  </trk>\n</gpx>\n")
+
+
+class GeoJsonWriter(TrackWriter):
+    # One LineString feature per segment. A feature is only started with its
+    # second point, since a LineString needs two; single-fix segments are
+    # left out.
+
+    def __init__(self, out: IO[str], name: str) -> None:
+        super().__init__(out, name)
+        out.write('{"type": "FeatureCollection", "features": [')
+        self._first: Optional[TrackPoint] = None
+        self._last: Optional[TrackPoint] = None
+        self._count = 0
+        self._features = 0
+
+    def segment(self) -> None:
+        self._end_feature()
+        self._first = self._last = None
+        self._count = 0
+
+    def points(self, points: Sequence[TrackPoint]) -> None:
+        if not points:
+            return
+        parts = []
+        for p in points:
+            if self._count == 0:
+                self._first = p
+            elif self._count == 1:
+                parts.append(self._start_feature())
+                parts.append(self._coordinate(self._first))  # type: ignore[arg-type]
+                parts.append(",")
+                parts.append(self._coordinate(p))
+            else:
+                parts.append(",")
+                parts.append(self._coordinate(p))
+            self._count += 1
+            self._last = p
+        self.out.write("".join(parts))
+        self.points_written += len(points)
+
+    def close(self) -> None:
+        self._end_feature()
+        self.out.write("\n]}\n")
+
+    def _start_feature(self) -> str:
+        self._features += 1
+        self.segments += 1
+        sep = "," if self._features > 1 else ""
+        return f'{sep}\n{{"type": "Feature", "geometry": {{"type": "LineString", "coordinates": ['
+
+    def _end_feature(self) -> None:
+        if self._count < 2:
+            if self._count == 1:
+                self.points_written -= 1
+            return
+        first, last = self._first, self._last
+        props = [f'"name": {_json_str(self.name)}', f'"points": {self._count}']
+        if first is not None and first.time is not None:
+            props.append(f'"start": "{iso_time(first.time)}"')
+        if last is not None and last.time is not None:
+            props.append(f'"end": "{iso_time(last.time)}"')
+        self.out.write("]}, \"properties\": {%s}}" % ", ".join(props))
+
+    @staticmethod
+    def _coordinate(p: TrackPoint) -> str:
+        if p.alt_m is None:
+            return "[%.7f,%.7f]" % (p.lon, p.lat)
+        return "[%.7f,%.7f,%.2f]" % (p.lon, p.lat, p.alt_m)
+
+
+class CsvWriter(TrackWriter):
+    HEADER = "time,lat,lon,alt_m,speed_knots,cog_deg,hdop,quality,sats,segment\n"
+
+    def __init__(self, out: IO[str], name: str) -> None:
+        super().__init__(out, name)
+        out.write(self.HEADER)
+
+    def points(self, points: Sequence[TrackPoint]) -> None:
+        segment = self.segments - 1
+        self.out.write(
+            "".join(
+                "%s,%.7f,%.7f,%s,%s,%s,%s,%s,%s,%d\n"
+                % (
+                    iso_time(p.time),
+                    p.lat,
+                    p.lon,
+                    _num(p.alt_m, "%.2f"),
+                    _num(p.speed_knots, "%.2f"),
+                    _num(p.cog_deg, "%.1f"),
+                    _num(p.hdop, "%.2f"),
+                    "" if p.quality is None else p.quality,
+                    "" if p.sats is None else p.sats,
+                    segment,
+                )
+                for p in points
+            )
+        )
+        super().points(points)
+
+
+WRITERS = {"gpx": GpxWriter, "geojson": GeoJsonWriter, "csv": CsvWriter}
+
+
+def _json_str(text: str) -> str:
+    return '"%s"' % text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def open_log(path: str) -> IO[bytes]:
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def export_track(
+    stream: IO[bytes],
+    writer: TrackWriter,
+    tolerance_m: float = 0.0,
+    gap_s: float = DEFAULT_GAP_S,
+) -> Dict[str, int]:
+    # Streams the fixes of a log into writer and closes it.
+    stats = ParseStats()
+    simplifier: Optional[StreamSimplifier[TrackPoint]] = StreamSimplifier(tolerance_m) if tolerance_m > 0 else None
+    last_utc: Optional[float] = None
+    fixes = 0
+    for point in iter_points(stream, stats):
+        fixes += 1
+        # Seconds of day keep working before the first date and over midnight.
+        if last_utc is None or (point.utc_s - last_utc) % 86400.0 > gap_s:
+            if simplifier is not None:
+                writer.points(simplifier.flush())
+            writer.segment()
+        last_utc = point.utc_s
+        if simplifier is None:
+            writer.points((point,))
+        else:
+            done = simplifier.push(point.lat, point.lon, point)
+            if done:
+                writer.points(done)
+    if simplifier is not None:
+        writer.points(simplifier.flush())
+    writer.close()
+    return {
+        "fixes": fixes,
+        "points": writer.points_written,
+        "segments": writer.segments,
+        "bad_checksum": stats.bad_checksum,
+    }
+
+
+def output_path(log: str, directory: str, fmt: str) -> str:
+    name = os.path.basename(log)
+    for suffix in (".gz", ".nmea", ".log", ".txt"):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return os.path.join(directory, name + SUFFIXES[fmt])
+
+
+def export_file(log: str, target: str, fmt: str, tolerance_m: float, gap_s: float) -> Tuple[str, Dict[str, int]]:
+    # target "-" is stdout. Files are written under ".part" and renamed when
+    # complete, like recordings.
+    name = os.path.basename(log)
+    with open_log(log) as stream:
+        if target == "-":
+            return log, export_track(stream, WRITERS[fmt](sys.stdout, name), tolerance_m, gap_s)
+        part = target + ".part"
+        with open(part, "w", encoding="utf-8", newline="") as out:
+            result = export_track(stream, WRITERS[fmt](out, name), tolerance_m, gap_s)
+    os.replace(part, target)
+    return log, result
+
+
+def _run_export(args: Tuple[str, str, str, float, float]) -> Tuple[str, Dict[str, int]]:
+    return export_file(*args)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="NavScope track export")
+    parser.add_argument("paths", nargs="+", help="Log files or directories of logs")
+    parser.add_argument("--format", choices=FORMATS, default="gpx")
+    parser.add_argument("--output", default="-", help="Output file, or directory for several logs (default: stdout)")
+    parser.add_argument("--tolerance-m", type=float, default=0.0, help="Simplify to this many metres (0 = every fix)")
+    parser.add_argument("--gap-s", type=float, default=DEFAULT_GAP_S, help="Start a new segment after this long without a fix")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Logs exported in parallel")
+    return parser.parse_args()
+
+
+def main() -> int:
+    # find_logs is shared with the analytics tool (it needs no numpy).
+    from .analytics import find_logs
+
+    args = parse_args()
+    logs = find_logs(args.paths)
+    missing = [path for path in logs if not os.path.isfile(path)]
+    if missing:
+        print(f"[Export] Not found: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    if not logs:
+        print("[Export] No logs found", file=sys.stderr)
+        return 1
+    several = len(logs) > 1 or os.path.isdir(args.output)
+    if several:
+        if args.output == "-":
+            print("[Export] Several logs need --output DIR", file=sys.stderr)
+            return 1
+        os.makedirs(args.output, exist_ok=True)
+        jobs = [(log, output_path(log, args.output, args.format), args.format, args.tolerance_m, args.gap_s) for log in logs]
+    else:
+        jobs = [(logs[0], args.output, args.format, args.tolerance_m, args.gap_s)]
+    started = time.monotonic()
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs))) as pool:
+            results = list(pool.map(_run_export, jobs))
+    else:
+        results = [_run_export(job) for job in jobs]
+    for log, result in results:
+        print(
+            f"[Export] {log}: {result['fixes']} fixes -> {result['points']} points in {result['segments']} segments",
+            file=sys.stderr,
+        )
+    size_mb = sum(os.path.getsize(log) for log in logs) / (1024 * 1024)
+    elapsed = time.monotonic() - started
+    print(f"[Export] Done in {elapsed:.1f} s ({size_mb / max(elapsed, 1e-9):.1f} MB/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,179 @@
+"""
+Raw NMEA fan-out over TCP and UDP.
+
+Re-emits the validated sentences of one receiver to any number of downstream
+consumers (chart plotter, autopilot logger, ...), since only one process can
+own the serial port. The parse path only appends each line to a batch; the
+checksum check, framing and socket writes happen once per batch in a callback
+on the event loop. Each TCP subscriber may have at most max_buffer bytes
+pending in its socket; one that falls further behind is disconnected without
+slowing down anyone else.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .nmea_parser import nmea_checksum
+
+
+def clean_sentence(line: bytes) -> Optional[bytes]:
+    # The sentence without any TAG block prefix if it is a well-formed "$" or
+    # "!" sentence with a valid checksum, else None.
+    if line[:1] == b"\\":
+        line = line[line.find(b"\\", 1) + 1 :]
+    if len(line) < 10 or line[0] not in b"$!" or line[-3] != 0x2A:
+        return None
+    try:
+        if int(line[-2:], 16) != nmea_checksum(line[1:-3]):
+            return None
+    except ValueError:
+        return None
+    return line
+
+
+class _Subscriber:
+    __slots__ = ("writer", "peer", "connected_at", "sent_bytes")
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        peer = writer.get_extra_info("peername")
+        self.peer = f"{peer[0]}:{peer[1]}" if peer else "?"
+        self.connected_at = time.monotonic()
+        self.sent_bytes = 0
+
+
+class NmeaFanout:
+    def __init__(
+        self,
+        tcp_port: Optional[int] = None,
+        udp_target: Optional[Tuple[str, int]] = None,
+        host: str = "0.0.0.0",
+        max_buffer: int = 256 * 1024,
+    ) -> None:
+        self.tcp_port = tcp_port
+        self.udp_target = udp_target
+        self.host = host
+        self.max_buffer = max_buffer
+        self._batch: List[bytes] = []
+        self._scheduled = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._udp: Optional[asyncio.DatagramTransport] = None
+        self._subscribers: Dict[asyncio.StreamWriter, _Subscriber] = {}
+        self._handlers: Set[asyncio.Task] = set()
+        self.sentences = 0
+        self.rejected = 0
+        self.disconnected_slow = 0
+        self.udp_dropped = 0
+
+    async def start(self) -> None:
+        # Listening failures (port in use, bad address) are reported and the
+        # fan-out stays off; the receiver keeps running.
+        loop = self._loop = asyncio.get_running_loop()
+        if self.tcp_port is not None:
+            try:
+                self._server = await asyncio.start_server(self._handle_client, self.host, self.tcp_port)
+                print(f"[NmeaFanout] Serving NMEA on tcp://{self.host}:{self.tcp_port}")
+            except OSError as exc:
+                print(f"[NmeaFanout] Could not listen on {self.host}:{self.tcp_port}: {exc}")
+        if self.udp_target is not None:
+            try:
+                self._udp, _ = await loop.create_datagram_endpoint(
+                    asyncio.DatagramProtocol, local_addr=("0.0.0.0", 0), allow_broadcast=True
+                )
+                print(f"[NmeaFanout] Sending NMEA to udp://{self.udp_target[0]}:{self.udp_target[1]}")
+            except OSError as exc:
+                print(f"[NmeaFanout] Could not open UDP socket: {exc}")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+        for writer in list(self._subscribers):
+            writer.transport.abort()
+        # Let the connection handlers see the abort and finish.
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        if self._udp is not None:
+            self._udp.close()
+
+    def publish(self, line: bytes) -> None:
+        # Called for every received line on the event loop thread.
+        self._batch.append(line)
+        if not self._scheduled and self._loop is not None:
+            self._scheduled = True
+            self._loop.call_soon(self._flush)
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        return {
+            "tcp_port": self.tcp_port if self._server is not None else None,
+            "udp_target": f"{self.udp_target[0]}:{self.udp_target[1]}" if self._udp is not None else None,
+            "sentences": self.sentences,
+            "rejected": self.rejected,
+            "disconnected_slow": self.disconnected_slow,
+            "udp_dropped": self.udp_dropped,
+            "subscribers": [
+                {
+                    "peer": sub.peer,
+                    "connected_s": round(now - sub.connected_at, 1),
+                    "sent_bytes": sub.sent_bytes,
+                    "pending_bytes": sub.writer.transport.get_write_buffer_size(),
+                }
+                for sub in self._subscribers.values()
+            ],
+        }
+
+    def _flush(self) -> None:
+        self._scheduled = False
+        batch = self._batch
+        self._batch = []
+        sentences = []
+        for line in batch:
+            sentence = clean_sentence(line)
+            if sentence is None:
+                self.rejected += 1
+            else:
+                sentences.append(sentence)
+        if not sentences:
+            return
+        self.sentences += len(sentences)
+        data = b"\r\n".join(sentences) + b"\r\n"
+        for writer, sub in list(self._subscribers.items()):
+            transport = writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() + len(data) > self.max_buffer:
+                self.disconnected_slow += 1
+                print(f"[NmeaFanout] Disconnecting slow subscriber {sub.peer}")
+                transport.abort()
+                del self._subscribers[writer]
+                continue
+            writer.write(data)
+            sub.sent_bytes += len(data)
+        udp = self._udp
+        if udp is not None:
+            # One sentence per datagram, as most NMEA-over-UDP listeners expect.
+            if udp.get_write_buffer_size() > self.max_buffer:
+                self.udp_dropped += len(sentences)
+                return
+            for sentence in sentences:
+                udp.sendto(sentence + b"\r\n", self.udp_target)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        sub = _Subscriber(writer)
+        self._subscribers[writer] = sub
+        task = asyncio.current_task()
+        self._handlers.add(task)  # type: ignore[arg-type]
+        print(f"[NmeaFanout] Subscriber connected: {sub.peer}")
+        try:
+            # Subscribers only listen; input is read and discarded so a close
+            # from their side is noticed.
+            while await reader.read(4096):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self._subscribers.pop(writer, None)
+            self._handlers.discard(task)  # type: ignore[arg-type]
+            writer.close()
+            print(f"[NmeaFanout] Subscriber disconnected: {sub.peer}")
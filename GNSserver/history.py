@@ -0,0 +1,325 @@
+"""
+Position, DOP and SNR history.
+
+Published snapshots are appended to columnar ring buffers (one typed array per
+field plus a shared time column), so a day or more of 1-10 Hz data costs tens
+of bytes per epoch and memory never grows past the configured row counts.
+Every BLOCK rows a min/max/sum summary is stored per column; downsampled
+queries combine whole-block summaries and only scan raw rows at window edges,
+so reading back hours of data at any resolution stays cheap.
+
+Times are Unix seconds taken from the receiver's UTC time and date.
+"""
+
+import calendar
+import math
+import time
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from .tracker import GnssState
+
+BLOCK = 64
+# Upper bound on windows per query (keeps responses and scan work bounded).
+MAX_WINDOWS = 5000
+
+# (name, array typecode); lat/lon need doubles for sub-metre resolution.
+FIX_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("lat", "d"),
+    ("lon", "d"),
+    ("alt_m", "f"),
+    ("speed_knots", "f"),
+    ("cog_deg", "f"),
+    ("pdop", "f"),
+    ("hdop", "f"),
+    ("vdop", "f"),
+    ("used", "f"),
+    ("in_view", "f"),
+)
+SNR_PREFIX = "snr:"
+
+_NAN = float("nan")
+_INF = float("inf")
+
+Window = Tuple[float, float, float, int]
+
+
+class SeriesTable:
+    # Ring of rows with strictly increasing times. Rows are addressed by
+    # absolute index (rows ever appended); the ring holds the newest
+    # `capacity` of them. Arrays grow on demand up to capacity.
+
+    def __init__(self, columns: Sequence[Tuple[str, str]], capacity: int) -> None:
+        self.capacity = max(1, -(-capacity // BLOCK)) * BLOCK
+        self.names = [name for name, _ in columns]
+        self.t = array("d")
+        self.cols = [array(typecode) for _, typecode in columns]
+        # Per column block summaries: min, max, sum, non-NaN count.
+        self.blocks = [(array("d"), array("d"), array("d"), array("I")) for _ in columns]
+        self.count = 0
+
+    @property
+    def oldest(self) -> int:
+        return max(0, self.count - self.capacity)
+
+    @property
+    def first_t(self) -> Optional[float]:
+        return self.t[self.oldest % self.capacity] if self.count else None
+
+    @property
+    def last_t(self) -> Optional[float]:
+        return self.t[(self.count - 1) % self.capacity] if self.count else None
+
+    def nbytes(self) -> int:
+        arrays = [self.t, *self.cols, *(a for block in self.blocks for a in block)]
+        return sum(len(a) * a.itemsize for a in arrays)
+
+    def append(self, t: float, values: Sequence[float]) -> None:
+        # values in column order, NaN where missing.
+        i = self.count % self.capacity
+        if len(self.t) < self.capacity:
+            self.t.append(t)
+            for col, value in zip(self.cols, values):
+                col.append(value)
+        else:
+            self.t[i] = t
+            for col, value in zip(self.cols, values):
+                col[i] = value
+        self.count += 1
+        if self.count % BLOCK == 0:
+            self._summarize(self.count // BLOCK - 1)
+
+    def _summarize(self, block: int) -> None:
+        slot = block % (self.capacity // BLOCK)
+        start = block * BLOCK
+        for col, (mins, maxs, sums, counts) in zip(self.cols, self.blocks):
+            values = [v for v in _ring(col, start, start + BLOCK, self.capacity) if v == v]
+            summary = (min(values), max(values), math.fsum(values), len(values)) if values else (_INF, -_INF, 0.0, 0)
+            if slot == len(counts):
+                mins.append(summary[0])
+                maxs.append(summary[1])
+                sums.append(summary[2])
+                counts.append(summary[3])
+            else:
+                mins[slot], maxs[slot], sums[slot], counts[slot] = summary
+
+    def row_at(self, t: float) -> int:
+        # First absolute row with time >= t.
+        lo, hi = self.oldest, self.count
+        times, capacity = self.t, self.capacity
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[mid % capacity] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def aggregate(self, column: int, start: int, end: int) -> Window:
+        # (min, max, sum, count) of the non-NaN values in rows [start, end).
+        col = self.cols[column]
+        capacity = self.capacity
+        first_block = -(-start // BLOCK)
+        last_block = end // BLOCK
+        if first_block >= last_block:
+            return _raw(_ring(col, start, end, capacity))
+        mins, maxs, sums, counts = self.blocks[column]
+        slots = capacity // BLOCK
+        parts = [
+            _raw(_ring(col, start, first_block * BLOCK, capacity)),
+            (
+                min(_ring(mins, first_block, last_block, slots)),
+                max(_ring(maxs, first_block, last_block, slots)),
+                math.fsum(_ring(sums, first_block, last_block, slots)),
+                sum(_ring(counts, first_block, last_block, slots)),
+            ),
+            _raw(_ring(col, last_block * BLOCK, end, capacity)),
+        ]
+        return (
+            min(part[0] for part in parts),
+            max(part[1] for part in parts),
+            sum(part[2] for part in parts),
+            sum(part[3] for part in parts),
+        )
+
+
+def _ring(arr: array, start: int, end: int, size: int) -> array:
+    # Absolute positions [start, end) of a ring array with `size` slots.
+    i = start % size
+    j = i + (end - start)
+    if j <= size:
+        return arr[i:j]
+    return arr[i:] + arr[: j - size]
+
+
+def _raw(values: Sequence[float]) -> Window:
+    values = [v for v in values if v == v]
+    if not values:
+        return (_INF, -_INF, 0.0, 0)
+    return (min(values), max(values), math.fsum(values), len(values))
+
+
+def _value(value: Optional[float]) -> float:
+    return _NAN if value is None else value
+
+
+class HistoryStore:
+    # Fed by GnssTracker on every published snapshot. Fix/DOP columns get a
+    # row per epoch; per-satellite SNR is sampled every snr_interval_s into
+    # one table per satellite (at most max_sats, least recently seen dropped).
+
+    def __init__(
+        self,
+        rows: int = 262144,
+        sat_rows: int = 21600,
+        snr_interval_s: float = 1.0,
+        max_sats: int = 128,
+    ) -> None:
+        # Defaults: ~3 days of 1 Hz fixes (~7 h at 10 Hz), 6 h of SNR per
+        # satellite; about 14 MB and 250 KB per satellite when full.
+        self.rows = rows
+        self.sat_rows = sat_rows
+        self.snr_interval_s = snr_interval_s
+        self.max_sats = max_sats
+        self.clear()
+
+    def clear(self) -> None:
+        self.fix = SeriesTable(FIX_COLUMNS, self.rows)
+        self.snr: Dict[str, SeriesTable] = {}
+        self._sat_keys: Dict[Tuple[str, int], str] = {}
+        self.skipped = 0
+        self._last_snr_t = -_INF
+        self._date: Optional[str] = None
+        self._date_base = 0.0
+
+    def record(self, state: "GnssState", utc_s: float) -> None:
+        # utc_s: seconds of day parsed from state.t_utc.
+        t = self._timestamp(state.utc_date, utc_s)
+        last = self.fix.last_t
+        if last is not None and t <= last:
+            # Re-published epoch or a time step backwards.
+            self.skipped += 1
+            return
+        self.fix.append(
+            t,
+            (
+                _value(state.lat),
+                _value(state.lon),
+                _value(state.alt_m),
+                _value(state.speed_knots),
+                _value(state.cog_deg),
+                _value(state.pdop),
+                _value(state.hdop),
+                _value(state.vdop),
+                _value(state.used_count),
+                _value(state.in_view_count),
+            ),
+        )
+        if t - self._last_snr_t < self.snr_interval_s:
+            return
+        self._last_snr_t = t
+        tables = self.snr
+        keys = self._sat_keys
+        for sat in state.sats:
+            key = keys.get((sat.gnssid, sat.prn))
+            if key is None:
+                key = keys[(sat.gnssid, sat.prn)] = f"{sat.gnssid}-{sat.prn:02d}"
+            table = tables.get(key)
+            if table is None:
+                if len(tables) >= self.max_sats:
+                    stale = min(tables, key=lambda k: tables[k].last_t or 0.0)
+                    del tables[stale]
+                table = tables[key] = SeriesTable((("snr", "f"),), self.sat_rows)
+            table.append(t, (_value(sat.snr),))
+
+    def _timestamp(self, utc_date: Optional[str], utc_s: float) -> float:
+        # Unix time from the receiver's date (YYYY-MM-DD) and time of day.
+        # Without a date yet, take the host's UTC day nearest to it.
+        if utc_date != self._date:
+            self._date = utc_date
+            try:
+                year, month, day = (int(p) for p in utc_date.split("-"))  # type: ignore[union-attr]
+                self._date_base = float(calendar.timegm((year, month, day, 0, 0, 0)))
+            except (AttributeError, ValueError):
+                self._date_base = -1.0
+        if self._date_base < 0:
+            return round((time.time() - utc_s) / 86400.0) * 86400.0 + utc_s
+        return self._date_base + utc_s
+
+    def series(self) -> List[str]:
+        return list(self.fix.names) + [SNR_PREFIX + key for key in sorted(self.snr)]
+
+    def stats(self) -> Dict[str, object]:
+        tables = [self.fix, *self.snr.values()]
+        return {
+            "start": self.fix.first_t,
+            "end": self.fix.last_t,
+            "rows": min(self.fix.count, self.fix.capacity),
+            "capacity": self.fix.capacity,
+            "satellites": len(self.snr),
+            "skipped": self.skipped,
+            "bytes": sum(table.nbytes() for table in tables),
+        }
+
+    def query(
+        self, names: Sequence[str], start: Optional[float], end: Optional[float], step: Optional[float], points: int = 500
+    ) -> Dict[str, object]:
+        # min/max/mean per window of `step` seconds over [start, end).
+        # Missing bounds default to the stored range; a missing step splits
+        # it into `points` windows. Raises ValueError on bad input.
+        if start is None:
+            start = self.fix.first_t or 0.0
+        if end is None:
+            end = (self.fix.last_t or 0.0) + 1e-3
+        if not (math.isfinite(start) and math.isfinite(end)):
+            raise ValueError("start and end must be finite")
+        if end <= start:
+            raise ValueError("end must be after start")
+        if step is None:
+            step = (end - start) / max(1, min(points, MAX_WINDOWS))
+        if not math.isfinite(step) or step <= 0:
+            raise ValueError("step must be a finite number > 0")
+        # Finite bounds can still be far enough apart to overflow to inf.
+        span = (end - start) / step
+        if span > MAX_WINDOWS:
+            raise ValueError(f"{span:.0f} windows requested; at most {MAX_WINDOWS}")
+        windows = math.ceil(span)
+        edges = [start + i * step for i in range(windows)] + [end]
+        result: Dict[str, object] = {}
+        for name in names:
+            table, column = self._column(name)
+            if table is None:
+                # Satellite not (or no longer) tracked.
+                result[name] = {"min": [None] * windows, "max": [None] * windows, "mean": [None] * windows}
+                continue
+            rows = [table.row_at(edge) for edge in edges]
+            mins: List[Optional[float]] = []
+            maxs: List[Optional[float]] = []
+            means: List[Optional[float]] = []
+            for i in range(windows):
+                lo, hi, total, n = table.aggregate(column, rows[i], rows[i + 1])
+                if n:
+                    # 7 decimals: ~1 cm in lat/lon, and hides float32 noise.
+                    mins.append(round(lo, 7))
+                    maxs.append(round(hi, 7))
+                    means.append(round(total / n, 7))
+                else:
+                    mins.append(None)
+                    maxs.append(None)
+                    means.append(None)
+            result[name] = {"min": mins, "max": maxs, "mean": means}
+        return {"start": start, "end": end, "step": step, "t": edges[:-1], "series": result}
+
+    def _column(self, name: str) -> Tuple[Optional[SeriesTable], int]:
+        if name.startswith(SNR_PREFIX):
+            key = name[len(SNR_PREFIX) :]
+            gnssid, _, prn = key.rpartition("-")
+            try:
+                key = f"{gnssid}-{int(prn):02d}"
+            except ValueError:
+                pass
+            return self.snr.get(key), 0
+        if name not in self.fix.names:
+            raise ValueError(f"unknown series {name!r}")
+        return self.fix, self.fix.names.index(name)
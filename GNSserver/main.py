@@ -14,7 +14,8 @@ import time
 from collections import deque
 from typing import Deque, Optional
 
-from .nmea_reader import NmeaReader
+from .nmea_reader import READ_MODES, NmeaReader
+from .recorder import add_record_args, recorder_from_args
 from .tracker import GnssTracker, SatInfo
 
 
@@ -23,7 +24,10 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--port", help="Serial port (e.g., COM7)")
     parser.add_argument("--baud", type=int, default=9600)
     parser.add_argument("--file", dest="file_path", help="Replay NMEA log file")
-    parser.add_argument("--replay-rate", type=float, default=1.0)
+    parser.add_argument("--replay-rate", type=float, default=1.0, help="Replay speed (0 = as fast as possible)")
+    parser.add_argument("--seek", help="Start replay at seconds into the log or at UTC HH:MM:SS")
+    parser.add_argument("--read-mode", choices=READ_MODES, default="bulk", help="Serial read strategy")
+    add_record_args(parser)
     return parser.parse_args()
 
 
@@ -89,6 +93,14 @@ def render(
             vdop=fmt_opt(state.vdop, "{:.2f}"),
         )
     )
+    lines.append(
+        "Err (GST): lat={lat} lon={lon} alt={alt} m | mode={mode}".format(
+            lat=fmt_opt(state.err_lat_m, "{:.2f}"),
+            lon=fmt_opt(state.err_lon_m, "{:.2f}"),
+            alt=fmt_opt(state.err_alt_m, "{:.2f}"),
+            mode=state.pos_mode or "--",
+        )
+    )
     lines.append("-")
     lines.append("PRN | El | Az | SNR | Used")
     lines.append("----+----+----+-----+------")
@@ -179,32 +191,42 @@ def main() -> int:
     if use_ansi:
         enter_alt_screen(use_ansi)
         atexit.register(exit_alt_screen, use_ansi)
-    reader = NmeaReader(args.port, args.baud, args.file_path, args.replay_rate)
+    reader = NmeaReader(args.port, args.baud, args.file_path, args.replay_rate, args.read_mode)
+    recorder = recorder_from_args(args)
     tracker = GnssTracker()
     last_render = 0.0
     last_line_count = 0
     last_line_time: Optional[float] = None
     dt_samples: Deque[float] = deque(maxlen=50)
-    gsv_updated = False
+    published = False
 
     try:
+        if args.seek and args.file_path:
+            reader.replay.seek_spec(args.seek)
+        if recorder is not None:
+            recorder.start()
         for line, t_mono in reader.iter_lines():
+            if recorder is not None:
+                recorder.write(line, t_mono)
             if last_line_time is not None:
                 dt_samples.append((t_mono - last_line_time) * 1000)
             last_line_time = t_mono
-            gsv_updated = tracker.update_from_line(line) or gsv_updated
+            published = tracker.update_from_line(line, t_mono) or published
             now = t_mono
-            if now - last_render >= 1.0 or gsv_updated:
+            if now - last_render >= 1.0 or published:
                 last_line_count = render(
-                    tracker.state, now, last_line_time, dt_samples, last_line_count, use_ansi
+                    tracker.snapshot, now, last_line_time, dt_samples, last_line_count, use_ansi
                 )
                 last_render = now
-                gsv_updated = False
+                published = False
     except KeyboardInterrupt:
         return 0
     except Exception as exc:
         sys.stderr.write(f"Error: {exc}\n")
         return 1
+    finally:
+        if recorder is not None:
+            recorder.stop()
 
     return 0
 
@@ -1,32 +1,132 @@
 """
 NMEA parsing helpers.
 
-Lightweight parsing for sentence splitting, time fields, and coordinate conversion.
+Lightweight parsing for sentence splitting, checksum validation, time fields,
+and coordinate conversion.
 """
 
-import re
-from typing import List, Optional, Tuple
-
-_NMEA_RE = re.compile(r"^\$(?P<type>[A-Z0-9]{5}),(?P<body>.*)")
-
-
-def split_nmea(line: str) -> Optional[Tuple[str, str, List[str]]]:
-    # Strip checksum and split into talker/sentence and field list.
-    line = line.strip()
-    if not line.startswith("$"):
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+# Sentences carrying a UTC time in their first field, for replay timing.
+_TIME_SENTENCES: Dict[str, int] = {"RMC": 1, "GGA": 1}
+
+_HEADER_CACHE_MAX = 256
+_MASK_512 = (1 << 512) - 1
+_MASK_256 = (1 << 256) - 1
+_MASK_128 = (1 << 128) - 1
+_MASK_64 = (1 << 64) - 1
+
+
+@dataclass
+class ParseStats:
+    # Running counters for the byte-level parser.
+    accepted: int = 0
+    unchecked: int = 0
+    skipped: int = 0
+    bad_checksum: int = 0
+    malformed: int = 0
+
+    @property
+    def rejected(self) -> int:
+        return self.bad_checksum + self.malformed
+
+
+_headers: Dict[bytes, Tuple[str, str]] = {}
+_HEX: Dict[bytes, int] = {b"%02X" % v: v for v in range(256)}
+_HEX.update({b"%02x" % v: v for v in range(256)})
+
+
+def split_nmea_bytes(
+    raw: bytes, stats: Optional[ParseStats] = None, sentences: Optional[Mapping[str, int]] = None
+) -> Optional[Tuple[str, str, List[str]]]:
+    # Validate the XOR checksum and split a raw sentence straight from the port.
+    # Sentences without a checksum are accepted but counted as unchecked.
+    # `sentences` maps the sentence IDs wanted to the number of leading fields
+    # to split (-1 for all); anything else is skipped on its header alone,
+    # before the checksum or body are touched.
+    data = raw.strip()
+    if data[:1] == b"\\":
+        # NMEA 4.10 TAG block (e.g. the recorder's receive time); ignored.
+        end = data.find(b"\\", 1)
+        if end > 0:
+            data = data[end + 1 :]
+    # "$" + 5-char address + ","
+    if len(data) < 7 or data[0] != 0x24 or data[6] != 0x2C:
+        if stats is not None:
+            stats.malformed += 1
         return None
-    if "*" in line:
-        line = line.split("*", 1)[0]
-    m = _NMEA_RE.match(line)
-    if not m:
+    header = data[1:6]
+    names = _headers.get(header)
+    if names is None:
+        if not header.isalnum():
+            if stats is not None:
+                stats.malformed += 1
+            return None
+        text = header.decode("ascii")
+        names = (text[:2], text[2:])
+        if len(_headers) < _HEADER_CACHE_MAX:
+            _headers[header] = names
+    talker, sentence = names
+    if sentences is None:
+        limit = -1
+    else:
+        limit = sentences.get(sentence)
+        if limit is None:
+            if stats is not None:
+                stats.skipped += 1
+            return None
+    checked = data[-3] == 0x2A  # "*hh" always closes the sentence
+    if checked:
+        body = data[7:-3]
+        if _HEX.get(data[-2:]) != nmea_checksum(data[1:-3]):
+            if stats is not None:
+                stats.bad_checksum += 1
+            return None
+    elif 0x2A in data:
+        if stats is not None:
+            stats.malformed += 1
         return None
-    msg_type = m.group("type")
-    talker = msg_type[:2]
-    sentence = msg_type[2:]
-    fields = m.group("body").split(",")
+    else:
+        body = data[7:]
+    if stats is not None:
+        if checked:
+            stats.accepted += 1
+        else:
+            stats.unchecked += 1
+    fields = body.decode("latin-1").split(",", limit)
     return talker, sentence, fields
 
 
+def split_nmea(
+    line: Union[str, bytes], stats: Optional[ParseStats] = None, sentences: Optional[Mapping[str, int]] = None
+) -> Optional[Tuple[str, str, List[str]]]:
+    # Text entry point; validates the checksum the same way as the byte parser.
+    if isinstance(line, str):
+        line = line.encode("ascii", errors="ignore")
+    return split_nmea_bytes(line, stats, sentences)
+
+
+def nmea_checksum(data: bytes) -> int:
+    # XOR of every byte between "$" and "*". Sentences are at most 82 chars, so
+    # the bytes are folded as one integer, halving its width each step, rather
+    # than looped over one at a time.
+    if len(data) > 128:
+        value = 0
+        for b in data:
+            value ^= b
+        return value
+    v = int.from_bytes(data, "little")
+    v = (v >> 512) ^ (v & _MASK_512)
+    v = (v >> 256) ^ (v & _MASK_256)
+    v = (v >> 128) ^ (v & _MASK_128)
+    v = (v >> 64) ^ (v & _MASK_64)
+    v ^= v >> 32
+    v ^= v >> 16
+    v ^= v >> 8
+    return v & 0xFF
+
+
 def parse_time_field(t_str: str) -> Optional[float]:
     # Convert HHMMSS.SS to seconds since midnight.
     if not t_str:
@@ -41,15 +141,13 @@ def parse_time_field(t_str: str) -> Optional[float]:
         return None
 
 
-def parse_time_from_line(line: str) -> Optional[float]:
+def parse_time_from_line(line: Union[str, bytes]) -> Optional[float]:
     # Extract time from common RMC/GGA sentences for replay timing.
-    parts = split_nmea(line)
+    parts = split_nmea(line, sentences=_TIME_SENTENCES)
     if not parts:
         return None
-    _, sentence, fields = parts
-    if sentence == "RMC" and len(fields) > 1:
-        return parse_time_field(fields[0])
-    if sentence == "GGA" and len(fields) > 1:
+    _, _, fields = parts
+    if len(fields) > 1:
         return parse_time_field(fields[0])
     return None
 
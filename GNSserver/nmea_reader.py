@@ -1,25 +1,149 @@
 """
 NMEA input reader.
 
-Supports live serial input via pyserial or replay from a log file with timing.
+Supports live serial input via pyserial or replay from a log file with timing
+(see replay.LogReplay), either as a blocking generator or as an async
+generator on the event loop. In bulk read mode u-blox UBX frames on the same
+port are split out of the NMEA text and yielded as whole frames.
 """
 
+import asyncio
+import sys
 import time
-from typing import Generator, Optional, Tuple
+from typing import AsyncGenerator, Generator, List, Optional, Tuple
 
 import serial
 
-from .nmea_parser import parse_time_from_line
+from .replay import LogReplay
+from .ubx import UBX_MAX_PAYLOAD, UBX_SYNC, plausible_header, ubx_checksum
+
+READ_MODES = ("bulk", "line")
+# Longest run of bytes kept without a line ending before it is discarded as noise.
+MAX_PENDING = 4096
+# With UBX in the stream: room for the largest frame and a line after it.
+MAX_PENDING_MIXED = UBX_MAX_PAYLOAD + 8 + MAX_PENDING
+
+
+class NmeaFramer:
+    # Frames sentences out of arbitrary read chunks using one reusable buffer.
+    # A partial sentence at the end of a chunk is kept for the next feed().
+    # NMEA is 7-bit ASCII, so a buffer without a 0xB5 byte holds no UBX and
+    # takes the plain line path.
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self.dropped_bytes = 0
+        self.ubx_frames = 0
+        self.ubx_bad_checksum = 0
+
+    def feed(self, chunk: bytes, t_rx: float) -> List[Tuple[bytes, float]]:
+        # Every sentence completed by this chunk gets the chunk's receive time.
+        buf = self._buf
+        buf += chunk
+        if 0xB5 in buf:
+            return self._feed_mixed(t_rx)
+        end = buf.rfind(b"\n")
+        if end < 0:
+            if len(buf) > MAX_PENDING:
+                self.dropped_bytes += len(buf)
+                buf.clear()
+            return []
+        complete = buf[:end]
+        del buf[: end + 1]
+        out = []
+        for line in complete.split(b"\n"):
+            line = line.strip()
+            if line:
+                out.append((bytes(line), t_rx))
+        return out
+
+    def _feed_mixed(self, t_rx: float) -> List[Tuple[bytes, float]]:
+        # Walk the buffer frame by frame: text before a sync pair is split
+        # into lines, a UBX frame is taken whole once its length and checksum
+        # check out. A bad frame gives up only its sync bytes, so framing
+        # resumes at the next sync pair or line; an implausible header is
+        # rejected before waiting for its payload.
+        buf = self._buf
+        out: List[Tuple[bytes, float]] = []
+        pos = 0
+        while True:
+            start = buf.find(UBX_SYNC, pos)
+            if start < 0:
+                end = buf.rfind(b"\n", pos)
+                if end >= 0:
+                    _split_lines(buf[pos:end], t_rx, out)
+                    pos = end + 1
+                break
+            if start > pos:
+                _split_lines(buf[pos:start], t_rx, out)
+                pos = start
+            if len(buf) - start < 6:
+                break
+            length = buf[start + 4] | buf[start + 5] << 8
+            if not plausible_header(bytes(buf[start + 2 : start + 4]), length):
+                self.ubx_bad_checksum += 1
+                pos = start + 2
+                continue
+            end = start + 8 + length
+            if end > len(buf):
+                break
+            if ubx_checksum(buf[start + 2 : end - 2]) != buf[end - 2 : end]:
+                self.ubx_bad_checksum += 1
+                pos = start + 2
+                continue
+            out.append((bytes(buf[start:end]), t_rx))
+            self.ubx_frames += 1
+            pos = end
+        del buf[:pos]
+        # A frame still waiting for its payload is under UBX_MAX_PAYLOAD + 8
+        # bytes, so only text without a line ending can overflow; a header
+        # that promised too much fails its checksum and is skipped above.
+        if len(buf) > MAX_PENDING_MIXED:
+            self.dropped_bytes += len(buf)
+            buf.clear()
+        return out
+
+    def reset(self) -> None:
+        self._buf.clear()
+
+
+def _split_lines(data: bytearray, t_rx: float, out: List[Tuple[bytes, float]]) -> None:
+    for line in data.split(b"\n"):
+        line = line.strip()
+        if line:
+            out.append((bytes(line), t_rx))
 
 
 class NmeaReader:
-    def __init__(self, port: Optional[str], baud: int, file_path: Optional[str], replay_rate: float) -> None:
+    def __init__(
+        self,
+        port: Optional[str],
+        baud: int,
+        file_path: Optional[str],
+        replay_rate: float,
+        read_mode: str = "bulk",
+    ) -> None:
+        if read_mode not in READ_MODES:
+            raise ValueError(f"read_mode must be one of {READ_MODES}")
         self.port = port
         self.baud = baud
         self.file_path = file_path
         self.replay_rate = replay_rate
+        self.read_mode = read_mode
+        self.framer = NmeaFramer()
+        self.read_calls = 0
+        self._replay: Optional[LogReplay] = None
 
-    def iter_lines(self) -> Generator[Tuple[str, float], None, None]:
+    @property
+    def replay(self) -> Optional[LogReplay]:
+        # Seek/pause/rate controls for file replay; opened (and indexed) on
+        # first use.
+        if self._replay is None and self.file_path:
+            self._replay = LogReplay(self.file_path, self.replay_rate)
+        return self._replay
+
+    def iter_lines(self) -> Generator[Tuple[bytes, float], None, None]:
+        # Yields raw sentences (undecoded bytes) with a monotonic receive time.
         if self.file_path:
             yield from self._iter_file()
         else:
@@ -27,8 +151,9 @@ class NmeaReader:
                 raise ValueError("--port is required for live serial mode")
             yield from self._iter_serial()
 
-    def _iter_serial(self) -> Generator[Tuple[str, float], None, None]:
-        # Read line-by-line from a serial port using a short timeout.
+    def _iter_serial(self) -> Generator[Tuple[bytes, float], None, None]:
+        # Read from a serial port using a short timeout, either everything the
+        # driver has buffered at once (bulk) or one readline() per sentence.
         # If the device disappears, keep retrying until it returns.
         backoff = 1.0
         warned = False
@@ -39,14 +164,11 @@ class NmeaReader:
                         print(f"[NmeaReader] Serial restored on {self.port}.")
                     warned = False
                     backoff = 1.0
-                    while True:
-                        raw = ser.readline()
-                        if not raw:
-                            continue
-                        line = raw.decode("ascii", errors="ignore").strip()
-                        if not line:
-                            continue
-                        yield line, time.monotonic()
+                    self.framer.reset()
+                    if self.read_mode == "bulk":
+                        yield from self._read_bulk(ser)
+                    else:
+                        yield from self._read_lines(ser)
             except serial.SerialException as exc:
                 if not warned:
                     print(f"[NmeaReader] Serial lost on {self.port}. Waiting for GPS...")
@@ -54,28 +176,109 @@ class NmeaReader:
                 time.sleep(backoff)
                 backoff = min(backoff * 1.5, 5.0)
 
-    def _iter_file(self) -> Generator[Tuple[str, float], None, None]:
-        # Replay a log file and approximate timing based on NMEA timestamps.
-        last_t_utc = None
-        with open(self.file_path, "r", encoding="ascii", errors="ignore") as f:
-            for raw in f:
-                line = raw.strip()
-                if not line:
-                    continue
-                t_utc = parse_time_from_line(line)
-                delay = self._compute_delay(last_t_utc, t_utc)
-                if delay > 0:
-                    time.sleep(delay)
-                last_t_utc = t_utc if t_utc is not None else last_t_utc
-                yield line, time.monotonic()
-
-    def _compute_delay(self, last_t_utc: Optional[float], t_utc: Optional[float]) -> float:
-        # Compute a small replay delay even when timestamps are missing or invalid.
-        if t_utc is None or last_t_utc is None:
-            return 0.1 / max(self.replay_rate, 0.01)
-        dt = t_utc - last_t_utc
-        if dt < 0:
-            dt += 24 * 3600
-        if dt <= 0 or dt > 10:
-            return 0.1 / max(self.replay_rate, 0.01)
-        return dt / max(self.replay_rate, 0.01)
+    def _read_bulk(self, ser: serial.Serial) -> Generator[Tuple[bytes, float], None, None]:
+        # Block for the first byte, then drain whatever else is waiting in one
+        # call; sentences are framed from the accumulated bytes.
+        framer = self.framer
+        while True:
+            chunk = ser.read(ser.in_waiting or 1)
+            t_rx = time.monotonic()
+            self.read_calls += 1
+            if chunk:
+                yield from framer.feed(chunk, t_rx)
+
+    def _read_lines(self, ser: serial.Serial) -> Generator[Tuple[bytes, float], None, None]:
+        # NMEA only: binary UBX frames need the bulk framer.
+        while True:
+            line = ser.readline()
+            t_rx = time.monotonic()
+            self.read_calls += 1
+            line = line.strip()
+            if not line:
+                continue
+            yield line, t_rx
+
+    async def aiter_lines(self) -> AsyncGenerator[Tuple[bytes, float], None]:
+        # Same contract as iter_lines, but waits on the running event loop
+        # instead of blocking a thread.
+        if self.file_path:
+            async for item in self._aiter_file():
+                yield item
+        else:
+            if not self.port:
+                raise ValueError("--port is required for live serial mode")
+            async for item in self._aiter_serial():
+                yield item
+
+    async def _aiter_serial(self) -> AsyncGenerator[Tuple[bytes, float], None]:
+        # Non-blocking serial reads driven by the loop's fd readiness. Windows
+        # event loops cannot watch serial handles, so reads are handed to the
+        # default executor there; framing and parsing still happen on the loop.
+        loop = asyncio.get_running_loop()
+        use_executor = sys.platform == "win32"
+        backoff = 1.0
+        warned = False
+        while True:
+            try:
+                with serial.Serial(self.port, self.baud, timeout=0.2 if use_executor else 0) as ser:
+                    if warned:
+                        print(f"[NmeaReader] Serial restored on {self.port}.")
+                    warned = False
+                    backoff = 1.0
+                    self.framer.reset()
+                    if use_executor:
+                        reads = self._aread_executor(ser, loop)
+                    else:
+                        reads = self._aread_fd(ser, loop)
+                    async for chunk, t_rx in reads:
+                        for item in self.framer.feed(chunk, t_rx):
+                            yield item
+            except serial.SerialException:
+                if not warned:
+                    print(f"[NmeaReader] Serial lost on {self.port}. Waiting for GPS...")
+                    warned = True
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 1.5, 5.0)
+
+    async def _aread_fd(
+        self, ser: serial.Serial, loop: asyncio.AbstractEventLoop
+    ) -> AsyncGenerator[Tuple[bytes, float], None]:
+        ready = asyncio.Event()
+        fd = ser.fileno()
+        loop.add_reader(fd, ready.set)
+        try:
+            while True:
+                await ready.wait()
+                ready.clear()
+                # pyserial raises SerialException if the fd is readable but
+                # returns nothing (device unplugged).
+                chunk = ser.read(ser.in_waiting or 1)
+                t_rx = time.monotonic()
+                self.read_calls += 1
+                if chunk:
+                    yield chunk, t_rx
+        finally:
+            loop.remove_reader(fd)
+
+    async def _aread_executor(
+        self, ser: serial.Serial, loop: asyncio.AbstractEventLoop
+    ) -> AsyncGenerator[Tuple[bytes, float], None]:
+        while True:
+            chunk = await loop.run_in_executor(None, _read_available, ser)
+            t_rx = time.monotonic()
+            self.read_calls += 1
+            if chunk:
+                yield chunk, t_rx
+
+    async def _aiter_file(self) -> AsyncGenerator[Tuple[bytes, float], None]:
+        # Async twin of _iter_file: waits on the loop between epochs.
+        async for item in self.replay.aiter_lines():
+            yield item
+
+    def _iter_file(self) -> Generator[Tuple[bytes, float], None, None]:
+        # Replay a log file, pacing epochs by their NMEA timestamps.
+        yield from self.replay.iter_lines()
+
+
+def _read_available(ser: serial.Serial) -> bytes:
+    return ser.read(ser.in_waiting or 1)
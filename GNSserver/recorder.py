@@ -0,0 +1,209 @@
+"""
+Continuous NMEA recording.
+
+Sentences are handed over from the parse path without blocking and written by
+a background thread in batches. Each line is prefixed with an NMEA 4.10 TAG
+block carrying its receive time as standard "c" Unix seconds, so TAG-aware
+tools can read it:
+
+    \\c:1760616000*hh\\$GNRMC,...
+
+UBX frames are stored as "UBX,<hex>" lines (see ubx.ubx_to_text).
+
+Files are gzip-compressed, rotate by size or age and are named
+<prefix>-YYYYMMDD-HHMMSS.nmea.gz. They are written under a ".part" suffix and
+renamed when closed, so anything with the final name is complete and can be
+replayed directly with --file.
+"""
+
+import argparse
+import gzip
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .nmea_parser import nmea_checksum
+from .ubx import UBX_SYNC, ubx_to_text
+
+
+class NmeaRecorder:
+    # write() only appends to an in-memory batch under a lock; the writer
+    # thread swaps the batch out every flush_s seconds. If the disk stalls the
+    # batch grows to at most max_buffer bytes, after which new lines are
+    # dropped (and counted) rather than blocking the reader.
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = "navscope",
+        rotate_bytes: int = 64 * 1024 * 1024,
+        rotate_s: float = 3600.0,
+        compress: bool = True,
+        max_buffer: int = 1024 * 1024,
+        flush_s: float = 1.0,
+    ) -> None:
+        self.directory = directory
+        self.prefix = prefix
+        self.rotate_bytes = rotate_bytes
+        self.rotate_s = rotate_s
+        self.compress = compress
+        self.max_buffer = max_buffer
+        self.flush_s = flush_s
+        # Receive times arrive on the monotonic clock; tags use wall time.
+        self._wall_offset = time.time() - time.monotonic()
+        self._lock = threading.Lock()
+        self._batch: List[bytes] = []
+        self._batch_bytes = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._raw = None
+        self._out = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._disk_mark = 0
+        self.lines = 0
+        self.dropped_lines = 0
+        self.raw_bytes = 0
+        self.disk_bytes = 0
+        self.files_closed = 0
+        self.write_s = 0.0
+        self.max_write_s = 0.0
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="NmeaRecorder", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        # Writes out whatever is buffered and closes the current file.
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write(self, line: bytes, t_rx: float) -> None:
+        # `line` is one stripped sentence; `t_rx` its monotonic receive time.
+        if line[:1] == b"\\":
+            line = line[line.find(b"\\", 1) + 1 :]
+        elif line[:2] == UBX_SYNC:
+            line = ubx_to_text(line)
+        tag = b"c:%d" % int(t_rx + self._wall_offset)
+        record = b"\\%s*%02X\\%s\r\n" % (tag, nmea_checksum(tag), line)
+        with self._lock:
+            if self._batch_bytes + len(record) > self.max_buffer:
+                self.dropped_lines += 1
+                return
+            self._batch.append(record)
+            self._batch_bytes += len(record)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            buffered = self._batch_bytes
+        return {
+            "path": self._path,
+            "lines": self.lines,
+            "dropped_lines": self.dropped_lines,
+            "buffered_bytes": buffered,
+            "raw_bytes": self.raw_bytes,
+            "disk_bytes": self.disk_bytes,
+            "files_closed": self.files_closed,
+            "write_s": round(self.write_s, 3),
+            "max_write_s": round(self.max_write_s, 3),
+            "last_error": self.last_error,
+        }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            stopping = self._stop.wait(self.flush_s)
+            with self._lock:
+                batch = self._batch
+                self._batch = []
+                self._batch_bytes = 0
+            try:
+                if batch:
+                    self._write_batch(batch)
+                if self._out is not None and (stopping or self._should_rotate()):
+                    self._close_file()
+            except OSError as exc:
+                # Keep going (e.g. card full); the batch is lost and counted.
+                self.last_error = str(exc)
+                self.dropped_lines += len(batch)
+                print(f"[NmeaRecorder] Write failed: {exc}")
+                self._abandon_file()
+
+    def _write_batch(self, batch: List[bytes]) -> None:
+        if self._out is None:
+            self._open_file()
+        data = b"".join(batch)
+        t0 = time.monotonic()
+        self._out.write(data)
+        self._out.flush()
+        elapsed = time.monotonic() - t0
+        self.write_s += elapsed
+        self.max_write_s = max(self.max_write_s, elapsed)
+        self.lines += len(batch)
+        self.raw_bytes += len(data)
+        self.disk_bytes += self._raw.tell() - self._disk_mark
+        self._disk_mark = self._raw.tell()
+
+    def _should_rotate(self) -> bool:
+        return (
+            self._raw.tell() >= self.rotate_bytes
+            or time.monotonic() - self._opened_at >= self.rotate_s
+        )
+
+    def _open_file(self) -> None:
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        suffix = ".nmea.gz" if self.compress else ".nmea"
+        path = os.path.join(self.directory, f"{self.prefix}-{stamp}{suffix}")
+        n = 1
+        while os.path.exists(path) or os.path.exists(path + ".part"):
+            path = os.path.join(self.directory, f"{self.prefix}-{stamp}-{n}{suffix}")
+            n += 1
+        self._raw = open(path + ".part", "wb")
+        self._out = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6) if self.compress else self._raw
+        self._path = path
+        self._disk_mark = 0
+        self._opened_at = time.monotonic()
+
+    def _close_file(self) -> None:
+        if self._out is not self._raw:
+            self._out.close()
+        self.disk_bytes += self._raw.tell() - self._disk_mark
+        self._raw.close()
+        os.replace(self._path + ".part", self._path)
+        self.files_closed += 1
+        self._out = self._raw = None
+
+    def _abandon_file(self) -> None:
+        # Leave the .part file behind and start a fresh one on the next batch.
+        for f in (self._out, self._raw):
+            try:
+                if f is not None:
+                    f.close()
+            except OSError:
+                pass
+        self._out = self._raw = None
+
+
+def add_record_args(parser: argparse.ArgumentParser) -> None:
+    # Shared by the terminal monitor and the web server.
+    parser.add_argument("--record", metavar="DIR", help="Record raw NMEA with receive times into DIR")
+    parser.add_argument("--record-rotate-mb", type=float, default=64.0, help="Start a new recording file after this size")
+    parser.add_argument("--record-rotate-min", type=float, default=60.0, help="Start a new recording file after this age")
+    parser.add_argument("--record-no-gzip", action="store_true", help="Write recordings uncompressed")
+
+
+def recorder_from_args(args: argparse.Namespace, prefix: str = "navscope") -> Optional[NmeaRecorder]:
+    if not args.record:
+        return None
+    return NmeaRecorder(
+        args.record,
+        prefix=prefix,
+        rotate_bytes=int(max(args.record_rotate_mb, 0.1) * 1024 * 1024),
+        rotate_s=max(args.record_rotate_min, 0.1) * 60.0,
+        compress=not args.record_no_gzip,
+    )
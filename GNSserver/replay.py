@@ -0,0 +1,361 @@
+"""
+Indexed NMEA log replay.
+
+The log is memory-mapped and indexed once by epoch (first sentence carrying a
+new UTC time -> byte offset). The index is cached next to the log as
+<log>.idx and rebuilt when the log changes, so seeking anywhere in a
+multi-hour log is a binary search rather than a rescan. Gzipped logs (as
+written by recorder.NmeaRecorder) are decompressed into memory instead of
+mapped, and lines may carry an NMEA TAG block prefix.
+"""
+
+import asyncio
+import gzip
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from typing import AsyncGenerator, Dict, Generator, List, Optional, Tuple, Union
+
+from .nmea_parser import parse_time_field, parse_time_from_line
+from .ubx import NAV_PVT, UBX_SYNC, UBX_TEXT_PREFIX, check_frame, decode_nav_pvt, ubx_from_text
+
+INDEX_SUFFIX = ".idx"
+# Gaps longer than this (receiver off, log spliced) replay as one epoch period.
+MAX_GAP_S = 10.0
+DEFAULT_EPOCH_S = 1.0
+# Delay between sentences for logs without any RMC/GGA/NAV-PVT timestamps.
+UNTIMED_DELAY_S = 0.1
+
+_INDEX_HEADER = struct.Struct("<8sQqI")
+# 002: NAV-PVT lines are timed too; older indexes of UBX logs are rebuilt.
+_INDEX_MAGIC = b"NSIDX002"
+_TIME_TYPES = (b"RMC", b"GGA")
+_NAV_PVT_TEXT = UBX_TEXT_PREFIX + (UBX_SYNC + NAV_PVT).hex().encode("ascii")
+
+
+def _nav_pvt_time(line: bytes) -> Optional[float]:
+    # UTC seconds of day of a recorded "UBX,<hex>" NAV-PVT line, if valid.
+    frame = ubx_from_text(line)
+    checked = check_frame(frame) if frame is not None else None
+    pvt = decode_nav_pvt(checked[1]) if checked is not None else None
+    if pvt is None or pvt.t_utc is None:
+        return None
+    return parse_time_field(pvt.t_utc)
+
+
+class ReplayIndex:
+    # Per-epoch arrays: byte offset of the epoch's first timed sentence,
+    # seconds since the first epoch (monotonic across midnight) and UTC
+    # seconds of day.
+
+    def __init__(self, offsets: array, elapsed: array, utc: array) -> None:
+        self.offsets = offsets
+        self.elapsed = elapsed
+        self.utc = utc
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def duration_s(self) -> float:
+        return self.elapsed[-1] if self.elapsed else 0.0
+
+    def epoch_at(self, elapsed_s: float) -> int:
+        # Last epoch starting at or before elapsed_s.
+        return max(0, bisect_right(self.elapsed, elapsed_s) - 1)
+
+    def elapsed_for_utc(self, utc_s: float) -> float:
+        # UTC seconds of day -> seconds since the log start (logs < 24 h).
+        if not self.utc:
+            return 0.0
+        return (utc_s - self.utc[0]) % 86400.0
+
+    @classmethod
+    def build(cls, data: Union[bytes, mmap.mmap]) -> "ReplayIndex":
+        offsets = array("q")
+        elapsed = array("d")
+        utc = array("d")
+        current: Optional[float] = None
+        total = 0.0
+        pos = 0
+        size = len(data)
+        while pos < size:
+            end = data.find(b"\n", pos)
+            if end < 0:
+                end = size
+            start = pos
+            if data[pos : pos + 1] == b"\\":
+                # Skip a TAG block prefix (recorded logs).
+                start = data.find(b"\\", pos + 1, end) + 1 or pos
+            # Cheap type check before the checksum-validating time parse.
+            # NAV-PVT times are printed like NMEA ones, so a receiver sending
+            # both still gets one epoch per time.
+            t_utc = None
+            if data[start + 3 : start + 6] in _TIME_TYPES:
+                t_utc = parse_time_from_line(data[pos:end])
+            elif data[start : start + len(_NAV_PVT_TEXT)] == _NAV_PVT_TEXT:
+                t_utc = _nav_pvt_time(data[start:end])
+            if t_utc is not None and t_utc != current:
+                if current is not None:
+                    dt = t_utc - current
+                    if dt < 0:
+                        dt += 86400.0
+                    total += dt
+                current = t_utc
+                offsets.append(pos)
+                elapsed.append(total)
+                utc.append(t_utc)
+            pos = end + 1
+        return cls(offsets, elapsed, utc)
+
+    @classmethod
+    def load_or_build(cls, path: str, data: Union[bytes, mmap.mmap]) -> "ReplayIndex":
+        # Reuse <path>.idx when it matches the log's size and mtime.
+        st = os.stat(path)
+        idx_path = path + INDEX_SUFFIX
+        try:
+            with open(idx_path, "rb") as f:
+                magic, size, mtime_ns, count = _INDEX_HEADER.unpack(f.read(_INDEX_HEADER.size))
+                if magic == _INDEX_MAGIC and size == st.st_size and mtime_ns == st.st_mtime_ns:
+                    offsets, elapsed, utc = array("q"), array("d"), array("d")
+                    offsets.fromfile(f, count)
+                    elapsed.fromfile(f, count)
+                    utc.fromfile(f, count)
+                    return cls(offsets, elapsed, utc)
+        except (OSError, EOFError, struct.error):
+            pass
+        index = cls.build(data)
+        try:
+            with open(idx_path, "wb") as f:
+                f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, st.st_size, st.st_mtime_ns, len(index)))
+                index.offsets.tofile(f)
+                index.elapsed.tofile(f)
+                index.utc.tofile(f)
+        except OSError as exc:
+            print(f"[Replay] Could not write index {idx_path}: {exc}")
+        return index
+
+
+def _replay_rate(rate: float) -> float:
+    # NaN or inf would break the pacing (and the JSON status); negative
+    # rates clamp to 0, as fast as possible.
+    if not math.isfinite(rate):
+        raise ValueError("replay rate must be a finite number")
+    return max(rate, 0.0)
+
+
+class LogReplay:
+    # Replays a log with its original epoch timing scaled by `rate`; rate 0
+    # means as fast as possible. seek(), pause(), resume() and set_rate() may be
+    # called while iterating (from the loop for aiter_lines, from any thread
+    # for iter_lines) and take effect before the next sentence.
+
+    def __init__(self, path: str, rate: float = 1.0) -> None:
+        self.path = path
+        self.rate = _replay_rate(rate)
+        self.paused = False
+        # Wait for a seek at the end of the log instead of finishing (used
+        # when a UI can scrub back).
+        self.hold_at_end = False
+        # Bumped on every seek so consumers know to drop accumulated state.
+        self.generation = 0
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data: Union[bytes, mmap.mmap]
+        if path.endswith(".gz"):
+            with gzip.GzipFile(fileobj=self._file) as gz:
+                self._data = gz.read()
+        elif size:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+        self.size = len(self._data)
+        self.index = ReplayIndex.load_or_build(path, self._data)
+        self._pos = 0
+        self._epoch = 0
+        # (wall time, elapsed) of the last epoch start handed out.
+        self._anchor: Optional[Tuple[float, float]] = None
+        self._sync_wake = threading.Event()
+        self._async_wake: Optional[asyncio.Event] = None
+
+    def close(self) -> None:
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+    @property
+    def position_s(self) -> float:
+        # Log time of the epoch currently being replayed.
+        index = self.index
+        if not index:
+            return 0.0
+        return index.elapsed[max(0, min(self._epoch - 1, len(index) - 1))]
+
+    @property
+    def at_end(self) -> bool:
+        return self._pos >= self.size
+
+    @property
+    def epoch(self) -> int:
+        # Index of the next epoch start at or after the current position.
+        return self._epoch
+
+    def status(self) -> Dict[str, object]:
+        index = self.index
+        return {
+            "playing": not self.paused and not self.at_end,
+            "rate": self.rate,
+            "position_s": round(self.position_s, 3),
+            "duration_s": round(index.duration_s, 3),
+            "start_utc_s": index.utc[0] if index else None,
+            "epochs": len(index),
+            "at_end": self.at_end,
+        }
+
+    def seek(self, elapsed_s: float) -> float:
+        # Jump to the start of the epoch containing elapsed_s; returns its time.
+        index = self.index
+        if not index:
+            self._pos = 0
+            self._epoch = 0
+        else:
+            epoch = index.epoch_at(elapsed_s)
+            self._pos = index.offsets[epoch]
+            self._epoch = epoch
+        self._anchor = None
+        self.generation += 1
+        self._wake()
+        return index.elapsed[self._epoch] if index else 0.0
+
+    def seek_utc(self, utc_s: float) -> float:
+        return self.seek(self.index.elapsed_for_utc(utc_s))
+
+    def seek_spec(self, spec: str) -> float:
+        # Command-line form: seconds into the log ("5400") or UTC "HH:MM:SS".
+        if ":" in spec:
+            parts = [float(p) for p in spec.split(":")] + [0.0, 0.0]
+            return self.seek_utc(parts[0] * 3600 + parts[1] * 60 + parts[2])
+        return self.seek(float(spec))
+
+    def epoch_lines(self, first: int, last: int) -> List[bytes]:
+        # Sentences of epochs [first, last) without moving the play position.
+        index = self.index
+        start = index.offsets[first] if first < len(index) else self.size
+        end = index.offsets[last] if last < len(index) else self.size
+        return self._lines(start, end)
+
+    def read_epoch(self) -> List[bytes]:
+        # Take the sentences up to the next epoch boundary (a whole epoch when
+        # sitting on one) without pacing; for single-stepping while paused.
+        index = self.index
+        epoch = self._epoch
+        if epoch < len(index) and self._pos == index.offsets[epoch]:
+            epoch += 1
+        end = index.offsets[epoch] if epoch < len(index) else self.size
+        lines = self._lines(self._pos, end)
+        self._pos = end
+        self._epoch = epoch
+        self._anchor = None
+        self._wake()
+        return lines
+
+    def pause(self) -> None:
+        self.paused = True
+        self._wake()
+
+    def resume(self) -> None:
+        self.paused = False
+        self._anchor = None
+        self._wake()
+
+    def set_rate(self, rate: float) -> None:
+        self.rate = _replay_rate(rate)
+        self._anchor = None
+        self._wake()
+
+    def iter_lines(self) -> Generator[Tuple[bytes, float], None, None]:
+        wake = self._sync_wake
+        while True:
+            if self.at_end and not self.hold_at_end:
+                return
+            if self.paused or self.at_end:
+                wake.wait()
+                wake.clear()
+                continue
+            delay = self._delay()
+            if delay > 0:
+                if wake.wait(delay):
+                    wake.clear()
+                    continue
+            line = self._take_line()
+            if line:
+                yield line, time.monotonic()
+
+    async def aiter_lines(self) -> AsyncGenerator[Tuple[bytes, float], None]:
+        wake = self._async_wake = asyncio.Event()
+        while True:
+            if self.at_end and not self.hold_at_end:
+                return
+            if self.paused or self.at_end:
+                await wake.wait()
+                wake.clear()
+                continue
+            delay = self._delay()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(wake.wait(), delay)
+                    wake.clear()
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            elif not self.index or self._pos == self._next_offset():
+                # Running behind or unthrottled: still yield to the loop once
+                # per epoch so other tasks keep running.
+                await asyncio.sleep(0)
+            line = self._take_line()
+            if line:
+                yield line, time.monotonic()
+
+    def _wake(self) -> None:
+        self._sync_wake.set()
+        if self._async_wake is not None:
+            self._async_wake.set()
+
+    def _next_offset(self) -> int:
+        index = self.index
+        return index.offsets[self._epoch] if self._epoch < len(index) else -1
+
+    def _delay(self) -> float:
+        # Seconds to wait before the sentence at the current position.
+        index = self.index
+        if self.rate == 0:
+            return 0.0
+        if not index:
+            return UNTIMED_DELAY_S / self.rate
+        if self._pos != self._next_offset() or self._anchor is None:
+            return 0.0
+        anchor_wall, anchor_elapsed = self._anchor
+        dt = index.elapsed[self._epoch] - anchor_elapsed
+        if dt <= 0 or dt > MAX_GAP_S:
+            dt = DEFAULT_EPOCH_S
+        return anchor_wall + dt / self.rate - time.monotonic()
+
+    def _take_line(self) -> bytes:
+        data = self._data
+        pos = self._pos
+        end = data.find(b"\n", pos)
+        if end < 0:
+            end = self.size
+        if pos == self._next_offset():
+            self._anchor = (time.monotonic(), self.index.elapsed[self._epoch])
+            self._epoch += 1
+        self._pos = end + 1
+        return data[pos:end].strip()
+
+    def _lines(self, start: int, end: int) -> List[bytes]:
+        return [line.strip() for line in self._data[start:end].split(b"\n") if line.strip()]
@@ -0,0 +1,321 @@
+"""
+Latest-epoch snapshot in shared memory.
+
+A LiveGnss source started with --shm writes every published snapshot into a
+fixed-layout memory-mapped file (by default under /dev/shm), so local
+processes can read the current fix, DOP and satellite table without sockets
+or JSON. SharedStateReader is the reader side; other languages can map the
+same file using the layout below.
+
+Layout (little-endian, naturally aligned):
+
+    header  @0    magic "NAVSCOPE" 8s, layout version u32, header size u32,
+                  state size u32, max satellites u32, writer pid u32 (0 once
+                  the writer has closed), reserved u32,
+            @32   seq u64
+    state   @64   version u64, published monotonic s f64 (CLOCK_MONOTONIC),
+                  UTC seconds of day f64, date u32 (YYYYMMDD, 0 unknown),
+                  fix mode i8, quality i8, fix status 1s, pos mode 1s,
+                  lat f64, lon f64, alt_m f64, speed_knots f64, cog_deg f64,
+                  pdop/hdop/vdop f32, error lat/lon/alt m f32 (GST 1-sigma),
+                  used i16, in_view i16, satellite count u16, reserved u16,
+                  state crc32 u32, satellite crc32 u32
+    sats    @176  max satellites x (constellation u8 (index into
+                  GNSS_CODES), flags u8 (bit 0: used), prn u16, el i16,
+                  az i16, snr i16)
+
+Missing floats are NaN and missing integers -1. The state crc32 covers the
+state record up to the crc fields, the satellite crc32 the first `count`
+satellite rows.
+
+seq is a seqlock: the writer makes it odd, updates the state and satellite
+table, then makes it even again. A reader copies what it needs between two
+reads of seq and retries if seq was odd or changed. Python cannot issue
+memory barriers, so on weakly ordered CPUs (the Pi's ARM cores) the store
+order is not guaranteed to be visible as written; readers therefore also
+check the crcs. C readers can use acquire loads of seq and skip them.
+
+Reads are bound by the interpreter: in CPython SharedStateReader.read_fix()
+takes 1-1.5 us, read() with ~40 satellites about 6 us and polling seq for a
+change 0.15 us. A C reader of the same mapping stays well under a
+microsecond.
+"""
+
+import mmap
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from .nmea_parser import parse_time_field
+from .wire import GNSS_CODES
+
+if TYPE_CHECKING:
+    from .tracker import GnssState
+
+MAGIC = b"NAVSCOPE"
+LAYOUT_VERSION = 1
+DEFAULT_MAX_SATS = 128
+
+_HEADER = struct.Struct("<8sIIIIII")
+_SEQ_OFFSET = 32
+HEADER_SIZE = 64
+_STATE = struct.Struct("<QddIbbcc5d6fhhHH")
+_CRC = struct.Struct("<II")
+STATE_SIZE = _STATE.size + _CRC.size
+_STATE_CRC = struct.Struct("<QddIbbcc5d6fhhHHII")
+_SAT = struct.Struct("<BBHhhh")
+SATS_OFFSET = HEADER_SIZE + STATE_SIZE
+# Index of the satellite count in _STATE.
+_COUNT = 21
+
+_NAN = float("nan")
+_GNSS_INDEX = {name: i for i, name in enumerate(GNSS_CODES)}
+
+
+@dataclass(slots=True)
+class SharedState:
+    version: int
+    published_mono: float
+    utc_s: float
+    date: int
+    fix_mode: int
+    quality: int
+    fix_status: str
+    pos_mode: str
+    lat: float
+    lon: float
+    alt_m: float
+    speed_knots: float
+    cog_deg: float
+    pdop: float
+    hdop: float
+    vdop: float
+    err_lat_m: float
+    err_lon_m: float
+    err_alt_m: float
+    used: int
+    in_view: int
+    # Raw satellite rows: (constellation index into GNSS_CODES, flags, prn,
+    # el, az, snr).
+    sats: Tuple[Tuple[int, int, int, int, int, int], ...] = ()
+
+    @property
+    def age_s(self) -> float:
+        return time.monotonic() - self.published_mono
+
+
+def region_size(max_sats: int) -> int:
+    return SATS_OFFSET + max_sats * _SAT.size
+
+
+def _f(value: Optional[float]) -> float:
+    return _NAN if value is None else value
+
+
+def _i(value: Optional[int]) -> int:
+    return -1 if value is None else value
+
+
+def _char(value: Optional[str]) -> bytes:
+    return value.encode("ascii", "replace")[:1] if value else b"\0"
+
+
+def _date(value: Optional[str]) -> int:
+    # "YYYY-MM-DD" -> YYYYMMDD.
+    try:
+        return int(value.replace("-", ""))  # type: ignore[union-attr]
+    except (AttributeError, ValueError):
+        return 0
+
+
+class SharedStatePublisher:
+    # Single writer; publish() is called on the event loop for every epoch.
+
+    def __init__(self, path: str, max_sats: int = DEFAULT_MAX_SATS) -> None:
+        self.path = path
+        self.max_sats = max_sats
+        self.published = 0
+        self._mm: Optional[mmap.mmap] = None
+        self._seq_view: Optional[memoryview] = None
+        self._seq = 0
+
+    def open(self) -> None:
+        size = region_size(self.max_sats)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        mm = self._mm
+        mm[:] = bytes(size)
+        _HEADER.pack_into(mm, 0, MAGIC, LAYOUT_VERSION, HEADER_SIZE, STATE_SIZE, self.max_sats, os.getpid(), 0)
+        # seq goes through a native u64 view: one aligned 8-byte store rather
+        # than struct's byte-by-byte little-endian packing.
+        self._seq_view = memoryview(mm)[_SEQ_OFFSET : _SEQ_OFFSET + 8].cast("Q")
+        self._seq = 0
+        print(f"[SharedState] Publishing snapshots to {self.path} ({size} bytes)")
+
+    def close(self) -> None:
+        if self._mm is None:
+            return
+        # Readers keep the last snapshot; pid 0 tells them it is final.
+        _HEADER.pack_into(self._mm, 0, MAGIC, LAYOUT_VERSION, HEADER_SIZE, STATE_SIZE, self.max_sats, 0, 0)
+        if self._seq_view is not None:
+            self._seq_view.release()
+            self._seq_view = None
+        self._mm.close()
+        self._mm = None
+
+    def publish(self, state: "GnssState", t_mono: float) -> None:
+        mm = self._mm
+        seq_view = self._seq_view
+        if mm is None or seq_view is None:
+            return
+        utc_s = parse_time_field(state.t_utc) if state.t_utc else None
+        sats = state.sats[: self.max_sats]
+        record = _STATE.pack(
+            state.version,
+            t_mono,
+            _f(utc_s),
+            _date(state.utc_date),
+            _i(state.fix_mode),
+            _i(state.quality),
+            _char(state.fix_status),
+            _char(state.pos_mode),
+            _f(state.lat),
+            _f(state.lon),
+            _f(state.alt_m),
+            _f(state.speed_knots),
+            _f(state.cog_deg),
+            _f(state.pdop),
+            _f(state.hdop),
+            _f(state.vdop),
+            _f(state.err_lat_m),
+            _f(state.err_lon_m),
+            _f(state.err_alt_m),
+            _i(state.used_count),
+            _i(state.in_view_count),
+            len(sats),
+            0,
+        )
+        pack = _SAT.pack
+        table = b"".join(
+            pack(
+                _GNSS_INDEX.get(sat.gnssid, 0),
+                1 if sat.used else 0,
+                sat.prn,
+                _i(sat.el),
+                _i(sat.az),
+                _i(sat.snr),
+            )
+            for sat in sats
+        )
+        crcs = _CRC.pack(zlib.crc32(record), zlib.crc32(table))
+        # Everything is packed before the write section so seq stays odd
+        # for as short a time as possible.
+        self._seq += 1
+        seq_view[0] = self._seq
+        mm[HEADER_SIZE:SATS_OFFSET] = record + crcs
+        mm[SATS_OFFSET : SATS_OFFSET + len(table)] = table
+        self._seq += 1
+        seq_view[0] = self._seq
+        self.published += 1
+
+    def stats(self) -> Dict[str, object]:
+        return {"path": self.path, "max_sats": self.max_sats, "published": self.published, "seq": self._seq}
+
+
+class SharedStateReader:
+    # Maps a region written by SharedStatePublisher. read() and read_fix()
+    # return None until the first snapshot, or when the writer stayed
+    # mid-update for all retries. Raises ValueError for a file that is not a
+    # NavScope region of this layout version.
+
+    def __init__(self, path: str, retries: int = 10000, verify: bool = True) -> None:
+        self.path = path
+        self.retries = retries
+        self.verify = verify
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER_SIZE:
+            self._mm.close()
+            raise ValueError(f"{path}: too small for a NavScope region")
+        magic, layout, header_size, state_size, max_sats, _, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or layout != LAYOUT_VERSION or header_size != HEADER_SIZE or state_size != STATE_SIZE:
+            self._mm.close()
+            raise ValueError(f"{path}: not a NavScope layout {LAYOUT_VERSION} region")
+        self.max_sats = max_sats
+        self._seq_view = memoryview(self._mm)[_SEQ_OFFSET : _SEQ_OFFSET + 8].cast("Q")
+
+    def close(self) -> None:
+        self._seq_view.release()
+        self._mm.close()
+
+    def __enter__(self) -> "SharedStateReader":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    @property
+    def seq(self) -> int:
+        # Changes on every publish; cheap to poll for a new snapshot.
+        return self._seq_view[0]
+
+    @property
+    def writer_pid(self) -> int:
+        return _HEADER.unpack_from(self._mm, 0)[5]
+
+    def read_fix(self) -> Optional[Tuple]:
+        # The state record as a flat tuple in layout order (fix status and
+        # pos mode as bytes, then the two crcs), without the satellite table.
+        seq_view = self._seq_view
+        mm = self._mm
+        for _ in range(self.retries):
+            seq = seq_view[0]
+            if seq & 1:
+                continue
+            if seq == 0:
+                return None
+            # Copy first, validate after: nothing is trusted until seq is
+            # seen unchanged.
+            data = mm[HEADER_SIZE:SATS_OFFSET]
+            if seq_view[0] != seq:
+                continue
+            if self.verify and zlib.crc32(data[: _STATE.size]) != _CRC.unpack_from(data, _STATE.size)[0]:
+                continue
+            return _STATE_CRC.unpack(data)
+        return None
+
+    def read(self) -> Optional[SharedState]:
+        seq_view = self._seq_view
+        mm = self._mm
+        for _ in range(self.retries):
+            seq = seq_view[0]
+            if seq & 1:
+                continue
+            if seq == 0:
+                return None
+            data = mm[HEADER_SIZE:SATS_OFFSET]
+            fields = _STATE_CRC.unpack(data)
+            count = fields[_COUNT]
+            if count > self.max_sats:
+                continue
+            table = mm[SATS_OFFSET : SATS_OFFSET + count * _SAT.size]
+            if seq_view[0] != seq:
+                continue
+            if self.verify and (zlib.crc32(data[: _STATE.size]) != fields[-2] or zlib.crc32(table) != fields[-1]):
+                continue
+            sats = tuple(_SAT.iter_unpack(table))
+            return SharedState(
+                *fields[:6],
+                fields[6].decode("ascii", "replace").strip("\0"),
+                fields[7].decode("ascii", "replace").strip("\0"),
+                *fields[8:_COUNT],
+                sats,
+            )
+        return None
@@ -0,0 +1,126 @@
+"""
+Track simplification.
+
+Douglas-Peucker over latitude/longitude, with distances in metres on a local
+plane around the first point (equirectangular, WGS84 radii), which is exact
+to well under a percent over the few kilometres a window covers.
+
+StreamSimplifier runs it online in constant memory: points are buffered in
+windows of `window` points, each window is simplified on its own and the
+window's last point starts the next one. Every input point stays within the
+tolerance of the output polyline, as with whole-track Douglas-Peucker; the
+price is one extra kept point per window.
+"""
+
+import math
+from typing import Generic, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_WINDOW = 2048
+
+# WGS84
+_WGS84_A = 6378137.0
+_WGS84_E2 = 6.69437999014e-3
+
+
+def metres_per_degree(lat: float) -> Tuple[float, float]:
+    # (north, east) metres per degree at a latitude, from the WGS84 radii of
+    # curvature.
+    phi = math.radians(lat)
+    w = 1.0 - _WGS84_E2 * math.sin(phi) ** 2
+    meridian = _WGS84_A * (1.0 - _WGS84_E2) / w**1.5
+    normal = _WGS84_A / math.sqrt(w)
+    return math.radians(meridian), math.radians(normal * math.cos(phi))
+
+
+def simplify_indices(lats: Sequence[float], lons: Sequence[float], tolerance_m: float) -> List[int]:
+    # Indices of the points Douglas-Peucker keeps, ascending; the first and
+    # last are always kept.
+    n = len(lats)
+    if n <= 2 or tolerance_m <= 0:
+        return list(range(n))
+    north_m, east_m = metres_per_degree(lats[0])
+    lat0, lon0 = lats[0], lons[0]
+    xs = [(lon - lon0) * east_m for lon in lons]
+    ys = [(lat - lat0) * north_m for lat in lats]
+    tolerance2 = tolerance_m * tolerance_m
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = xs[first], ys[first]
+        dx, dy = xs[last] - x1, ys[last] - y1
+        length2 = dx * dx + dy * dy
+        worst = -1.0
+        index = first
+        for i in range(first + 1, last):
+            px, py = xs[i] - x1, ys[i] - y1
+            # Distance to the segment, not the line: tracks double back.
+            t = (px * dx + py * dy) / length2 if length2 else 0.0
+            if t <= 0.0:
+                d2 = px * px + py * py
+            elif t >= 1.0:
+                ex, ey = px - dx, py - dy
+                d2 = ex * ex + ey * ey
+            else:
+                cross = px * dy - py * dx
+                d2 = cross * cross / length2
+            if d2 > worst:
+                worst = d2
+                index = i
+        if worst > tolerance2:
+            keep[index] = True
+            if index - first > 1:
+                stack.append((first, index))
+            if last - index > 1:
+                stack.append((index, last))
+    return [i for i in range(n) if keep[i]]
+
+
+class StreamSimplifier(Generic[T]):
+    # push() returns the items that are final, in order; flush() the rest at
+    # the end of the track (or segment).
+
+    def __init__(self, tolerance_m: float, window: int = DEFAULT_WINDOW) -> None:
+        self.tolerance_m = tolerance_m
+        self.window = max(window, 3)
+        self.pushed = 0
+        self.emitted = 0
+        self._lats: List[float] = []
+        self._lons: List[float] = []
+        self._items: List[T] = []
+
+    def push(self, lat: float, lon: float, item: T) -> List[T]:
+        self.pushed += 1
+        self._lats.append(lat)
+        self._lons.append(lon)
+        self._items.append(item)
+        if len(self._items) < self.window:
+            return []
+        return self._simplify(final=False)
+
+    def flush(self) -> List[T]:
+        if not self._items:
+            return []
+        return self._simplify(final=True)
+
+    def peek(self) -> List[T]:
+        # What flush() would return now, without consuming it.
+        kept = simplify_indices(self._lats, self._lons, self.tolerance_m)
+        return [self._items[i] for i in kept]
+
+    def _simplify(self, final: bool) -> List[T]:
+        items = self._items
+        kept = simplify_indices(self._lats, self._lons, self.tolerance_m)
+        if final:
+            out = [items[i] for i in kept]
+            self._lats, self._lons, self._items = [], [], []
+        else:
+            # The window's last point is kept but not yet final: it opens
+            # the next window.
+            out = [items[i] for i in kept[:-1]]
+            self._lats, self._lons, self._items = self._lats[-1:], self._lons[-1:], items[-1:]
+        self.emitted += len(out)
+        return out
@@ -1,16 +1,43 @@
 """
 GNSS state tracker.
 
-Parses NMEA sentences into a rolling state model and handles GSV burst assembly.
+Parses NMEA sentences and u-blox UBX frames (NAV-PVT, NAV-DOP, NAV-SAT) into a
+rolling state model and handles GSV burst assembly. Completed epochs are
+published as immutable snapshots (see GnssTracker.snapshot).
 """
 
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Set, Tuple
+import copy
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
 
-from .nmea_parser import parse_lat_lon, safe_float, safe_int, split_nmea
+from .nmea_parser import ParseStats, parse_lat_lon, parse_time_field, safe_float, safe_int, split_nmea
+from .breadcrumbs import Breadcrumbs
+from .history import HistoryStore
+from .trails import SatTrails
+from .ubx import (
+    MESSAGE_NAMES,
+    NAV_DOP,
+    NAV_PVT,
+    NAV_SAT,
+    UBX_SYNC,
+    UBX_TEXT_PREFIX,
+    NavDop,
+    NavPvt,
+    NavSat,
+    UbxMessage,
+    check_frame,
+    decode_nav_dop,
+    decode_nav_pvt,
+    decode_nav_sat,
+    format_utc,
+    ubx_from_text,
+)
 
+TEXT_HISTORY = 20
 
-@dataclass
+
+@dataclass(slots=True)
 class SatInfo:
     gnssid: str
     prn: int
@@ -20,7 +47,7 @@ class SatInfo:
     used: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class GnssState:
     t_utc: Optional[str] = None
     fix_status: Optional[str] = None
@@ -36,36 +63,285 @@ class GnssState:
     vdop: Optional[float] = None
     used_count: Optional[int] = None
     in_view_count: Optional[int] = None
-    sats: List[SatInfo] = field(default_factory=list)
-    used_prns: Set[int] = field(default_factory=set)
+    sats: Tuple[SatInfo, ...] = ()
+    used_prns: FrozenSet[int] = frozenset()
+    utc_date: Optional[str] = None
+    tz_offset_min: Optional[int] = None
+    cog_mag_deg: Optional[float] = None
+    pos_mode: Optional[str] = None
+    # GST pseudorange error statistics (1-sigma, meters / degrees).
+    rms_range: Optional[float] = None
+    err_major_m: Optional[float] = None
+    err_minor_m: Optional[float] = None
+    err_orient_deg: Optional[float] = None
+    err_lat_m: Optional[float] = None
+    err_lon_m: Optional[float] = None
+    err_alt_m: Optional[float] = None
+    # GBS RAIM fault detection.
+    gbs_err_lat_m: Optional[float] = None
+    gbs_err_lon_m: Optional[float] = None
+    gbs_err_alt_m: Optional[float] = None
+    gbs_failed_prn: Optional[int] = None
+    texts: Tuple[str, ...] = ()
+    # Incremented for every published snapshot; 0 for the working state.
+    version: int = 0
+
+
+Decoder = Callable[["GnssTracker", str, List[str], float], bool]
+
+# Sentence ID -> (decoder, number of leading fields it reads (-1 for all),
+# index of its UTC time field or None). Only registered sentences are split;
+# everything else is dropped from its header. Decoders return True when the
+# satellite frame changed.
+DECODERS: Dict[str, Tuple[Decoder, int, Optional[int]]] = {}
+
+
+UbxDecoder = Callable[["GnssTracker", UbxMessage], None]
+
+# UBX class/id -> (payload parser, decoder applying the result).
+UBX_DECODERS: Dict[bytes, Tuple[Callable[[bytes], Optional[UbxMessage]], UbxDecoder]] = {}
+
+# GPS-UTC offset assumed until a NAV-PVT with valid time gives the real one.
+DEFAULT_LEAP_S = 18
+# Knots per m/s.
+_KNOTS = 1.943844
+
+
+def register_ubx_decoder(
+    msg: bytes, parse: Callable[[bytes], Optional[UbxMessage]]
+) -> Callable[[UbxDecoder], UbxDecoder]:
+    def wrap(decoder: UbxDecoder) -> UbxDecoder:
+        UBX_DECODERS[msg] = (parse, decoder)
+        return decoder
+
+    return wrap
+
+
+def register_decoder(
+    sentence: str, fields: int = -1, time_field: Optional[int] = None
+) -> Callable[[Decoder], Decoder]:
+    # Register a decoder for every GnssTracker created afterwards.
+    def wrap(decoder: Decoder) -> Decoder:
+        DECODERS[sentence] = (decoder, fields, time_field)
+        return decoder
+
+    return wrap
+
+
+@dataclass(slots=True)
+class _GsvBurst:
+    # A GSV burst being assembled for one talker.
+    total_msgs: int
+    total_sats: Optional[int]
+    next_index: int
+    sats: List[SatInfo]
+
+
+@dataclass(slots=True)
+class _GsvFrame:
+    # The last complete burst for one talker.
+    sats: List[SatInfo]
+    total_sats: Optional[int]
+    updated: float
 
 
 class GnssTracker:
+    # Constellations whose GSV bursts stop arriving are dropped after this long.
+    GSV_STALE_S = 10.0
+    # Publish anyway if no epoch boundary shows up for this long (no time yet).
+    MAX_EPOCH_S = 1.5
+
     def __init__(self) -> None:
+        # `state` is the working copy decoders write into; `snapshot` is the
+        # last completed epoch and is never mutated once published, so readers
+        # can hold on to it without locking or copying.
+        self.snapshot = GnssState()
+        self.version = 0
+        self.stats = ParseStats()
+        self._decoders: Dict[str, Decoder] = {}
+        self._field_limits: Dict[str, int] = {}
+        self._time_fields: Dict[str, int] = {}
+        for sentence, (decoder, fields, time_field) in DECODERS.items():
+            self.add_decoder(sentence, decoder, fields, time_field)
+        # Fix/DOP/SNR time series of published snapshots.
+        self.history = HistoryStore()
+        # Simplified map track of published fixes.
+        self.breadcrumbs = Breadcrumbs()
+        self._clear()
+
+    def _clear(self) -> None:
         self.state = GnssState()
-        self._gsv_buffers: Dict[str, Dict[str, object]] = {}
-        self._gsv_frames: Dict[str, Dict[str, object]] = {}
+        # Sky-plot history per satellite, sampled at publish time.
+        self.trails = SatTrails()
+        self.history.clear()
+        self.breadcrumbs.clear()
+        self._gsv_buffers: Dict[str, _GsvBurst] = {}
+        self._gsv_frames: Dict[str, _GsvFrame] = {}
+        # Satellite records keyed by (constellation, PRN). Records reachable
+        # from a snapshot are never modified; changes replace them.
+        self._sat_records: Dict[Tuple[str, int], SatInfo] = {}
+        # Epoch tracking: UTC time of the open epoch, the sentence that closed
+        # the previous one (learned), and the last sentence seen.
+        self._epoch_utc: Optional[str] = None
+        self._epoch_count = 0
+        self._epoch_tail: Optional[str] = None
+        self._last_header: Optional[str] = None
+        self._gsa_epoch = -1
+        # UBX epochs are keyed by iTOW; the GPS-UTC offset maps it to the
+        # same time string NMEA sentences carry.
+        self._ubx_itow = -1
+        self._ubx_utc: Optional[str] = None
+        self._leap_s = DEFAULT_LEAP_S
+        self._dirty = False
+        self._published_at: Optional[float] = None
+
+    def reset(self) -> None:
+        # Forget everything learned from the stream (e.g. after a replay
+        # seek) and publish an empty snapshot. Versions keep counting up so a
+        # new snapshot is never mistaken for one from before the reset.
+        self._clear()
+        self.version += 1
+        self.snapshot = GnssState(version=self.version)
+
+    def add_decoder(self, sentence: str, decoder: Decoder, fields: int = -1, time_field: Optional[int] = None) -> None:
+        # Plug in a decoder for this tracker only; see register_decoder.
+        self._decoders[sentence] = decoder
+        self._field_limits[sentence] = fields
+        if time_field is not None:
+            self._time_fields[sentence] = time_field
 
-    def update_from_line(self, line: str) -> bool:
-        # Returns True when a complete GSV burst has been assembled.
-        parts = split_nmea(line)
+    def update_from_line(self, line: Union[str, bytes], t_mono: Optional[float] = None) -> bool:
+        # Returns True when a new epoch snapshot has been published.
+        # Accepts raw bytes from the port; sentences failing the checksum are
+        # counted in self.stats and dropped. Sentences without a decoder are
+        # skipped from the header alone. UBX frames are handed to
+        # update_from_ubx.
+        first = line[:1]
+        if first == b"\xb5" or first == b"U" or (first == b"\\" and b"\\UBX," in line):
+            return self.update_from_ubx(line, t_mono)  # type: ignore[arg-type]
+        parts = split_nmea(line, self.stats, self._field_limits)
         if not parts:
             return False
         talker, sentence, fields = parts
-        if sentence == "RMC":
-            self._update_rmc(fields)
-        elif sentence == "GGA":
-            self._update_gga(fields)
-        elif sentence == "GSA":
-            self._update_gsa(fields)
-        elif sentence == "GSV":
-            return self._update_gsv(talker, fields)
-        return False
+        if t_mono is None:
+            t_mono = time.monotonic()
+        if self._published_at is None:
+            self._published_at = t_mono
+        published = False
+        # A new UTC time opens a new epoch: publish the previous one before
+        # this sentence touches the working state.
+        time_field = self._time_fields.get(sentence)
+        if time_field is not None and len(fields) > time_field:
+            t_utc = fields[time_field]
+            if t_utc and t_utc != self._epoch_utc:
+                if self._epoch_utc is not None:
+                    self._epoch_tail = self._last_header
+                    if self._dirty:
+                        published = self._publish(t_mono)
+                self._epoch_utc = t_utc
+                self._epoch_count += 1
+        frame_done = self._decoders[sentence](self, talker, fields, t_mono)
+        self._dirty = True
+        header = talker + sentence
+        self._last_header = header
+        # The sentence that closed the last epoch most likely closes this one
+        # too; publish on it rather than waiting for the next epoch to start.
+        if header == self._epoch_tail and (sentence != "GSV" or frame_done):
+            published = self._publish(t_mono) or published
+        elif t_mono - self._published_at > self.MAX_EPOCH_S:
+            published = self._publish(t_mono) or published
+        return published
+
+    def update_from_ubx(self, frame: bytes, t_mono: Optional[float] = None) -> bool:
+        # A raw UBX frame, or one in the recorder's "UBX,<hex>" form (TAG
+        # block allowed). Frames failing the checksum are counted in
+        # self.stats and dropped. Epochs open and close as in
+        # update_from_line, with the iTOW of each message as its time.
+        if frame[:2] != UBX_SYNC:
+            start = frame.find(UBX_TEXT_PREFIX)
+            frame = ubx_from_text(frame[start:]) if start >= 0 else None  # type: ignore[assignment]
+            if frame is None:
+                self.stats.malformed += 1
+                return False
+        parts = check_frame(frame)
+        if parts is None:
+            self.stats.bad_checksum += 1
+            return False
+        msg, payload = parts
+        entry = UBX_DECODERS.get(msg)
+        if entry is None:
+            self.stats.skipped += 1
+            return False
+        parse, decoder = entry
+        message = parse(payload)
+        if message is None:
+            self.stats.malformed += 1
+            return False
+        self.stats.accepted += 1
+        if t_mono is None:
+            t_mono = time.monotonic()
+        if self._published_at is None:
+            self._published_at = t_mono
+        published = False
+        t_utc = self._ubx_epoch_utc(message)
+        if t_utc != self._epoch_utc:
+            if self._epoch_utc is not None:
+                self._epoch_tail = self._last_header
+                if self._dirty:
+                    published = self._publish(t_mono)
+            self._epoch_utc = t_utc
+            self._epoch_count += 1
+        decoder(self, message)
+        self._dirty = True
+        header = MESSAGE_NAMES[msg]
+        self._last_header = header
+        if header == self._epoch_tail:
+            published = self._publish(t_mono) or published
+        elif t_mono - self._published_at > self.MAX_EPOCH_S:
+            published = self._publish(t_mono) or published
+        return published
+
+    def _ubx_epoch_utc(self, message: UbxMessage) -> str:
+        # UTC time string of a message's epoch. NAV-PVT carries UTC and
+        # refreshes the GPS-UTC offset; the others only have iTOW.
+        itow = message.itow_ms
+        if isinstance(message, NavPvt) and message.t_utc:
+            utc_s = parse_time_field(message.t_utc) or 0.0
+            self._leap_s = round((itow / 1000.0 - utc_s) % 86400.0) % 86400
+            self._ubx_itow = itow
+            self._ubx_utc = message.t_utc
+        elif itow != self._ubx_itow or self._ubx_utc is None:
+            self._ubx_itow = itow
+            self._ubx_utc = format_utc(itow / 1000.0 - self._leap_s)
+        return self._ubx_utc
 
-    def _update_rmc(self, fields: List[str]) -> None:
+    def flush(self, t_mono: Optional[float] = None) -> bool:
+        # Publish whatever the open epoch holds (end of a replay, idle input).
+        if not self._dirty:
+            return False
+        return self._publish(time.monotonic() if t_mono is None else t_mono)
+
+    def _publish(self, t_mono: float) -> bool:
+        # Swap in a shallow copy of the working state. Containers in it are
+        # tuples/frozensets that decoders replace rather than mutate.
+        self.version += 1
+        snapshot = copy.copy(self.state)
+        snapshot.version = self.version
+        self.snapshot = snapshot
+        self._dirty = False
+        self._published_at = t_mono
+        utc_s = parse_time_field(snapshot.t_utc) if snapshot.t_utc else None
+        if utc_s is not None:
+            self.trails.update(snapshot.sats, utc_s)
+            self.history.record(snapshot, utc_s)
+            self.breadcrumbs.record(snapshot, utc_s)
+        return True
+
+    @register_decoder("RMC", 9, time_field=0)
+    def _update_rmc(self, talker: str, fields: List[str], t_mono: float) -> bool:
         # fields: time, status, lat, N/S, lon, E/W, speed, track, date, ...
         if len(fields) < 2:
-            return
+            return False
         if fields[0]:
             self.state.t_utc = fields[0]
         if fields[1]:
@@ -84,11 +360,16 @@ class GnssTracker:
             track = safe_float(fields[7])
             if track is not None:
                 self.state.cog_deg = track
+        if len(fields) > 8 and len(fields[8]) == 6:
+            # ddmmyy
+            self.state.utc_date = f"20{fields[8][4:6]}-{fields[8][2:4]}-{fields[8][0:2]}"
+        return False
 
-    def _update_gga(self, fields: List[str]) -> None:
+    @register_decoder("GGA", 9, time_field=0)
+    def _update_gga(self, talker: str, fields: List[str], t_mono: float) -> bool:
         # fields: time, lat, N/S, lon, E/W, quality, num_sats, hdop, alt, ...
         if len(fields) < 6:
-            return
+            return False
         if fields[0]:
             self.state.t_utc = fields[0]
         lat, lon = parse_lat_lon(fields[1], fields[2], fields[3], fields[4])
@@ -107,21 +388,23 @@ class GnssTracker:
             alt = safe_float(fields[8])
             if alt is not None:
                 self.state.alt_m = alt
+        return False
 
-    def _update_gsa(self, fields: List[str]) -> None:
+    @register_decoder("GSA", 17)
+    def _update_gsa(self, talker: str, fields: List[str], t_mono: float) -> bool:
         # fields: mode1, mode2, prn1..prn12, pdop, hdop, vdop
         if len(fields) < 2:
-            return
+            return False
         mode = safe_int(fields[1])
         if mode is not None:
             self.state.fix_mode = mode
-        prn_fields = fields[2:14]
-        used: Set[int] = set()
-        for prn in prn_fields:
-            prn_val = safe_int(prn)
-            if prn_val is not None:
-                used.add(prn_val)
-        self.state.used_prns = used
+        # Multi-constellation receivers send one GSA per system each epoch;
+        # their PRNs accumulate until the next epoch starts.
+        used = {prn for prn in map(safe_int, fields[2:14]) if prn is not None}
+        if self._gsa_epoch == self._epoch_count:
+            used |= self.state.used_prns
+        self._gsa_epoch = self._epoch_count
+        self.state.used_prns = frozenset(used)
         if len(fields) >= 17:
             pdop = safe_float(fields[14])
             hdop = safe_float(fields[15])
@@ -132,8 +415,99 @@ class GnssTracker:
                 self.state.hdop = hdop
             if vdop is not None:
                 self.state.vdop = vdop
+        return False
 
-    def _update_gsv(self, talker: str, fields: List[str]) -> bool:
+    @register_decoder("VTG", 9)
+    def _update_vtg(self, talker: str, fields: List[str], t_mono: float) -> bool:
+        # fields: cog_true, T, cog_mag, M, speed_knots, N, speed_kmh, K, mode
+        if len(fields) < 5:
+            return False
+        track = safe_float(fields[0])
+        if track is not None:
+            self.state.cog_deg = track
+        track_mag = safe_float(fields[2])
+        if track_mag is not None:
+            self.state.cog_mag_deg = track_mag
+        speed = safe_float(fields[4])
+        if speed is not None:
+            self.state.speed_knots = speed
+        if len(fields) > 8 and fields[8]:
+            self.state.pos_mode = fields[8]
+        return False
+
+    @register_decoder("GLL", 7, time_field=4)
+    def _update_gll(self, talker: str, fields: List[str], t_mono: float) -> bool:
+        # fields: lat, N/S, lon, E/W, time, status, mode
+        if len(fields) < 6:
+            return False
+        if fields[5] != "A":
+            # Invalid GLL positions carry stale coordinates; ignore them.
+            return False
+        lat, lon = parse_lat_lon(fields[0], fields[1], fields[2], fields[3])
+        if lat is not None:
+            self.state.lat = lat
+        if lon is not None:
+            self.state.lon = lon
+        if fields[4]:
+            self.state.t_utc = fields[4]
+        if len(fields) > 6 and fields[6]:
+            self.state.pos_mode = fields[6]
+        return False
+
+    @register_decoder("GST", 8, time_field=0)
+    def _update_gst(self, talker: str, fields: List[str], t_mono: float) -> bool:
+        # fields: time, rms, err_major, err_minor, err_orient, err_lat, err_lon, err_alt
+        if len(fields) < 8:
+            return False
+        self.state.rms_range = safe_float(fields[1])
+        self.state.err_major_m = safe_float(fields[2])
+        self.state.err_minor_m = safe_float(fields[3])
+        self.state.err_orient_deg = safe_float(fields[4])
+        self.state.err_lat_m = safe_float(fields[5])
+        self.state.err_lon_m = safe_float(fields[6])
+        self.state.err_alt_m = safe_float(fields[7])
+        return False
+
+    @register_decoder("ZDA", 6, time_field=0)
+    def _update_zda(self, talker: str, fields: List[str], t_mono: float) -> bool:
+        # fields: time, day, month, year, tz_hours, tz_minutes
+        if len(fields) < 4:
+            return False
+        if fields[0]:
+            self.state.t_utc = fields[0]
+        day = safe_int(fields[1])
+        month = safe_int(fields[2])
+        year = safe_int(fields[3])
+        if day is not None and month is not None and year is not None:
+            self.state.utc_date = f"{year:04d}-{month:02d}-{day:02d}"
+        if len(fields) >= 6:
+            tz_h = safe_int(fields[4]) or 0
+            tz_m = safe_int(fields[5]) or 0
+            self.state.tz_offset_min = tz_h * 60 + (tz_m if tz_h >= 0 else -tz_m)
+        return False
+
+    @register_decoder("GBS", 5, time_field=0)
+    def _update_gbs(self, talker: str, fields: List[str], t_mono: float) -> bool:
+        # fields: time, err_lat, err_lon, err_alt, failed_prn, ...
+        if len(fields) < 5:
+            return False
+        self.state.gbs_err_lat_m = safe_float(fields[1])
+        self.state.gbs_err_lon_m = safe_float(fields[2])
+        self.state.gbs_err_alt_m = safe_float(fields[3])
+        self.state.gbs_failed_prn = safe_int(fields[4])
+        return False
+
+    @register_decoder("TXT", 3)
+    def _update_txt(self, talker: str, fields: List[str], t_mono: float) -> bool:
+        # fields: total, number, type, text
+        if len(fields) < 4:
+            return False
+        # Split stops before the text, so commas inside it are kept.
+        self.state.texts = (self.state.texts + (fields[3],))[-TEXT_HISTORY:]
+        return False
+
+    @register_decoder("GSV")
+    def _update_gsv(self, talker: str, fields: List[str], t_mono: float) -> bool:
         # fields: total_msgs, msg_index, total_sats, sat1..sat4*4
         if len(fields) < 3:
             return False
@@ -143,57 +517,146 @@ class GnssTracker:
         if total_msgs is None or msg_index is None:
             return False
         buffer = self._gsv_buffers.get(talker)
-        if msg_index == 1 or buffer is None or buffer.get("total_msgs") != total_msgs:
-            buffer = {
-                "total_msgs": total_msgs,
-                "total_sats": total_sats,
-                "msg_map": {},
-            }
+        if msg_index == 1:
+            buffer = _GsvBurst(total_msgs=total_msgs, total_sats=total_sats, next_index=1, sats=[])
             self._gsv_buffers[talker] = buffer
+        elif buffer is None or buffer.total_msgs != total_msgs or buffer.next_index != msg_index:
+            # Out-of-sequence part: discard the burst and wait for the next one.
+            self._gsv_buffers.pop(talker, None)
+            return False
 
-        gnssid = _gnssid_from_talker(talker)
-        sats = self._parse_gsv_sats(fields[3:], gnssid)
-        buffer["msg_map"][msg_index] = sats
-        buffer["total_sats"] = total_sats if total_sats is not None else buffer.get("total_sats")
-
-        if msg_index == total_msgs and len(buffer["msg_map"]) == total_msgs:
-            # Only publish a new satellite frame when the burst is complete.
-            merged: List[SatInfo] = []
-            for idx in sorted(buffer["msg_map"].keys()):
-                merged.extend(buffer["msg_map"][idx])
-            for sat in merged:
-                sat.used = sat.prn in self.state.used_prns
-            self._gsv_frames[talker] = {
-                "sats": merged,
-                "total_sats": buffer.get("total_sats"),
-            }
-            all_sats: List[SatInfo] = []
-            in_view_total = 0
-            for frame in self._gsv_frames.values():
-                frame_sats = frame.get("sats", [])
-                all_sats.extend(frame_sats)
-                frame_count = frame.get("total_sats")
-                if isinstance(frame_count, int):
-                    in_view_total += frame_count
-            self.state.sats = all_sats
-            self.state.in_view_count = in_view_total if in_view_total > 0 else None
-            return True
-        return False
+        self._parse_gsv_sats(fields, _gnssid_from_talker(talker), buffer.sats)
+        if total_sats is not None:
+            buffer.total_sats = total_sats
+        buffer.next_index = msg_index + 1
+        if msg_index != total_msgs:
+            return False
+
+        # Only publish a new satellite frame when the burst is complete, and
+        # only recompute the constellation that sent it.
+        del self._gsv_buffers[talker]
+        used_prns = self.state.used_prns
+        sats = buffer.sats
+        for i, sat in enumerate(sats):
+            used = sat.prn in used_prns
+            if sat.used != used:
+                sat = SatInfo(sat.gnssid, sat.prn, sat.el, sat.az, sat.snr, used)
+                sats[i] = sat
+                self._sat_records[(sat.gnssid, sat.prn)] = sat
+        previous = self._gsv_frames.get(talker)
+        if previous is None:
+            self._gsv_frames[talker] = _GsvFrame(sats=buffer.sats, total_sats=buffer.total_sats, updated=t_mono)
+        else:
+            self._drop_records(previous.sats, buffer.sats)
+            previous.sats = buffer.sats
+            previous.total_sats = buffer.total_sats
+            previous.updated = t_mono
+        for stale_talker in [k for k, frame in self._gsv_frames.items() if t_mono - frame.updated > self.GSV_STALE_S]:
+            self._drop_records(self._gsv_frames.pop(stale_talker).sats, ())
+        self._publish_sats()
+        return True
+
+    @register_ubx_decoder(NAV_PVT, decode_nav_pvt)
+    def _update_nav_pvt(self, pvt: NavPvt) -> None:
+        state = self.state
+        if pvt.t_utc:
+            state.t_utc = pvt.t_utc
+        if pvt.date:
+            state.utc_date = pvt.date
+        fix_type = pvt.fix_type
+        # fixType 1 dead reckoning, 2 2D, 3 3D, 4 GNSS + dead reckoning,
+        # 5 time only; mapped to GSA mode, GGA quality and RMC status/mode.
+        state.fix_mode = 3 if fix_type in (3, 4) else 2 if fix_type == 2 else 1
+        if pvt.fix_ok and fix_type in (1, 2, 3, 4):
+            if pvt.carr_soln == 2:
+                state.quality, state.pos_mode = 4, "R"
+            elif pvt.carr_soln == 1:
+                state.quality, state.pos_mode = 5, "F"
+            elif fix_type == 1:
+                state.quality, state.pos_mode = 6, "E"
+            elif pvt.diff_soln:
+                state.quality, state.pos_mode = 2, "D"
+            else:
+                state.quality, state.pos_mode = 1, "A"
+            state.fix_status = "A"
+            state.lat = pvt.lat
+            state.lon = pvt.lon
+            state.alt_m = pvt.alt_msl_m
+            state.speed_knots = pvt.speed_mps * _KNOTS
+            state.cog_deg = pvt.heading_deg
+            # hAcc/vAcc are the receiver's own accuracy estimates; shown
+            # where GST error figures go.
+            state.err_lat_m = pvt.h_acc_m
+            state.err_lon_m = pvt.h_acc_m
+            state.err_alt_m = pvt.v_acc_m
+        else:
+            state.fix_status, state.quality, state.pos_mode = "V", 0, "N"
+        state.pdop = pvt.pdop
+        state.used_count = pvt.num_sv
+
+    @register_ubx_decoder(NAV_DOP, decode_nav_dop)
+    def _update_nav_dop(self, dop: NavDop) -> None:
+        self.state.pdop = dop.pdop
+        self.state.hdop = dop.hdop
+        self.state.vdop = dop.vdop
 
-    def _parse_gsv_sats(self, fields: List[str], gnssid: str) -> List[SatInfo]:
+    @register_ubx_decoder(NAV_SAT, decode_nav_sat)
+    def _update_nav_sat(self, nav: NavSat) -> None:
+        # Same copy-on-write records as the GSV path. PRNs follow NMEA
+        # numbering (GLONASS slots as 65-96) so satellites keep their
+        # identity in trails and history whichever protocol reports them.
+        records = self._sat_records
         sats: List[SatInfo] = []
-        for i in range(0, len(fields), 4):
-            chunk = fields[i : i + 4]
-            if len(chunk) < 4:
-                continue
-            prn = safe_int(chunk[0])
+        used_prns = set()
+        for info in nav.sats:
+            gnssid = info.gnssid
+            prn = info.sv_id + 64 if gnssid == "GLONASS" and info.sv_id <= 32 else info.sv_id
+            snr = info.cno or None
+            sat = records.get((gnssid, prn))
+            if sat is None or sat.snr != snr or sat.el != info.elev or sat.az != info.azim or sat.used != info.used:
+                sat = SatInfo(gnssid, prn, info.elev, info.azim, snr, info.used)
+                records[(gnssid, prn)] = sat
+            sats.append(sat)
+            if info.used:
+                used_prns.add(prn)
+        self.state.sats = tuple(sats)
+        self.state.used_prns = frozenset(used_prns)
+        self.state.in_view_count = len(sats) or None
+
+    def _publish_sats(self) -> None:
+        all_sats: List[SatInfo] = []
+        in_view_total = 0
+        for frame in self._gsv_frames.values():
+            all_sats.extend(frame.sats)
+            if frame.total_sats is not None:
+                in_view_total += frame.total_sats
+        self.state.sats = tuple(all_sats)
+        self.state.in_view_count = in_view_total if in_view_total > 0 else None
+
+    def _drop_records(self, old: List[SatInfo], current: Sequence[SatInfo]) -> None:
+        # Forget satellites that fell out of a constellation's latest burst.
+        keep = {(sat.gnssid, sat.prn) for sat in current}
+        for sat in old:
+            if (sat.gnssid, sat.prn) not in keep:
+                self._sat_records.pop((sat.gnssid, sat.prn), None)
+
+    def _parse_gsv_sats(self, fields: List[str], gnssid: str, out: List[SatInfo]) -> None:
+        # Satellite blocks start after the three header fields. Known records
+        # are reused as-is when nothing changed and replaced (never mutated)
+        # when something did, since snapshots may still reference them.
+        records = self._sat_records
+        for i in range(3, len(fields) - 3, 4):
+            prn = safe_int(fields[i])
             if prn is None:
                 continue
-            el = safe_int(chunk[1])
-            az = safe_int(chunk[2])
-            snr = safe_int(chunk[3])
-            sats.append(SatInfo(gnssid=gnssid, prn=prn, el=el, az=az, snr=snr))
-        return sats
+            el = safe_int(fields[i + 1])
+            az = safe_int(fields[i + 2])
+            snr = safe_int(fields[i + 3])
+            sat = records.get((gnssid, prn))
+            if sat is None or sat.snr != snr or sat.el != el or sat.az != az:
+                sat = SatInfo(gnssid, prn, el, az, snr, sat.used if sat is not None else False)
+                records[(gnssid, prn)] = sat
+            out.append(sat)
 
 
 def _gnssid_from_talker(talker: str) -> str:
@@ -0,0 +1,145 @@
+"""
+Satellite sky-plot trails.
+
+Each satellite keeps a fixed-capacity ring of (time, az, el, snr) samples in
+typed arrays, so memory per satellite is constant however long the receiver
+runs. Satellites not seen for EXPIRE_S are evicted.
+
+For the wire, trails are thinned to every WIRE_STRIDE-th stored sample. The
+chosen samples never change as new ones arrive, so a client holding a trail
+only ever needs the points appended since its last copy ("trail_seq" counts
+wire points ever produced for that satellite).
+"""
+
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .tracker import SatInfo
+
+SatKey = Tuple[str, int]
+
+
+class SatTrail:
+    __slots__ = ("t", "az", "el", "snr", "start", "count", "seq", "last_seen", "_wire_seq", "_wire")
+
+    def __init__(self, capacity: int) -> None:
+        self.t = array("d", bytes(8 * capacity))
+        self.az = array("f", bytes(4 * capacity))
+        self.el = array("f", bytes(4 * capacity))
+        self.snr = array("f", bytes(4 * capacity))
+        self.start = 0
+        self.count = 0
+        # Samples ever stored; the absolute index of the oldest is seq - count.
+        self.seq = 0
+        self.last_seen = 0.0
+        self._wire_seq = -1
+        self._wire: List[List[float]] = []
+
+    def add(self, t: float, az: float, el: float, snr: float) -> None:
+        capacity = len(self.t)
+        if self.count == capacity:
+            i = self.start
+            self.start = (self.start + 1) % capacity
+        else:
+            i = (self.start + self.count) % capacity
+            self.count += 1
+        self.t[i] = t
+        self.az[i] = az
+        self.el[i] = el
+        self.snr[i] = snr
+        self.seq += 1
+
+    def wire(self, stride: int, points: int) -> Tuple[int, List[List[float]]]:
+        # Every stride-th sample by absolute index, newest `points` of them,
+        # as [az, el] pairs; rebuilt only when a new wire point appears.
+        if not self.seq:
+            return 0, []
+        last = (self.seq - 1) // stride * stride
+        wire_seq = last // stride + 1
+        if wire_seq == self._wire_seq:
+            return wire_seq, self._wire
+        oldest = self.seq - self.count
+        first = max(-(-oldest // stride) * stride, last - (points - 1) * stride)
+        capacity = len(self.t)
+        out = []
+        for i in range(first, last + 1, stride):
+            j = (self.start + i - oldest) % capacity
+            out.append([round(self.az[j], 1), round(self.el[j], 1)])
+        self._wire_seq = wire_seq
+        self._wire = out
+        return wire_seq, out
+
+
+class SatTrails:
+    # One trail per (constellation, PRN). update() is called once per
+    # published epoch with the epoch's UTC time.
+    EXPIRE_S = 600.0
+
+    def __init__(
+        self,
+        capacity: int = 1080,
+        min_interval_s: float = 10.0,
+        wire_stride: int = 6,
+        wire_points: int = 60,
+    ) -> None:
+        # Defaults: a sample every 10 s for 3 h; the wire gets one point a
+        # minute for the last hour.
+        self.capacity = capacity
+        self.min_interval_s = min_interval_s
+        self.wire_stride = wire_stride
+        self.wire_points = wire_points
+        self._trails: Dict[SatKey, SatTrail] = {}
+        self._last_utc: Optional[float] = None
+        self._last_sample: Optional[float] = None
+        self._day_offset = 0.0
+
+    def __len__(self) -> int:
+        return len(self._trails)
+
+    def clear(self) -> None:
+        self._trails.clear()
+        self._last_utc = None
+        self._last_sample = None
+        self._day_offset = 0.0
+
+    def update(self, sats: Iterable["SatInfo"], utc_s: float) -> None:
+        # utc_s is seconds of day; trails run on a clock that keeps counting
+        # past midnight.
+        if self._last_utc is not None and utc_s < self._last_utc - 43200:
+            self._day_offset += 86400.0
+        self._last_utc = utc_s
+        t = utc_s + self._day_offset
+        # All satellites are sampled on a shared tick, so most epochs return
+        # here without touching the satellite list.
+        last = self._last_sample
+        if last is not None and 0 <= t - last < self.min_interval_s:
+            return
+        self._last_sample = t
+        trails = self._trails
+        for sat in sats:
+            if sat.az is None or sat.el is None:
+                continue
+            key = (sat.gnssid, sat.prn)
+            trail = trails.get(key)
+            if trail is None:
+                trail = trails[key] = SatTrail(self.capacity)
+            trail.last_seen = t
+            trail.add(t, sat.az, sat.el, sat.snr if sat.snr is not None else -1.0)
+        expired = [key for key, trail in trails.items() if t - trail.last_seen > self.EXPIRE_S]
+        for key in expired:
+            del trails[key]
+
+    def wire(self, key: SatKey) -> Tuple[int, List[List[float]]]:
+        trail = self._trails.get(key)
+        if trail is None:
+            return 0, []
+        return trail.wire(self.wire_stride, self.wire_points)
+
+    def stats(self) -> Dict[str, int]:
+        trails = self._trails.values()
+        return {
+            "satellites": len(self._trails),
+            "samples": sum(trail.count for trail in trails),
+            "bytes": len(self._trails) * self.capacity * 20,
+        }
@@ -0,0 +1,218 @@
+"""
+u-blox UBX binary protocol.
+
+Frame layout: sync 0xB5 0x62, class u8, id u8, payload length u16 LE, payload,
+then an 8-bit Fletcher checksum (CK_A, CK_B) over class..payload. Only the
+navigation solution messages NavScope shows are decoded: NAV-PVT (time,
+position, velocity, fix), NAV-DOP and NAV-SAT. Field meanings follow the
+u-blox 8/M8 and later interface descriptions.
+
+Recorded logs are line-oriented, so frames are written to them as text lines
+"UBX,<hex of the whole frame>" (see ubx_to_text); the tracker accepts both
+forms.
+"""
+
+import struct
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple, Union
+
+UBX_SYNC = b"\xb5\x62"
+UBX_TEXT_PREFIX = b"UBX,"
+# Longest payload accepted when framing; NAV-SAT with 255 satellites is ~3 KB.
+UBX_MAX_PAYLOAD = 4096
+
+NAV_PVT = b"\x01\x07"
+NAV_DOP = b"\x01\x04"
+NAV_SAT = b"\x01\x35"
+MESSAGE_NAMES: Dict[bytes, str] = {NAV_PVT: "NAV-PVT", NAV_DOP: "NAV-DOP", NAV_SAT: "NAV-SAT"}
+
+# Message classes defined by u-blox 8/M8 and later; a sync pair followed by
+# any other class byte is taken for noise.
+UBX_CLASSES = frozenset((0x01, 0x02, 0x04, 0x05, 0x06, 0x09, 0x0A, 0x0B, 0x0D, 0x10, 0x13, 0x21, 0x27, 0x28))
+
+# UBX gnssId -> constellation name as used by the tracker.
+GNSS_IDS: Dict[int, str] = {0: "GPS", 1: "SBAS", 2: "GALILEO", 3: "BEIDOU", 5: "QZSS", 6: "GLONASS"}
+
+# NAV-PVT pieces: time @0, fix and position @16, ground speed, heading of
+# motion and pDOP @60.
+_PVT_TIME = struct.Struct("<IHBBBBBB")
+_PVT_FIX = struct.Struct("<iBBBBiiiiII")
+_PVT_MOTION = struct.Struct("<ii8xH")
+_PVT_SIZE = 78
+_DOP = struct.Struct("<IHHHHHHH")
+_SAT_HEADER = struct.Struct("<IBBxx")
+_SAT_BLOCK = struct.Struct("<BBBbhhI")
+_LENGTH = struct.Struct("<H")
+
+
+def ubx_checksum(data: bytes) -> bytes:
+    # Fletcher-8 over class, id, length and payload. CK_B is the sum of the
+    # running CK_A values, so both come out of C-level sums.
+    running = list(accumulate(data))
+    if not running:
+        return b"\0\0"
+    return bytes((running[-1] & 0xFF, sum(running) & 0xFF))
+
+
+def ubx_frame(msg: bytes, payload: bytes) -> bytes:
+    # Build a frame for a 2-byte class/id and payload.
+    body = msg + _LENGTH.pack(len(payload)) + payload
+    return UBX_SYNC + body + ubx_checksum(body)
+
+
+def plausible_header(msg: bytes, length: int) -> bool:
+    # Whether a class/id and payload length can start a real frame, so a
+    # corrupted header is rejected before waiting for its payload.
+    if msg[0] not in UBX_CLASSES or length > UBX_MAX_PAYLOAD:
+        return False
+    if msg == NAV_PVT:
+        # 84 bytes in protocol 14, 92 from u-blox 8 on.
+        return length in (84, 92)
+    if msg == NAV_DOP:
+        return length == _DOP.size
+    if msg == NAV_SAT:
+        return length >= _SAT_HEADER.size and (length - _SAT_HEADER.size) % _SAT_BLOCK.size == 0
+    return True
+
+
+def check_frame(frame: bytes) -> Optional[Tuple[bytes, bytes]]:
+    # (class/id, payload) of a complete, valid frame, else None.
+    if len(frame) < 8 or frame[:2] != UBX_SYNC:
+        return None
+    length = frame[4] | frame[5] << 8
+    if len(frame) != length + 8 or ubx_checksum(frame[2:-2]) != frame[-2:]:
+        return None
+    return frame[2:4], frame[6:-2]
+
+
+def format_utc(seconds: float) -> str:
+    # Seconds of day -> "hhmmss.ss", the form u-blox NMEA output uses, so
+    # UBX and NMEA messages of one epoch carry the same time string.
+    seconds = round(seconds, 2) % 86400.0
+    hh, rest = divmod(seconds, 3600.0)
+    mm, ss = divmod(rest, 60.0)
+    return "%02d%02d%05.2f" % (hh, mm, ss)
+
+
+def ubx_to_text(frame: bytes) -> bytes:
+    return UBX_TEXT_PREFIX + frame.hex().encode("ascii")
+
+
+def ubx_from_text(line: bytes) -> Optional[bytes]:
+    try:
+        return bytes.fromhex(line[len(UBX_TEXT_PREFIX) :].decode("ascii"))
+    except ValueError:
+        return None
+
+
+@dataclass(slots=True)
+class NavPvt:
+    itow_ms: int
+    # UTC as NMEA "hhmmss.ss" and "YYYY-MM-DD"; None unless marked valid.
+    t_utc: Optional[str]
+    date: Optional[str]
+    fix_type: int
+    fix_ok: bool
+    diff_soln: bool
+    # 0 none, 1 RTK float, 2 RTK fixed.
+    carr_soln: int
+    num_sv: int
+    lat: float
+    lon: float
+    alt_msl_m: float
+    h_acc_m: float
+    v_acc_m: float
+    speed_mps: float
+    heading_deg: float
+    pdop: float
+
+
+@dataclass(slots=True)
+class NavDop:
+    itow_ms: int
+    pdop: float
+    hdop: float
+    vdop: float
+
+
+@dataclass(slots=True)
+class NavSatInfo:
+    gnssid: str
+    sv_id: int
+    cno: int
+    elev: Optional[int]
+    azim: Optional[int]
+    used: bool
+
+
+@dataclass(slots=True)
+class NavSat:
+    itow_ms: int
+    sats: List[NavSatInfo]
+
+
+UbxMessage = Union[NavPvt, NavDop, NavSat]
+
+
+def decode_nav_pvt(payload: bytes) -> Optional[NavPvt]:
+    if len(payload) < _PVT_SIZE:
+        return None
+    itow, year, month, day, hour, minute, sec, valid = _PVT_TIME.unpack_from(payload, 0)
+    nano, fix_type, flags, _, num_sv, lon, lat, _, h_msl, h_acc, v_acc = _PVT_FIX.unpack_from(payload, 16)
+    g_speed, head_mot, p_dop = _PVT_MOTION.unpack_from(payload, 60)
+    t_utc = None
+    if valid & 0x02:
+        # nano may be negative (the rounded second is ahead); centiseconds
+        # as u-blox NMEA output prints them.
+        t_utc = format_utc(hour * 3600 + minute * 60 + sec + nano * 1e-9)
+    return NavPvt(
+        itow_ms=itow,
+        t_utc=t_utc,
+        date="%04d-%02d-%02d" % (year, month, day) if valid & 0x01 else None,
+        fix_type=fix_type,
+        fix_ok=bool(flags & 0x01),
+        diff_soln=bool(flags & 0x02),
+        carr_soln=flags >> 6,
+        num_sv=num_sv,
+        lat=lat * 1e-7,
+        lon=lon * 1e-7,
+        alt_msl_m=h_msl * 1e-3,
+        h_acc_m=h_acc * 1e-3,
+        v_acc_m=v_acc * 1e-3,
+        speed_mps=g_speed * 1e-3,
+        heading_deg=head_mot * 1e-5,
+        pdop=p_dop * 0.01,
+    )
+
+
+def decode_nav_dop(payload: bytes) -> Optional[NavDop]:
+    if len(payload) < _DOP.size:
+        return None
+    itow, _g, p, _t, v, h, _n, _e = _DOP.unpack_from(payload)
+    return NavDop(itow, p * 0.01, h * 0.01, v * 0.01)
+
+
+def decode_nav_sat(payload: bytes) -> Optional[NavSat]:
+    # Elevation/azimuth are None when unknown.
+    if len(payload) < _SAT_HEADER.size:
+        return None
+    itow, _version, count = _SAT_HEADER.unpack_from(payload)
+    if len(payload) < _SAT_HEADER.size + count * _SAT_BLOCK.size:
+        return None
+    sats = []
+    for gnss_id, sv_id, cno, elev, azim, _pr_res, flags in _SAT_BLOCK.iter_unpack(
+        payload[_SAT_HEADER.size : _SAT_HEADER.size + count * _SAT_BLOCK.size]
+    ):
+        known = -90 <= elev <= 90
+        sats.append(
+            NavSatInfo(
+                GNSS_IDS.get(gnss_id, "GNSS"),
+                sv_id,
+                cno,
+                elev if known else None,
+                azim if known and 0 <= azim <= 360 else None,
+                bool(flags & 0x08),
+            )
+        )
+    return NavSat(itow, sats)
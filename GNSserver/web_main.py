@@ -11,16 +11,73 @@ import contextlib
 import json
 import math
 import random
-import threading
 import time
+import traceback
 from collections import deque
 from dataclasses import dataclass, field
-from typing import Deque, Dict, List, Optional
+from typing import Deque, Dict, Iterable, List, Optional, Tuple, Union
 
 from aiohttp import web
 
-from .nmea_reader import NmeaReader
-from .tracker import GnssTracker, SatInfo
+from .breadcrumbs import Breadcrumbs, parse_bbox
+from .channel import LatestValue
+from .fanout import NmeaFanout
+from .history import HistoryStore
+from .nmea_reader import READ_MODES, NmeaReader
+from .recorder import NmeaRecorder, add_record_args, recorder_from_args
+from .replay import LogReplay
+from .shm import SharedStatePublisher
+from .tracker import GnssState, GnssTracker, SatInfo
+from .wire import (
+    BIN_HEARTBEAT,
+    PROTOCOLS,
+    DeltaEncoder,
+    EncodedState,
+    TopicState,
+    binary_header,
+    dumps,
+    parse_topics,
+)
+from .ws_clients import ClientSession, Message
+
+
+class SourceStats:
+    # Per-source load, rolled over every WINDOW_S: input lines and published
+    # epochs per second, share of the event loop spent parsing and encoding
+    # for this source, and receive-to-send latency of published epochs.
+    WINDOW_S = 1.0
+
+    def __init__(self) -> None:
+        self.lines = 0
+        self.epochs = 0
+        self.busy_s = 0.0
+        self._latency: List[float] = []
+        self._mark = (time.monotonic(), 0, 0, 0.0)
+        self._window: Dict[str, object] = {}
+        self._roll(time.monotonic())
+
+    def latency(self, seconds: float) -> None:
+        self._latency.append(seconds * 1000.0)
+
+    def snapshot(self) -> Dict[str, object]:
+        now = time.monotonic()
+        if now - self._mark[0] >= self.WINDOW_S:
+            self._roll(now)
+        return {"lines": self.lines, "epochs": self.epochs, **self._window}
+
+    def _roll(self, now: float) -> None:
+        start, lines, epochs, busy_s = self._mark
+        elapsed = max(now - start, 1e-9)
+        latency = self._latency
+        self._window = {
+            "lines_per_s": round((self.lines - lines) / elapsed, 1),
+            "epochs_per_s": round((self.epochs - epochs) / elapsed, 2),
+            "cpu_pct": round(100.0 * (self.busy_s - busy_s) / elapsed, 1),
+            "latency_ms": round(sum(latency) / len(latency), 2) if latency else None,
+            "latency_max_ms": round(max(latency), 2) if latency else None,
+        }
+        self._latency = []
+        self._mark = (now, self.lines, self.epochs, self.busy_s)
 
 
 @dataclass
@@ -35,7 +92,9 @@ class DummySat:
 
 
 class DummyGnss:
-    def __init__(self) -> None:
+    def __init__(self, name: str = "default") -> None:
+        self.name = name
+        self.stats = SourceStats()
         prns = [
             ("GPS", 1),
             ("GPS", 2),
@@ -62,13 +121,68 @@ class DummyGnss:
                     used=prn in {1, 2, 4, 7, 66, 11, 21},
                 )
             )
-        self.start = time.monotonic()
+        self.started = time.monotonic()
         self.last_tick = 0.0
+        self.published_at = self.started
+        self.updates: LatestValue[None] = LatestValue()
+        self._encoded: Optional[EncodedState] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    async def _run(self) -> None:
+        # Dummy data changes continuously; signal an update twice a second.
+        while True:
+            self.published_at = time.monotonic()
+            self.stats.epochs += 1
+            self.updates.publish(None)
+            await asyncio.sleep(0.5)
+
+    def describe(self) -> Dict[str, object]:
+        return {"kind": "dummy"}
+
+    def health(self) -> Dict[str, object]:
+        return {"age_ms": 200, "avg_dt_ms": 980, "status": "LIVE"}
+
+    def replay_status(self) -> Optional[Dict[str, object]]:
+        return None
+
+    def recorder_stats(self) -> Optional[Dict[str, object]]:
+        return None
+
+    def fanout_stats(self) -> Optional[Dict[str, object]]:
+        return None
+
+    def shm_stats(self) -> Optional[Dict[str, object]]:
+        return None
+
+    def history(self) -> Optional[HistoryStore]:
+        return None
+
+    def breadcrumbs(self) -> Optional[Breadcrumbs]:
+        return None
+
+    def encoded(self) -> EncodedState:
+        # One payload per published update, shared by every client.
+        version = self.updates.version
+        if self._encoded is None or self._encoded.version != version:
+            self._encoded = EncodedState(version, self._build_payload())
+        return self._encoded
 
     def next_state(self) -> Dict[str, object]:
+        return {**self.encoded().body, "health": self.health()}
+
+    def _build_payload(self) -> Dict[str, object]:
         # Produce a GNSS-like payload that exercises all UI states.
         now = time.monotonic()
-        t = now - self.start
+        t = now - self.started
         if now - self.last_tick >= 1.0:
             self.last_tick = now
             for sat in self.sats:
@@ -105,12 +219,8 @@ class DummyGnss:
         cog_deg = (120 + t * 6 + math.sin(t / 7.0) * 10) % 360
 
         return {
+            "source": self.name,
             "t_utc": time.strftime("%H%M%S", time.gmtime()),
-            "health": {
-                "age_ms": 200,
-                "avg_dt_ms": 980,
-                "status": "LIVE",
-            },
             "fix": {
                 "status": "A",
                 "mode": 3,
@@ -131,56 +241,257 @@ class DummyGnss:
 
 
 class LiveGnss:
-    def __init__(self, port: Optional[str], baud: int, file_path: Optional[str], replay_rate: float) -> None:
-        self.reader = NmeaReader(port, baud, file_path, replay_rate)
+    def __init__(
+        self,
+        port: Optional[str],
+        baud: int,
+        file_path: Optional[str],
+        replay_rate: float,
+        read_mode: str = "bulk",
+        recorder: Optional[NmeaRecorder] = None,
+        name: str = "default",
+        fanout: Optional[NmeaFanout] = None,
+        shm: Optional[SharedStatePublisher] = None,
+    ) -> None:
+        self.name = name
+        self.reader = NmeaReader(port, baud, file_path, replay_rate, read_mode)
+        self.recorder = recorder
+        self.fanout = fanout
+        self.shm = shm
         self.tracker = GnssTracker()
+        self.stats = SourceStats()
+        # Receive time of the sentence that completed the last published epoch.
+        self.published_at = time.monotonic()
         self.last_line_time: Optional[float] = None
         self.dt_samples: Deque[float] = deque(maxlen=50)
-        self._lock = threading.Lock()
-        self._stop = threading.Event()
-        self._thread: Optional[threading.Thread] = None
+        # Epoch snapshots handed to the broadcaster; everything runs on one
+        # loop and snapshots are immutable, so no locking is needed.
+        self.updates: LatestValue[GnssState] = LatestValue(self.tracker.snapshot)
+        self._encoded: Optional[EncodedState] = None
+        # Satellite payload dicts keyed by (gnssid, prn), reused while the
+        # tracker keeps handing out the same (copy-on-write) SatInfo record
+        # and the satellite's wire trail has not grown.
+        self._sat_payloads: Dict[Tuple[str, int], Tuple[SatInfo, int, Dict[str, object]]] = {}
+        self._replay_generation = 0
+        self._task: Optional[asyncio.Task] = None
+        if self.reader.replay is not None:
+            # Keep the source alive at the end of a log so it can be scrubbed.
+            self.reader.replay.hold_at_end = True
 
     def start(self) -> None:
-        self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
-
-    def stop(self) -> None:
-        self._stop.set()
-        if self._thread:
-            self._thread.join(timeout=1.0)
-
-    def _run(self) -> None:
-        # Reader thread: parse lines and update the shared tracker state.
-        for line, t_mono in self.reader.iter_lines():
-            if self._stop.is_set():
-                break
-            with self._lock:
-                if self.last_line_time is not None:
-                    self.dt_samples.append((t_mono - self.last_line_time) * 1000)
-                self.last_line_time = t_mono
-                self.tracker.update_from_line(line)
+        # Must be called from the running event loop.
+        if self.recorder is not None:
+            self.recorder.start()
+        if self.shm is not None:
+            try:
+                self.shm.open()
+            except OSError as exc:
+                print(f"[SharedState] Could not open {self.shm.path}: {exc}")
+                self.shm = None
+        self._task = asyncio.create_task(self._run())
 
-    def next_state(self) -> Dict[str, object]:
-        # Snapshot the current tracker state into the web payload shape.
-        now = time.monotonic()
-        with self._lock:
-            state = self.tracker.state
-            last_line_time = self.last_line_time
-            dt_samples = list(self.dt_samples)
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as exc:
+                # _run logs its own failures; whatever gets here must not
+                # keep the fanout, shared memory or recording from closing.
+                print(f"[LiveGnss] {self.name}: reader task failed: {exc!r}")
+        if self.fanout is not None:
+            await self.fanout.stop()
+        if self.shm is not None:
+            self.shm.close()
+        if self.recorder is not None:
+            # Joins the writer thread, which flushes and closes the file.
+            await asyncio.get_running_loop().run_in_executor(None, self.recorder.stop)
+
+    async def _run(self) -> None:
+        # Reader task. A failure is logged rather than ending the task
+        # silently; health then goes stale while the server keeps running.
+        try:
+            await self._read()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            print(f"[LiveGnss] {self.name}: reader stopped on an error:")
+            traceback.print_exc()
 
+    async def _read(self) -> None:
+        # Parse lines and update the tracker on the event loop.
+        replay = self.reader.replay
+        recorder = self.recorder
+        fanout = self.fanout
+        if fanout is not None:
+            await fanout.start()
+        if replay is not None and replay.generation != self._replay_generation:
+            # Seeked before starting (--seek).
+            self._rebuild_after_seek(replay)
+        stats = self.stats
+        clock = time.perf_counter
+        async for line, t_mono in self.reader.aiter_lines():
+            started = clock()
+            if recorder is not None:
+                recorder.write(line, t_mono)
+            if fanout is not None:
+                fanout.publish(line)
+            if self.last_line_time is not None:
+                self.dt_samples.append((t_mono - self.last_line_time) * 1000)
+            self.last_line_time = t_mono
+            if self.tracker.update_from_line(line, t_mono):
+                self._publish(t_mono)
+            if replay is not None and replay.at_end and self.tracker.flush(t_mono):
+                self._publish(t_mono)
+            stats.lines += 1
+            stats.busy_s += clock() - started
+        # End of a replay file: publish the final partial epoch.
+        if self.tracker.flush():
+            self._publish(time.monotonic())
+
+    def _publish(self, t_mono: float) -> None:
+        self.published_at = t_mono
+        self.stats.epochs += 1
+        self.updates.publish(self.tracker.snapshot)
+        if self.shm is not None:
+            self.shm.publish(self.tracker.snapshot, t_mono)
+
+    def describe(self) -> Dict[str, object]:
+        reader = self.reader
+        if reader.file_path:
+            return {"kind": "file", "path": reader.file_path}
+        return {"kind": "serial", "port": reader.port, "baud": reader.baud}
+
+    def replay_status(self) -> Optional[Dict[str, object]]:
+        replay = self.reader.replay
+        return replay.status() if replay is not None else None
+
+    def recorder_stats(self) -> Optional[Dict[str, object]]:
+        return self.recorder.stats() if self.recorder is not None else None
+
+    def fanout_stats(self) -> Optional[Dict[str, object]]:
+        return self.fanout.stats() if self.fanout is not None else None
+
+    def shm_stats(self) -> Optional[Dict[str, object]]:
+        return self.shm.stats() if self.shm is not None else None
+
+    def history(self) -> Optional[HistoryStore]:
+        return self.tracker.history
+
+    def breadcrumbs(self) -> Optional[Breadcrumbs]:
+        return self.tracker.breadcrumbs
+
+    def control_replay(self, action: str, value: object = None) -> Dict[str, object]:
+        # Transport controls for file replay: play, pause, seek (seconds into
+        # the log, or UTC "HH:MM:SS"), speed (0 = as fast as possible) and
+        # step (one epoch, leaves playback paused). Raises ValueError on bad
+        # input.
+        replay = self.reader.replay
+        if replay is None:
+            raise ValueError("not replaying a file")
+        if action == "play":
+            if replay.at_end:
+                replay.seek(0)
+                self._rebuild_after_seek(replay)
+            replay.resume()
+        elif action == "pause":
+            replay.pause()
+        elif action == "seek":
+            if value is None:
+                raise ValueError("seek needs a value")
+            replay.seek_spec(str(value))
+            self._rebuild_after_seek(replay)
+        elif action == "speed":
+            rate = float(value)  # type: ignore[arg-type]
+            if not math.isfinite(rate) or rate < 0:
+                raise ValueError("speed must be a finite number >= 0")
+            replay.set_rate(rate)
+        elif action == "step":
+            replay.pause()
+            t_mono = time.monotonic()
+            for line in replay.read_epoch():
+                self.tracker.update_from_line(line, t_mono)
+            self.tracker.flush(t_mono)
+            self.last_line_time = t_mono
+            self._publish(t_mono)
+        else:
+            raise ValueError(f"unknown replay action {action!r}")
+        return replay.status()
+
+    def _rebuild_after_seek(self, replay: LogReplay) -> None:
+        # Rebuild tracker state at the seek target from a checkpoint epoch
+        # GSV_STALE_S earlier instead of from the start of the log: anything
+        # older than that has aged out of the tracker anyway. The target
+        # epoch itself is applied too, so the UI lands on it immediately,
+        # even while paused.
+        self._replay_generation = replay.generation
+        index = replay.index
+        target = replay.epoch
+        t_mono = time.monotonic()
+        self.tracker.reset()
+        if target < len(index):
+            checkpoint = index.epoch_at(index.elapsed[target] - GnssTracker.GSV_STALE_S)
+            for line in replay.epoch_lines(checkpoint, target):
+                self.tracker.update_from_line(line, t_mono)
+        for line in replay.read_epoch():
+            self.tracker.update_from_line(line, t_mono)
+        self.tracker.flush(t_mono)
+        self.last_line_time = t_mono
+        self.dt_samples.clear()
+        self._publish(t_mono)
+
+    def health(self) -> Dict[str, object]:
+        # Link health from the age of the last sentence; changes even when the
+        # tracker state does not.
+        now = time.monotonic()
+        last_line_time = self.last_line_time
+        dt_samples = self.dt_samples
         age_ms = (now - last_line_time) * 1000 if last_line_time else 99999.0
         avg_dt = sum(dt_samples) / len(dt_samples) if dt_samples else 0.0
         status = "LIVE" if age_ms < 1500 else "STALE" if age_ms < 5000 else "DEAD"
+        health: Dict[str, object] = {
+            "age_ms": int(age_ms),
+            "avg_dt_ms": int(avg_dt),
+            "status": status,
+        }
+        replay = self.reader.replay
+        if replay is not None:
+            health["replay"] = replay.status()
+        return health
+
+    def encoded(self) -> EncodedState:
+        # Build and encode each tracker snapshot once, however many clients
+        # and broadcaster ticks ask for it.
+        state = self.updates.value
+        if self._encoded is None or self._encoded.version != state.version:
+            self._encoded = EncodedState(state.version, self._build_payload(state))
+        return self._encoded
+
+    def next_state(self) -> Dict[str, object]:
+        return {**self.encoded().body, "health": self.health()}
+
+    def _build_payload(self, state: GnssState) -> Dict[str, object]:
+        # Snapshot the current tracker state into the web payload shape.
         used = len(state.used_prns) if state.used_prns else (state.used_count or 0)
-        sats_payload = [_sat_to_payload(sat) for sat in state.sats]
+        cache = self._sat_payloads
+        trails = self.tracker.trails
+        sat_payloads = {}
+        for sat in state.sats:
+            key = (sat.gnssid, sat.prn)
+            trail_seq, trail = trails.wire(key)
+            cached = cache.get(key)
+            if cached is None or cached[0] is not sat or cached[1] != trail_seq:
+                cached = (sat, trail_seq, _sat_to_payload(sat, trail_seq, trail))
+            sat_payloads[key] = cached
+        self._sat_payloads = sat_payloads
+        sats_payload = [payload for _, _, payload in sat_payloads.values()]
 
         return {
+            "source": self.name,
             "t_utc": state.t_utc,
-            "health": {
-                "age_ms": int(age_ms),
-                "avg_dt_ms": int(avg_dt),
-                "status": status,
-            },
+            "date": state.utc_date,
             "fix": {
                 "status": state.fix_status,
                 "mode": state.fix_mode,
@@ -192,21 +503,33 @@ class LiveGnss:
                 "cog_deg": state.cog_deg,
             },
             "dop": {"pdop": state.pdop, "hdop": state.hdop, "vdop": state.vdop},
+            "accuracy": {
+                "lat_m": state.err_lat_m,
+                "lon_m": state.err_lon_m,
+                "alt_m": state.err_alt_m,
+                "major_m": state.err_major_m,
+                "minor_m": state.err_minor_m,
+                "orient_deg": state.err_orient_deg,
+            },
             "counts": {"used": used, "in_view": state.in_view_count},
             "sats": sats_payload,
         }
 
 
-def _sat_to_payload(sat: SatInfo) -> Dict[str, object]:
+Source = Union[DummyGnss, LiveGnss]
+
+
+def _sat_to_payload(sat: SatInfo, trail_seq: int, trail: List[List[float]]) -> Dict[str, object]:
     return {
-        "id": f"GPS-{sat.prn:02d}",
+        "id": f"{sat.gnssid}-{sat.prn:02d}",
         "gnssid": sat.gnssid,
         "prn": sat.prn,
         "az": sat.az,
         "el": sat.el,
         "snr": sat.snr,
         "used": sat.used,
-        "trail": [],
+        "trail": trail,
+        "trail_seq": trail_seq,
     }
 
 
@@ -216,50 +539,398 @@ async def handle_index(request: web.Request) -> web.FileResponse:
 
 
 async def handle_ws(request: web.Request) -> web.WebSocketResponse:
+    # ?source=a,b subscribes to several sources ("*" for all); every message
+    # carries its source's name. Binary frames have no room for it, so
+    # proto=bin takes a single source.
+    app = request.app
+    proto = request.query.get("proto", "json")
+    if proto not in PROTOCOLS:
+        raise web.HTTPBadRequest(text=f"Unknown proto {proto!r}; expected one of {', '.join(PROTOCOLS)}")
+    names = _source_names(request)
+    if proto == "bin" and len(names) > 1:
+        raise web.HTTPBadRequest(text="proto=bin takes a single source")
+    try:
+        topics = parse_topics(request.query.get("topics"))
+    except ValueError as exc:
+        raise web.HTTPBadRequest(text=str(exc))
+    if proto == "bin" and topics is not None:
+        raise web.HTTPBadRequest(text="topic subscriptions need proto=json or proto=delta")
     ws = web.WebSocketResponse()
     await ws.prepare(request)
-    request.app["clients"].add(ws)
+    client = ClientSession(
+        ws,
+        request.remote,
+        max_queue=app["client_queue"],
+        send_timeout=app["slow_client_s"],
+        proto=proto,
+        sources=names,
+    )
+    client.subscribe(topics)
+    client.start()
+    # Send the current state right away rather than at the next change.
+    for name in names:
+        source = app["sources"][name]
+        if topics is not None:
+            _send_topics(app, name, source.encoded(), source.health(), [client])
+        elif proto == "delta":
+            client.push(_keyframe(app, name))
+        elif proto == "bin":
+            client.push(source.encoded().binary_with_health(source.health()))
+        else:
+            client.push(source.encoded().with_health(source.health()))
+        app["subscribers"][name].add(client)
+    app["clients"].add(client)
 
     try:
-        async for _ in ws:
-            pass
+        async for msg in ws:
+            if msg.type != web.WSMsgType.TEXT:
+                continue
+            try:
+                command = json.loads(msg.data)
+                request_type = command.get("type")
+                name = command.get("source") or names[0]
+            except (ValueError, AttributeError):
+                continue
+            if name not in names:
+                continue
+            if request_type == "keyframe" and proto == "delta":
+                # The client missed a delta (e.g. dropped from its queue).
+                client.needs_keyframe.discard(name)
+                client.push(_keyframe(app, name))
+            elif request_type == "subscribe" and proto != "bin":
+                _subscribe(app, client, command.get("topics"))
+            elif request_type == "replay":
+                _, reply = _replay_command(app["sources"][name], command.get("action"), command.get("value"))
+                client.push(dumps({"type": "replay", "source": name, **reply}))
+            elif request_type == "trail":
+                _, reply = _trail_query(
+                    app["sources"][name], command.get("zoom"), command.get("bbox"), command.get("since")
+                )
+                client.push(dumps({"type": "trail", "source": name, **reply}))
     finally:
-        request.app["clients"].discard(ws)
+        app["clients"].discard(client)
+        for name in names:
+            app["subscribers"][name].discard(client)
+        await client.stop()
     return ws
 
 
-async def broadcaster(app: web.Application) -> None:
-    # Broadcast current state to all connected websocket clients.
-    source = app["source"]
+def _subscribe(app: web.Application, client: ClientSession, spec: object) -> None:
+    # Switch a client to topic updates (or back to the full stream) and send
+    # it a complete set right away.
+    try:
+        topics = parse_topics(spec)
+    except ValueError as exc:
+        client.push(dumps({"type": "error", "error": str(exc)}))
+        return
+    client.subscribe(topics)
+    for name in client.sources:
+        source = app["sources"][name]
+        if topics is not None:
+            _send_topics(app, name, source.encoded(), source.health(), [client])
+        elif client.proto == "delta":
+            client.needs_keyframe.discard(name)
+            client.push(_keyframe(app, name))
+        else:
+            client.push(source.encoded().with_health(source.health()))
+
+
+def _source_names(request: web.Request) -> Tuple[str, ...]:
+    # Sources named by ?source= (comma separated, "*" for all); the first
+    # configured source by default.
+    sources = request.app["sources"]
+    spec = request.query.get("source", "")
+    if spec == "*":
+        return tuple(sources)
+    names = tuple(dict.fromkeys(name for name in spec.split(",") if name)) or (next(iter(sources)),)
+    unknown = [name for name in names if name not in sources]
+    if unknown:
+        raise web.HTTPNotFound(text=f"Unknown source {unknown[0]!r}; expected one of {', '.join(sources)}")
+    return names
+
+
+def _request_source(request: web.Request) -> Source:
+    # The single source an HTTP API request is about.
+    names = _source_names(request)
+    if len(names) != 1:
+        raise web.HTTPBadRequest(text="expected a single source")
+    return request.app["sources"][names[0]]
+
+
+def _keyframe(app: web.Application, name: str) -> str:
+    encoder: DeltaEncoder = app["delta"][name]
+    source = app["sources"][name]
+    if encoder.has_state:
+        return encoder.keyframe(source.health())
+    # Nothing broadcast yet; seq -1 never matches a delta base, and the first
+    # broadcast goes out to delta clients as a keyframe anyway.
+    state = source.encoded().with_health(source.health())
+    return f'{{"type":"key","source":{dumps(name)},"seq":-1,"state":{state}}}'
+
+
+def _replay_command(source: Source, action: object, value: object) -> Tuple[int, Dict[str, object]]:
+    # Shared by POST /api/replay and {"type": "replay"} WebSocket messages.
+    if source.replay_status() is None:
+        return 404, {"error": "not replaying a file"}
+    try:
+        return 200, source.control_replay(str(action), value)
+    except (TypeError, ValueError) as exc:
+        return 400, {"error": str(exc)}
+
+
+async def handle_replay(request: web.Request) -> web.Response:
+    # GET: replay position/speed; POST {"action": ..., "value": ...}: control.
+    source = _request_source(request)
+    if request.method == "POST":
+        try:
+            body = await request.json()
+        except ValueError:
+            return web.json_response({"error": "expected a JSON body"}, status=400)
+        if not isinstance(body, dict):
+            return web.json_response({"error": "expected a JSON object"}, status=400)
+        status, reply = _replay_command(source, body.get("action"), body.get("value"))
+        return web.json_response(reply, status=status)
+    replay = source.replay_status()
+    if replay is None:
+        return web.json_response({"error": "not replaying a file"}, status=404)
+    return web.json_response(replay)
+
+
+async def handle_recorder(request: web.Request) -> web.Response:
+    # Recording volume: lines, raw vs on-disk bytes, drops and write stalls.
+    stats = _request_source(request).recorder_stats()
+    if stats is None:
+        return web.json_response({"error": "not recording"}, status=404)
+    return web.json_response(stats)
+
+
+async def handle_history(request: web.Request) -> web.Response:
+    # GET ?series=hdop,snr:GPS-07&start=&end=&step= (Unix seconds): min/max/
+    # mean per window. Without series: stored range, size and series names.
+    history = _request_source(request).history()
+    if history is None:
+        return web.json_response({"error": "no history for this source"}, status=404)
+    query = request.query
+    if "series" not in query:
+        return web.json_response({**history.stats(), "series": history.series()}, dumps=dumps)
+    try:
+        names = [name for name in query["series"].split(",") if name]
+        bounds = [float(query[key]) if query.get(key) else None for key in ("start", "end", "step")]
+        result = history.query(names, *bounds, points=int(query.get("points", 500)))
+    except ValueError as exc:
+        return web.json_response({"error": str(exc)}, status=400)
+    return web.json_response(result, dumps=dumps)
+
+
+def _trail_query(source: Source, zoom: object, bbox: object, since: object) -> Tuple[int, Dict[str, object]]:
+    # Shared by GET /api/trail and {"type": "trail"} WebSocket messages.
+    # Without a zoom: stored points per level.
+    trail = source.breadcrumbs()
+    if trail is None:
+        return 404, {"error": "no trail for this source"}
+    if zoom is None or zoom == "":
+        return 200, trail.stats()
+    try:
+        box = parse_bbox(bbox)
+        start = None if since is None or since == "" else int(since)  # type: ignore[call-overload]
+        return 200, trail.query(float(zoom), box, start)  # type: ignore[arg-type]
+    except (TypeError, ValueError) as exc:
+        return 400, {"error": str(exc)}
+
+
+async def handle_trail(request: web.Request) -> web.Response:
+    # GET ?zoom=&bbox=west,south,east,north&since=: map breadcrumb trail
+    # simplified for the zoom (see GNSserver/breadcrumbs.py).
+    query = request.query
+    status, reply = _trail_query(_request_source(request), query.get("zoom"), query.get("bbox"), query.get("since"))
+    return web.json_response(reply, status=status, dumps=dumps)
+
+
+async def handle_clients(request: web.Request) -> web.Response:
+    # Per-client delivery stats: queue depth, sent and dropped frames.
+    return web.json_response([client.stats() for client in request.app["clients"]])
+
+
+async def handle_sources(request: web.Request) -> web.Response:
+    # Configured sources with their input and load figures.
+    app = request.app
+    return web.json_response(
+        [
+            {
+                "name": name,
+                **source.describe(),
+                "health": source.health(),
+                "clients": len(app["subscribers"][name]),
+                **source.stats.snapshot(),
+                "fanout": source.fanout_stats(),
+                "shm": source.shm_stats(),
+            }
+            for name, source in app["sources"].items()
+        ]
+    )
+
+
+async def broadcaster(app: web.Application, name: str) -> None:
+    # Broadcast one source's state to its subscribed websocket clients when
+    # it publishes an update, at most max_rate times per second; updates
+    # arriving in between are coalesced into the next send. A state version
+    # that was already sent is skipped, and a small heartbeat keeps the
+    # health display current while nothing changes. Each source has its own
+    # broadcaster task.
+    source = app["sources"][name]
+    encoder: DeltaEncoder = app["delta"][name]
+    stats: SourceStats = source.stats
+    loop = asyncio.get_running_loop()
+    min_interval = 1.0 / app["max_rate"]
+    version = source.updates.version
+    last_sent = 0.0
+    last_keyframe = loop.time()
+    last_state_version: Optional[int] = None
     while True:
-        payload = source.next_state()
-        msg = json.dumps(payload)
-        dead = []
-        for ws in app["clients"]:
-            if ws.closed:
-                dead.append(ws)
+        changed = await source.updates.wait_newer(version, timeout=app["heartbeat_s"])
+        started = time.perf_counter()
+        state = None
+        if changed:
+            wait = last_sent + min_interval - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                started = time.perf_counter()
+            version = source.updates.version
+            state = source.encoded()
+            if state.version == last_state_version:
+                state = None
+        if state is not None:
+            last_state_version = state.version
+            health = source.health()
+            delta = encoder.advance(state, health)
+            keyframe_due = delta is None or loop.time() - last_keyframe >= app["keyframe_s"]
+            if keyframe_due:
+                last_keyframe = loop.time()
+            _send_frame(app, name, state, health, delta, keyframe_due)
+            _send_topics(app, name, state, health, app["subscribers"][name])
+            stats.latency(time.monotonic() - source.published_at)
+        else:
+            if loop.time() - last_sent < app["heartbeat_s"]:
                 continue
-            await ws.send_str(msg)
-        for ws in dead:
-            app["clients"].discard(ws)
-        await asyncio.sleep(0.5)
+            health = source.health()
+            _send_heartbeat(app, name, health, last_state_version or 0)
+            # Also flushes topics held back by a client's rate limit.
+            _send_topics(app, name, source.encoded(), health, app["subscribers"][name])
+        stats.busy_s += time.perf_counter() - started
+        last_sent = loop.time()
+
+
+def _send_frame(
+    app: web.Application,
+    name: str,
+    state: EncodedState,
+    health: Dict[str, object],
+    delta: Optional[Dict[str, object]],
+    keyframe_due: bool,
+) -> None:
+    # Each encoding is serialized at most once per update and shared by every
+    # client that asked for it. Pushing never waits on a socket.
+    encoded: Dict[str, Message] = {}
+
+    def encode(kind: str) -> Message:
+        msg = encoded.get(kind)
+        if msg is None:
+            if kind == "json":
+                msg = state.with_health(health)
+            elif kind == "bin":
+                msg = state.binary_with_health(health)
+            elif kind == "delta":
+                msg = dumps(delta)
+            else:
+                msg = app["delta"][name].keyframe(health)
+            encoded[kind] = msg
+        return msg
+
+    for client in app["subscribers"][name]:
+        if client.topics is not None:
+            continue
+        if client.proto != "delta":
+            client.push(encode(client.proto))
+        elif keyframe_due or name in client.needs_keyframe:
+            client.needs_keyframe.discard(name)
+            client.push(encode("key"))
+        else:
+            client.push(encode("delta"))
+
+
+def _send_heartbeat(app: web.Application, name: str, health: Dict[str, object], version: int) -> None:
+    text: Optional[str] = None
+    binary: Optional[bytes] = None
+    for client in app["subscribers"][name]:
+        if client.topics is not None:
+            continue
+        if client.proto == "bin":
+            if binary is None:
+                binary = binary_header(BIN_HEARTBEAT, version, health)
+            client.push(binary)
+        else:
+            if text is None:
+                text = dumps({"type": "heartbeat", "source": name, "health": health})
+            client.push(text)
+
+
+def _send_topics(
+    app: web.Application,
+    name: str,
+    state: EncodedState,
+    health: Dict[str, object],
+    clients: Iterable[ClientSession],
+) -> None:
+    # Topic subscribers get only their due topics. Each topic is encoded once
+    # per state and clients due the same set share one message.
+    topic_clients = [client for client in clients if client.topics is not None]
+    if not topic_clients:
+        return
+    topics: TopicState = app["topics"][name]
+    topics.advance(state, health)
+    now = time.monotonic()
+    messages: Dict[Tuple[str, ...], str] = {}
+    for client in topic_clients:
+        due = client.due_topics(name, topics.versions, now)
+        if not due:
+            continue
+        msg = messages.get(due)
+        if msg is None:
+            msg = messages[due] = topics.message(name, due)
+        client.push(msg)
+
+
+def add_source(app: web.Application, source: Source) -> None:
+    # Register a named source before the app starts; the first one added is
+    # the default for clients that do not pick one.
+    if source.name in app["sources"]:
+        raise ValueError(f"duplicate source name {source.name!r}")
+    app["sources"][source.name] = source
+    app["delta"][source.name] = DeltaEncoder(source.name)
+    app["topics"][source.name] = TopicState()
+    app["subscribers"][source.name] = set()
 
 
 async def on_startup(app: web.Application) -> None:
-    # Start the periodic broadcaster task.
-    app["broadcaster"] = asyncio.create_task(broadcaster(app))
+    # Start every source and its broadcaster task; all share this loop.
+    for name, source in app["sources"].items():
+        source.start()
+        app["broadcasters"].append(asyncio.create_task(broadcaster(app, name)))
 
 
 async def on_cleanup(app: web.Application) -> None:
-    # Stop background tasks and reader thread.
-    task = app.get("broadcaster")
-    if task:
+    # Stop background tasks and the reader tasks.
+    for task in app["broadcasters"]:
         task.cancel()
         with contextlib.suppress(asyncio.CancelledError):
             await task
-    source = app.get("source")
-    if isinstance(source, LiveGnss):
-        source.stop()
+    for name, source in app["sources"].items():
+        # One failing source must not keep the others from closing their
+        # recordings.
+        try:
+            await source.stop()
+        except Exception as exc:
+            print(f"[LiveGnss] {name}: stop failed: {exc!r}")
 
 
 def create_app() -> web.Application:
@@ -269,8 +940,27 @@ def create_app() -> web.Application:
     app = web.Application()
     app["web_dir"] = web_dir
     app["clients"] = set()
+    app["max_rate"] = 10.0
+    app["heartbeat_s"] = 1.0
+    app["client_queue"] = 8
+    app["slow_client_s"] = 5.0
+    app["keyframe_s"] = 10.0
+    # Per source name: the source, its delta encoder, topic versions and
+    # subscribed clients.
+    app["sources"] = {}
+    app["delta"] = {}
+    app["topics"] = {}
+    app["subscribers"] = {}
+    app["broadcasters"] = []
     app.router.add_get("/", handle_index)
     app.router.add_get("/ws", handle_ws)
+    app.router.add_get("/api/clients", handle_clients)
+    app.router.add_get("/api/sources", handle_sources)
+    app.router.add_get("/api/replay", handle_replay)
+    app.router.add_post("/api/replay", handle_replay)
+    app.router.add_get("/api/recorder", handle_recorder)
+    app.router.add_get("/api/history", handle_history)
+    app.router.add_get("/api/trail", handle_trail)
     app.router.add_static("/static/", web_dir)
     app.on_startup.append(on_startup)
     app.on_cleanup.append(on_cleanup)
@@ -282,8 +972,50 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--port", help="Serial port (e.g., COM3)")
     parser.add_argument("--baud", type=int, default=9600)
     parser.add_argument("--file", dest="file_path", help="Replay NMEA log file")
-    parser.add_argument("--replay-rate", type=float, default=1.0)
+    parser.add_argument("--replay-rate", type=float, default=1.0, help="Replay speed (0 = as fast as possible)")
+    parser.add_argument("--seek", help="Start replay at seconds into the log or at UTC HH:MM:SS")
+    parser.add_argument("--read-mode", choices=READ_MODES, default="bulk", help="Serial read strategy")
     parser.add_argument("--dummy", action="store_true", help="Use dummy GNSS data")
+    parser.add_argument(
+        "--source",
+        action="append",
+        default=[],
+        metavar="NAME=SPEC",
+        help="Add a named receiver (repeatable): NAME=PORT[@BAUD], NAME=file:PATH or NAME=dummy. "
+        "Replaces --port/--file/--dummy",
+    )
+    parser.add_argument("--max-rate", type=float, default=10.0, help="Max WebSocket updates per second")
+    parser.add_argument("--heartbeat", type=float, default=1.0, help="Seconds between health updates when idle")
+    parser.add_argument("--client-queue", type=int, default=8, help="Frames queued per WebSocket client")
+    parser.add_argument(
+        "--slow-client", type=float, default=5.0, help="Disconnect a client whose send stalls this many seconds"
+    )
+    add_record_args(parser)
+    parser.add_argument(
+        "--nmea-tcp",
+        action="append",
+        default=[],
+        metavar="[NAME=]PORT",
+        help="Re-serve a source's raw NMEA to TCP clients on PORT (repeatable; default source without NAME)",
+    )
+    parser.add_argument(
+        "--nmea-udp",
+        action="append",
+        default=[],
+        metavar="[NAME=]HOST:PORT",
+        help="Send a source's raw NMEA as UDP datagrams to HOST:PORT (may be a broadcast address)",
+    )
+    parser.add_argument("--nmea-bind", default="0.0.0.0", help="Address the NMEA TCP server listens on")
+    parser.add_argument(
+        "--shm",
+        action="append",
+        default=[],
+        metavar="[NAME=]PATH",
+        help="Publish a source's latest snapshot to a shared-memory file, e.g. /dev/shm/navscope (repeatable)",
+    )
+    parser.add_argument(
+        "--keyframe", type=float, default=10.0, help="Seconds between full keyframes for delta clients"
+    )
     return parser.parse_args()
 
 
@@ -301,14 +1033,102 @@ async def run_server(app: web.Application, host: str, port: int) -> None:
         await runner.cleanup()
 
 
+def _source_option(values: List[str], name: str, first: bool) -> Optional[str]:
+    # The [NAME=]VALUE entry for this source; entries without a NAME= prefix
+    # belong to the first source.
+    for value in values:
+        target, sep, rest = value.partition("=")
+        if (sep and target == name) or (not sep and first):
+            return rest if sep else value
+    return None
+
+
+def fanout_from_args(args: argparse.Namespace, name: str, first: bool) -> Optional[NmeaFanout]:
+    tcp = _source_option(args.nmea_tcp, name, first)
+    udp = _source_option(args.nmea_udp, name, first)
+    if tcp is None and udp is None:
+        return None
+    udp_target = None
+    if udp is not None:
+        host, _, port = udp.rpartition(":")
+        udp_target = (host or "255.255.255.255", int(port))
+    return NmeaFanout(int(tcp) if tcp is not None else None, udp_target, host=args.nmea_bind)
+
+
+def shm_from_args(args: argparse.Namespace, name: str, first: bool) -> Optional[SharedStatePublisher]:
+    path = _source_option(args.shm, name, first)
+    return SharedStatePublisher(path) if path else None
+
+
+def check_source_options(args: argparse.Namespace, sources: Dict[str, Source]) -> None:
+    # --nmea-tcp/--nmea-udp/--shm entries must name a configured source that
+    # reads real input; anything else would be silently ignored.
+    first = next(iter(sources))
+    for option, values in (("--nmea-tcp", args.nmea_tcp), ("--nmea-udp", args.nmea_udp), ("--shm", args.shm)):
+        for value in values:
+            target, sep, _ = value.partition("=")
+            name = target if sep else first
+            if name not in sources:
+                raise ValueError(f"{option} {value}: no source named {name!r}")
+            if isinstance(sources[name], DummyGnss):
+                raise ValueError(f"{option} {value}: source {name!r} is a dummy")
+
+
+def source_from_spec(spec: str, args: argparse.Namespace, first: bool = True) -> Source:
+    # NAME=PORT[@BAUD], NAME=file:PATH or NAME=dummy (see --source).
+    name, sep, target = spec.partition("=")
+    if not sep or not name or not target:
+        raise ValueError(f"expected NAME=SPEC, got {spec!r}")
+    if target == "dummy":
+        return DummyGnss(name)
+    port, baud, file_path = None, args.baud, None
+    if target.startswith("file:"):
+        file_path = target[len("file:") :]
+    else:
+        port, _, baud_text = target.partition("@")
+        if not port:
+            raise ValueError(f"{name}=PORT needs a port")
+        if baud_text:
+            baud = int(baud_text)
+    prefix = name if len(args.source) > 1 else "navscope"
+    source = LiveGnss(
+        port,
+        baud,
+        file_path,
+        args.replay_rate,
+        args.read_mode,
+        recorder_from_args(args, prefix),
+        name=name,
+        fanout=fanout_from_args(args, name, first),
+        shm=shm_from_args(args, name, first),
+    )
+    if args.seek and file_path:
+        source.reader.replay.seek_spec(args.seek)
+    return source
+
+
 def main() -> None:
     args = parse_args()
     app = create_app()
-    if args.dummy:
-        app["source"] = DummyGnss()
-    else:
-        app["source"] = LiveGnss(args.port, args.baud, args.file_path, args.replay_rate)
-        app["source"].start()
+    app["max_rate"] = max(args.max_rate, 0.1)
+    app["heartbeat_s"] = max(args.heartbeat, 0.1)
+    app["client_queue"] = max(args.client_queue, 1)
+    app["slow_client_s"] = max(args.slow_client, 0.5)
+    app["keyframe_s"] = max(args.keyframe, 1.0)
+    specs = args.source
+    if not specs:
+        if args.dummy:
+            specs = ["default=dummy"]
+        elif args.file_path:
+            specs = [f"default=file:{args.file_path}"]
+        else:
+            specs = [f"default={args.port or ''}@{args.baud}"]
+    try:
+        for i, spec in enumerate(specs):
+            add_source(app, source_from_spec(spec, args, first=i == 0))
+        check_source_options(args, app["sources"])
+    except ValueError as exc:
+        raise SystemExit(f"Bad source option: {exc}")
     try:
         asyncio.run(run_server(app, "127.0.0.1", 8000))
     except KeyboardInterrupt:
@@ -0,0 +1,387 @@
+"""
+WebSocket wire encodings.
+
+The default protocol sends the full JSON payload every update. The delta
+protocol (/ws?proto=delta) sends a keyframe with the full payload on connect
+and periodically, and in between only the fields and satellites that changed:
+
+    {"type": "key", "source": "rover", "seq": 7, "state": {...full payload...}}
+    {"type": "delta", "source": "rover", "seq": 8, "base": 7,
+     "patch": {"fix": {"lat": ...}, "health": {...}},
+     "sats": {"upd": [{"id": "GPS-07", "snr": 41}], "del": ["GPS-12"]}}
+
+"patch" is merged key by key into the client's copy (nested dicts are merged,
+other values replaced). A satellite update may carry "trail_add" (points to
+append) and "trail_len" (length to trim the trail to) instead of "trail". A
+client that sees a "base" other than the last seq it applied asks for a new
+keyframe with {"type": "keyframe", "source": ...}. Sequence numbers are per
+source.
+
+The binary protocol (/ws?proto=bin) sends the full state every update as a
+little-endian binary frame instead of JSON text:
+
+    header   magic "NS", format version, kind (1 state, 2 heartbeat),
+             state version u32, health age_ms u32, avg_dt_ms u32, status u8
+    state    t_utc 10s, date 10s, fix status 1s, mode i8, quality i8,
+             lat f64, lon f64, alt/speed/cog f32, pdop/hdop/vdop f32,
+             accuracy lat/lon/alt/major/minor/orient f32,
+             used u16, in_view u16, satellite count u16
+    per sat  constellation u8 (index into GNSS_CODES), prn u16,
+             az u16 and el i16 in tenths of a degree, snr u8, flags u8
+             (bit 0: used), trail length u8, then trail points (az u16, el i16)
+
+Missing values are NaN for floats, empty strings, -1 for mode/quality and the
+all-ones/most-negative value for the integer fields. Heartbeats are a header
+with no state. web/app.js (decodeBinaryFrame) mirrors this layout.
+
+JSON and delta clients may instead subscribe to topics, either on connect
+(/ws?topics=fix:2,health) or at any time with
+{"type": "subscribe", "topics": {"fix": 2, "health": null}} (topic -> max
+updates per second, null for every update; "topics": null returns to the full
+stream). They then get only the changed, due topics merged into one message:
+
+    {"type": "update", "source": "rover", "t_utc": ..., "fix": {...}}
+
+Topics and the state fields they carry: fix (t_utc, date, fix, accuracy), dop
+(dop), sats (counts, sats without trails), trails (trails: id -> points) and
+health (health).
+
+Payloads are built and encoded once per state version (EncodedState) and the
+resulting strings are shared by every client. orjson is used for encoding
+when installed.
+"""
+
+import json
+import math
+import struct
+from typing import Dict, List, Optional, Sequence
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+PROTOCOLS = ("json", "delta", "bin")
+TOPICS = ("fix", "dop", "sats", "trails", "health")
+# Topics taken from the state payload; health is encoded per send.
+STATE_TOPICS = TOPICS[:-1]
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+BIN_FORMAT_VERSION = 1
+BIN_STATE = 1
+BIN_HEARTBEAT = 2
+GNSS_CODES = ("GNSS", "GPS", "GLONASS", "GALILEO", "BEIDOU", "SBAS", "QZSS")
+HEALTH_CODES = ("LIVE", "STALE", "DEAD")
+
+_BIN_HEADER = struct.Struct("<2sBBIIIB")
+_BIN_STATE = struct.Struct("<10s10s1sbbdd12fHHH")
+_BIN_SAT = struct.Struct("<BHHhBBB")
+_BIN_POINT = struct.Struct("<Hh")
+_GNSS_INDEX = {name: i for i, name in enumerate(GNSS_CODES)}
+_HEALTH_INDEX = {name: i for i, name in enumerate(HEALTH_CODES)}
+_NAN = float("nan")
+_U16_NONE = 0xFFFF
+_I16_NONE = -0x8000
+
+_MISSING = object()
+
+
+def dumps(obj: object) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"))
+
+
+class EncodedState:
+    # One state version's payload (without link health) and its JSON and
+    # binary encodings. Health changes on every send, so it is spliced in
+    # rather than invalidating them. The body must not be modified.
+    __slots__ = ("version", "body", "_json", "_binary", "_topics")
+
+    def __init__(self, version: int, body: Dict[str, object]) -> None:
+        self.version = version
+        self.body = body
+        self._json: Optional[str] = None
+        self._binary: Optional[bytes] = None
+        self._topics: Dict[str, str] = {}
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            self._json = dumps(self.body)
+        return self._json
+
+    def with_health(self, health: Dict[str, object]) -> str:
+        # body is never empty, so the cached text always ends in "...}".
+        return f'{self.json[:-1]},"health":{dumps(health)}}}'
+
+    def binary_with_health(self, health: Dict[str, object]) -> bytes:
+        # Health lives in the frame header, so the state part is packed once.
+        if self._binary is None:
+            self._binary = _pack_state(self.body)
+        return binary_header(BIN_STATE, self.version, health) + self._binary
+
+    def topic_json(self, topic: str) -> str:
+        # The topic's state fields as JSON object members (no braces).
+        text = self._topics.get(topic)
+        if text is None:
+            text = self._topics[topic] = dumps(_topic_fields(self.body, topic))[1:-1]
+        return text
+
+
+def _topic_fields(body: Dict[str, object], topic: str) -> Dict[str, object]:
+    sats: List[Dict[str, object]] = body.get("sats") or []  # type: ignore[assignment]
+    if topic == "fix":
+        return {key: body.get(key) for key in ("t_utc", "date", "fix", "accuracy")}
+    if topic == "dop":
+        return {"dop": body.get("dop")}
+    if topic == "sats":
+        return {
+            "counts": body.get("counts"),
+            "sats": [{k: v for k, v in sat.items() if k != "trail" and k != "trail_seq"} for sat in sats],
+        }
+    if topic == "trails":
+        return {"trails": {sat["id"]: sat.get("trail") or [] for sat in sats}}
+    raise ValueError(f"unknown topic {topic!r}")
+
+
+def parse_topics(spec: object) -> Optional[Dict[str, float]]:
+    # {"fix": 2, "health": None}, ["fix", "dop"] or "fix:2,health" -> topic
+    # -> minimum seconds between sends (0 = every update), in TOPICS order.
+    # None/empty means no subscription (the full stream). Raises ValueError.
+    if not spec:
+        return None
+    if isinstance(spec, str):
+        spec = dict(item.partition(":")[::2] for item in spec.split(",") if item)
+    elif isinstance(spec, list):
+        if not all(isinstance(topic, str) for topic in spec):
+            raise ValueError("a topics list must hold topic names")
+        spec = dict.fromkeys(spec)
+    if not isinstance(spec, dict):
+        raise ValueError("topics must be an object, list or string")
+    unknown = [topic for topic in spec if topic not in TOPICS]
+    if unknown:
+        raise ValueError(f"unknown topic {unknown[0]!r}; expected some of {', '.join(TOPICS)}")
+    intervals = {}
+    for topic in TOPICS:
+        if topic not in spec:
+            continue
+        rate = spec[topic]
+        try:
+            rate = float(rate) if rate is not None and rate != "" else 0.0
+        except (TypeError, ValueError):
+            raise ValueError(f"rate for {topic} must be a number") from None
+        if not math.isfinite(rate) or rate < 0:
+            raise ValueError(f"rate for {topic} must be a finite number >= 0")
+        intervals[topic] = 1.0 / rate if rate else 0.0
+    return intervals
+
+
+class TopicState:
+    # Content version of each topic for one source. A topic's version only
+    # moves when its encoding differs from the previous state's, so clients
+    # are not sent topics that did not change; health changes on every send.
+
+    def __init__(self) -> None:
+        self.versions = dict.fromkeys(TOPICS, 0)
+        self._json: Dict[str, str] = {}
+        self._state_version: Optional[int] = None
+
+    def advance(self, state: EncodedState, health: Dict[str, object]) -> None:
+        if state.version != self._state_version:
+            self._state_version = state.version
+            for topic in STATE_TOPICS:
+                text = state.topic_json(topic)
+                if text != self._json.get(topic):
+                    self._json[topic] = text
+                    self.versions[topic] += 1
+        self._json["health"] = dumps({"health": health})[1:-1]
+        self.versions["health"] += 1
+
+    def message(self, source: str, topics: Sequence[str]) -> str:
+        fields = ",".join(self._json[topic] for topic in topics)
+        return f'{{"type":"update","source":{dumps(source)},{fields}}}'
+
+
+def binary_header(kind: int, version: int, health: Dict[str, object]) -> bytes:
+    return _BIN_HEADER.pack(
+        b"NS",
+        BIN_FORMAT_VERSION,
+        kind,
+        version & 0xFFFFFFFF,
+        min(int(health.get("age_ms") or 0), 0xFFFFFFFF),
+        min(int(health.get("avg_dt_ms") or 0), 0xFFFFFFFF),
+        _HEALTH_INDEX.get(health.get("status"), len(HEALTH_CODES) - 1),
+    )
+
+
+def _pack_state(body: Dict[str, object]) -> bytes:
+    fix = body.get("fix") or {}
+    dop = body.get("dop") or {}
+    acc = body.get("accuracy") or {}
+    counts = body.get("counts") or {}
+    sats = body.get("sats") or []
+    parts = [
+        _BIN_STATE.pack(
+            _ascii(body.get("t_utc")),
+            _ascii(body.get("date")),
+            _ascii(fix.get("status")),
+            _int_or(fix.get("mode"), -1),
+            _int_or(fix.get("quality"), -1),
+            _float(fix.get("lat")),
+            _float(fix.get("lon")),
+            _float(fix.get("alt_m")),
+            _float(fix.get("speed_knots")),
+            _float(fix.get("cog_deg")),
+            _float(dop.get("pdop")),
+            _float(dop.get("hdop")),
+            _float(dop.get("vdop")),
+            _float(acc.get("lat_m")),
+            _float(acc.get("lon_m")),
+            _float(acc.get("alt_m")),
+            _float(acc.get("major_m")),
+            _float(acc.get("minor_m")),
+            _float(acc.get("orient_deg")),
+            _int_or(counts.get("used"), _U16_NONE),
+            _int_or(counts.get("in_view"), _U16_NONE),
+            len(sats),
+        )
+    ]
+    pack_sat = _BIN_SAT.pack
+    pack_point = _BIN_POINT.pack
+    for sat in sats:
+        trail = (sat.get("trail") or [])[-255:]
+        snr = sat.get("snr")
+        parts.append(
+            pack_sat(
+                _GNSS_INDEX.get(sat.get("gnssid"), 0),
+                _int_or(sat.get("prn"), 0),
+                _deci_az(sat.get("az")),
+                _deci_el(sat.get("el")),
+                0xFF if snr is None else max(0, min(int(snr), 0xFE)),
+                1 if sat.get("used") else 0,
+                len(trail),
+            )
+        )
+        for az, el in trail:
+            parts.append(pack_point(_deci_az(az), _deci_el(el)))
+    return b"".join(parts)
+
+
+def _ascii(value: object) -> bytes:
+    return str(value).encode("ascii", "replace") if value else b""
+
+
+def _int_or(value: object, missing: int) -> int:
+    return missing if value is None else int(value)
+
+
+def _float(value: object) -> float:
+    return _NAN if value is None else float(value)
+
+
+def _deci_az(value: object) -> int:
+    if value is None:
+        return _U16_NONE
+    return int(round(float(value) * 10)) % 3600
+
+
+def _deci_el(value: object) -> int:
+    if value is None:
+        return _I16_NONE
+    return max(-900, min(900, int(round(float(value) * 10))))
+
+
+class DeltaEncoder:
+    # Tracks the last broadcast payload and produces deltas against it. One
+    # encoder per source serves every delta client, so each delta is computed
+    # once. Messages are tagged with the source name.
+
+    def __init__(self, source: str = "default") -> None:
+        self.source = source
+        self.seq = 0
+        self._prev: Optional[EncodedState] = None
+        self._prev_sats: Dict[str, Dict[str, object]] = {}
+
+    @property
+    def has_state(self) -> bool:
+        return self._prev is not None
+
+    def advance(self, state: EncodedState, health: Dict[str, object]) -> Optional[Dict[str, object]]:
+        # Record `state` as the newest one and return the delta from the
+        # previous one (None when there is nothing to diff against yet).
+        # Health is not part of the diff and always rides along in the patch.
+        prev = self._prev
+        payload = state.body
+        sats: List[Dict[str, object]] = payload.get("sats") or []  # type: ignore[assignment]
+        sat_index = {sat["id"]: sat for sat in sats}
+        delta = None
+        if prev is not None:
+            patch = _diff_dict(prev.body, payload, skip="sats")
+            patch["health"] = health
+            delta = {
+                "type": "delta",
+                "source": self.source,
+                "seq": self.seq + 1,
+                "base": self.seq,
+                "patch": patch,
+                "sats": _diff_sats(self._prev_sats, sats),
+            }
+        self.seq += 1
+        self._prev = state
+        self._prev_sats = sat_index
+        return delta
+
+    def keyframe(self, health: Dict[str, object]) -> str:
+        # Full copy of the last advanced state; requires has_state.
+        return f'{{"type":"key","source":{dumps(self.source)},"seq":{self.seq},"state":{self._prev.with_health(health)}}}'
+
+
+def _diff_dict(old: Dict[str, object], new: Dict[str, object], skip: Optional[str] = None) -> Dict[str, object]:
+    patch: Dict[str, object] = {}
+    for key, value in new.items():
+        if key == skip:
+            continue
+        old_value = old.get(key, _MISSING)
+        if value == old_value:
+            continue
+        if isinstance(value, dict) and isinstance(old_value, dict):
+            patch[key] = _diff_dict(old_value, value)
+        else:
+            patch[key] = value
+    return patch
+
+
+def _diff_sats(old: Dict[str, Dict[str, object]], new: List[Dict[str, object]]) -> Dict[str, List[object]]:
+    upd: List[object] = []
+    seen = set()
+    for sat in new:
+        sat_id = sat["id"]
+        seen.add(sat_id)
+        prev = old.get(sat_id)
+        if prev is None:
+            upd.append(sat)
+        elif prev is not sat and prev != sat:
+            changed: Dict[str, object] = {"id": sat_id}
+            for key, value in sat.items():
+                if prev.get(key, _MISSING) != value:
+                    changed[key] = value
+            if "trail" in changed:
+                _trail_increment(changed, prev, sat)
+            upd.append(changed)
+    removed = [sat_id for sat_id in old if sat_id not in seen]
+    return {"upd": upd, "del": removed}
+
+
+def _trail_increment(changed: Dict[str, object], prev: Dict[str, object], sat: Dict[str, object]) -> None:
+    # Trails carrying "trail_seq" only ever grow at the end (and drop points
+    # off the front), so send just the new points and the length to trim to.
+    # A trail restarted after a seek or expiry fails the overlap check and is
+    # sent whole.
+    trail: List[object] = sat["trail"]  # type: ignore[assignment]
+    prev_trail: List[object] = prev.get("trail") or []  # type: ignore[assignment]
+    added = sat.get("trail_seq", 0) - prev.get("trail_seq", 0)  # type: ignore[operator]
+    if "trail_seq" in prev and 0 < added < len(trail) and prev_trail and trail[-added - 1] == prev_trail[-1]:
+        del changed["trail"]
+        changed["trail_add"] = trail[-added:]
+        changed["trail_len"] = len(trail)
@@ -0,0 +1,154 @@
+"""
+Per-client WebSocket delivery.
+
+Each connected browser gets its own bounded queue and sender task, so a slow
+link only ever delays (and eventually disconnects) itself.
+"""
+
+import asyncio
+import contextlib
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Set, Tuple, Union
+
+from aiohttp import WSCloseCode, web
+
+Message = Union[str, bytes]
+
+
+class ClientSession:
+    # Queue is drop-oldest: the newest state always wins. A client is treated
+    # as too slow and closed when a single send stalls for send_timeout
+    # seconds, or when it drops more than max_drops frames within DROP_WINDOW_S.
+    DROP_WINDOW_S = 10.0
+
+    def __init__(
+        self,
+        ws: web.WebSocketResponse,
+        remote: Optional[str],
+        max_queue: int = 8,
+        send_timeout: float = 5.0,
+        max_drops: int = 20,
+        proto: str = "json",
+        sources: Tuple[str, ...] = ("default",),
+    ) -> None:
+        self.ws = ws
+        self.remote = remote or "?"
+        self.proto = proto
+        # Names of the sources this client is subscribed to.
+        self.sources = sources
+        # Sources whose delta chain broke for this client; they get a
+        # keyframe next.
+        self.needs_keyframe: Set[str] = set()
+        # Topic subscription (topic -> minimum seconds between sends), or
+        # None for the full stream; see wire.parse_topics.
+        self.topics: Optional[Dict[str, float]] = None
+        # (source, topic) -> (topic version, monotonic time) last sent.
+        self._topic_sent: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self.max_queue = max(1, max_queue)
+        self.send_timeout = send_timeout
+        self.max_drops = max_drops
+        self.connected_at = time.monotonic()
+        self.sent = 0
+        self.sent_bytes = 0
+        self.dropped = 0
+        self.slow = False
+        self._queue: Deque[Message] = deque()
+        self._recent_drops: Deque[float] = deque()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._close_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+    def push(self, msg: Message) -> None:
+        # Never blocks the caller; overflowing drops the oldest queued frame.
+        if self.slow:
+            return
+        if len(self._queue) >= self.max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+            if self.proto == "delta":
+                # Which source the dropped frame was from is not known.
+                self.needs_keyframe.update(self.sources)
+            now = time.monotonic()
+            drops = self._recent_drops
+            drops.append(now)
+            while drops and now - drops[0] > self.DROP_WINDOW_S:
+                drops.popleft()
+            if len(drops) > self.max_drops:
+                self._mark_slow()
+                return
+        self._queue.append(msg)
+        self._wake.set()
+
+    def subscribe(self, topics: Optional[Dict[str, float]]) -> None:
+        self.topics = topics
+        self._topic_sent.clear()
+
+    def due_topics(self, source: str, versions: Dict[str, int], now: float) -> Tuple[str, ...]:
+        # Subscribed topics that changed since they were last sent to this
+        # client and whose rate limit has passed; marks them as sent.
+        due = []
+        sent = self._topic_sent
+        for topic, interval in self.topics.items():  # type: ignore[union-attr]
+            key = (source, topic)
+            version = versions[topic]
+            last = sent.get(key)
+            if last is None or (last[0] != version and now - last[1] >= interval):
+                sent[key] = (version, now)
+                due.append(topic)
+        return tuple(due)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "remote": self.remote,
+            "proto": self.proto,
+            "sources": list(self.sources),
+            "topics": self.topics,
+            "connected_s": round(time.monotonic() - self.connected_at, 1),
+            "queue_depth": len(self._queue),
+            "queue_max": self.max_queue,
+            "sent": self.sent,
+            "sent_bytes": self.sent_bytes,
+            "dropped": self.dropped,
+            "slow": self.slow,
+        }
+
+    async def _run(self) -> None:
+        ws = self.ws
+        queue = self._queue
+        while not ws.closed:
+            await self._wake.wait()
+            self._wake.clear()
+            while queue and not ws.closed:
+                msg = queue.popleft()
+                try:
+                    if isinstance(msg, bytes):
+                        await asyncio.wait_for(ws.send_bytes(msg), self.send_timeout)
+                    else:
+                        await asyncio.wait_for(ws.send_str(msg), self.send_timeout)
+                except asyncio.TimeoutError:
+                    self._mark_slow()
+                    return
+                except ConnectionError:
+                    return
+                self.sent += 1
+                self.sent_bytes += len(msg)
+
+    def _mark_slow(self) -> None:
+        if self.slow:
+            return
+        self.slow = True
+        self._queue.clear()
+        print(f"[Broadcaster] Disconnecting slow client {self.remote} (dropped {self.dropped} frames)")
+        self._close_task = asyncio.create_task(
+            self.ws.close(code=WSCloseCode.TRY_AGAIN_LATER, message=b"client too slow")
+        )
@@ -0,0 +1,53 @@
+from functools import reduce
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from GNSserver.columnar import GNSS_CODES, decode_log  # noqa: E402
+from GNSserver.tracker import GnssTracker  # noqa: E402
+
+
+def _sentence(body: str) -> str:
+    checksum = reduce(lambda acc, ch: acc ^ ord(ch), body, 0)
+    return f"${body}*{checksum:02X}"
+
+
+def _nmea410_log(epochs: int) -> bytes:
+    # NMEA 4.10: GSV sentences with fewer than four satellites end in a
+    # signal ID field.
+    lines = []
+    for i in range(epochs):
+        t = f"1200{i:02d}.00"
+        lines += [
+            _sentence(f"GNRMC,{t},A,4807.038,N,01131.000,E,0.5,54.7,230394,,,A,V"),
+            _sentence(f"GNGGA,{t},4807.038,N,01131.000,E,1,03,0.9,545.4,M,46.9,M,,"),
+            _sentence("GNGSA,A,3,01,02,,,,,,,,,,,1.8,0.9,1.5,1"),
+            _sentence("GPGSV,1,1,02,01,40,083,46,02,17,308,41,1"),
+            _sentence("GLGSV,1,1,01,65,55,120,38,1"),
+        ]
+    return ("\r\n".join(lines) + "\r\n").encode("ascii")
+
+
+def test_gsv_signal_id_matches_tracker():
+    data = _nmea410_log(3)
+    tracker = GnssTracker()
+    expected = []
+    for line in data.splitlines():
+        if tracker.update_from_line(line, 0.0):
+            expected.append(tracker.snapshot)
+    if tracker.flush(0.0):
+        expected.append(tracker.snapshot)
+
+    columns = decode_log(data)
+    sats = columns.sats
+    assert len(columns) == len(expected) == 3
+    for i, state in enumerate(expected):
+        rows = np.flatnonzero(sats["epoch"] == i)
+        got = sorted(
+            (GNSS_CODES[sats["constellation"][r]], int(sats["prn"][r]), int(sats["el"][r]), int(sats["az"][r]),
+             int(sats["snr"][r]), bool(sats["used"][r]))
+            for r in rows
+        )
+        want = sorted((sat.gnssid, sat.prn, sat.el, sat.az, sat.snr, sat.used) for sat in state.sats)
+        assert got == want
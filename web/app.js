@@ -27,6 +27,13 @@ const snrKey = el("snr-key");
 let snrHitTargets = [];
 const healthBadge = el("health-badge");
 const fixBadge = el("fix-badge");
+const replayBar = el("replay-bar");
+const replayPlay = el("replay-play");
+const replayStep = el("replay-step");
+const replayScrubber = el("replay-scrubber");
+const replayTime = el("replay-time");
+const replaySpeed = el("replay-speed");
+const sourceSelect = el("source-select");
 const themeToggle = el("theme-toggle");
 const canvas = el("sky-canvas");
 const ctx = canvas.getContext("2d");
@@ -205,6 +212,122 @@ function updateHealth(health) {
   healthBadge.textContent = status;
   healthBadge.classList.remove("live", "stale", "dead");
   healthBadge.classList.add(status.toLowerCase());
+  if (health && "replay" in health) renderReplay(health.replay);
+}
+
+// Replay transport (only shown when the server replays a log file).
+let replayStatus = null;
+let replayScrubbing = false;
+let replaySeekValue = null;
+let replaySeekBusy = false;
+
+function formatReplayTime(status, seconds) {
+  if (status.start_utc_s === null || status.start_utc_s === undefined) {
+    return `+${Math.round(seconds)}s`;
+  }
+  const t = Math.floor(status.start_utc_s + seconds) % 86400;
+  const pad = (v) => String(v).padStart(2, "0");
+  return `${pad(Math.floor(t / 3600))}:${pad(Math.floor(t / 60) % 60)}:${pad(t % 60)}`;
+}
+
+function renderReplay(status) {
+  if (!replayBar) return;
+  replayStatus = status || null;
+  replayBar.hidden = !replayStatus;
+  if (!replayStatus) return;
+  replayScrubber.max = String(Math.ceil(status.duration_s));
+  if (!replayScrubbing) {
+    replayScrubber.value = String(status.position_s);
+    replayTime.textContent = formatReplayTime(status, status.position_s);
+  }
+  replayPlay.textContent = status.playing ? "Pause" : "Play";
+  if (document.activeElement !== replaySpeed) replaySpeed.value = String(status.rate);
+}
+
+async function sendReplay(action, value) {
+  try {
+    const res = await fetch(apiUrl("/api/replay"), {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ action, value }),
+    });
+    const body = await res.json();
+    if (res.ok) renderReplay(body);
+    else console.warn("Replay control failed", body.error);
+  } catch (err) {
+    console.error("Replay control failed", err);
+  }
+}
+
+async function seekReplay(value) {
+  // Only the newest scrubber position matters; never queue up seeks.
+  replaySeekValue = value;
+  if (replaySeekBusy) return;
+  replaySeekBusy = true;
+  while (replaySeekValue !== null) {
+    const next = replaySeekValue;
+    replaySeekValue = null;
+    await sendReplay("seek", next);
+  }
+  replaySeekBusy = false;
+}
+
+async function refreshReplay() {
+  try {
+    const res = await fetch(apiUrl("/api/replay"));
+    renderReplay(res.ok ? await res.json() : null);
+    return res.ok;
+  } catch (err) {
+    return false;
+  }
+}
+
+async function initReplayControls() {
+  if (!replayBar) return;
+  replayPlay.addEventListener("click", () => {
+    sendReplay(replayStatus?.playing ? "pause" : "play");
+  });
+  replayStep.addEventListener("click", () => sendReplay("step"));
+  replaySpeed.addEventListener("change", () => sendReplay("speed", Number(replaySpeed.value)));
+  replayScrubber.addEventListener("input", () => {
+    replayScrubbing = true;
+    const value = Number(replayScrubber.value);
+    if (replayStatus) replayTime.textContent = formatReplayTime(replayStatus, value);
+    seekReplay(value);
+  });
+  replayScrubber.addEventListener("change", () => {
+    replayScrubbing = false;
+    seekReplay(Number(replayScrubber.value));
+  });
+  // Binary frames carry no replay status; poll it instead.
+  if ((await refreshReplay()) && wsProto === "bin") {
+    setInterval(refreshReplay, 1000);
+  }
+}
+
+async function initSourcePicker() {
+  // Offer a receiver switch when the server hosts more than one.
+  if (!sourceSelect) return;
+  try {
+    const res = await fetch("/api/sources");
+    if (!res.ok) return;
+    const sources = await res.json();
+    if (sources.length < 2) return;
+    sources.forEach(({ name }) => {
+      const option = document.createElement("option");
+      option.value = name;
+      option.textContent = name;
+      sourceSelect.appendChild(option);
+    });
+    sourceSelect.value = sourceName || sources[0].name;
+    sourceSelect.hidden = false;
+    sourceSelect.addEventListener("change", () => {
+      pageParams.set("source", sourceSelect.value);
+      window.location.search = pageParams.toString();
+    });
+  } catch (err) {
+    console.warn("Source list unavailable", err);
+  }
 }
 
 function updateFixBadge(state) {
@@ -342,6 +465,22 @@ let mapVectorMid = null;
 let mapVectorMid2 = null;
 let mapRotateMode = "north";
 let mapVectorEnabled = true;
+// Breadcrumb trail from /api/trail, simplified server-side for the map zoom
+// (see GNSserver/breadcrumbs.py). The trail around the view is fetched once,
+// then only the points appended since trailSeq; the tail (points not final
+// yet) is replaced on every fetch.
+const TRAIL_REFRESH_MS = 2000;
+const TRAIL_MAX_POINTS = 40000;
+let mapTrail = null;
+let trailSegments = [[]];
+let trailTail = [];
+let trailPoints = 0;
+let trailSeq = null;
+let trailZoom = null;
+let trailBounds = null;
+let trailFetchedAt = 0;
+let trailBusy = false;
+let trailMissing = false;
 
 function initMap() {
   if (!mapCanvas || map) return;
@@ -358,6 +497,8 @@ function initMap() {
     fillOpacity: 0.8,
   }).addTo(map);
   L.control.scale({ position: "bottomleft", metric: true, imperial: true }).addTo(map);
+  mapTrail = L.polyline([], { color: "#ffb347", weight: 3, opacity: 0.7, interactive: false }).addTo(map);
+  mapTrail.bringToBack();
   mapVector = L.polyline(
     [
       [38.0, -97.0],
@@ -454,10 +595,77 @@ function initMap() {
     localStorage.setItem("navscope-map-follow", "false");
     if (mapModeToggle) mapModeToggle.textContent = "Free";
   });
+  // New zoom or a view outside the fetched area: fetch the trail again.
+  map.on("zoomend moveend", () => {
+    if (trailZoom !== map.getZoom() || !trailBounds || !trailBounds.contains(map.getBounds())) {
+      trailSeq = null;
+      refreshTrail(true);
+    }
+  });
+}
+
+function appendTrail(points) {
+  // null marks a break in the track (no fix, or left out of the view).
+  points.forEach((point) => {
+    const last = trailSegments[trailSegments.length - 1];
+    if (point === null) {
+      if (last.length) trailSegments.push([]);
+    } else {
+      last.push(point);
+      trailPoints += 1;
+    }
+  });
+}
+
+async function refreshTrail(force) {
+  if (!map || !mapTrail || trailBusy || trailMissing) return;
+  const now = Date.now();
+  if (!force && now - trailFetchedAt < TRAIL_REFRESH_MS) return;
+  trailBusy = true;
+  trailFetchedAt = now;
+  const zoom = map.getZoom();
+  const full = trailSeq === null || trailZoom !== zoom || trailPoints > TRAIL_MAX_POINTS;
+  const params = { zoom };
+  let bounds = trailBounds;
+  if (full) {
+    bounds = map.getBounds().pad(0.5);
+    params.bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()]
+      .map((value) => value.toFixed(6))
+      .join(",");
+  } else {
+    params.since = trailSeq;
+  }
+  try {
+    const res = await fetch(apiUrl("/api/trail", params));
+    if (res.status === 404) trailMissing = true;
+    if (!res.ok) return;
+    const data = await res.json();
+    // Zoomed while the request was out: the next fetch starts over.
+    if (map.getZoom() !== zoom) return;
+    const changed = data.full || data.points.length || JSON.stringify(data.tail) !== JSON.stringify(trailTail);
+    if (data.full) {
+      trailSegments = [[]];
+      trailPoints = 0;
+    }
+    appendTrail(data.points);
+    trailTail = data.tail;
+    trailSeq = data.seq;
+    trailZoom = zoom;
+    trailBounds = bounds;
+    if (!changed) return;
+    const segments = trailSegments.slice(0, -1);
+    segments.push(trailSegments[trailSegments.length - 1].concat(trailTail));
+    mapTrail.setLatLngs(segments.filter((segment) => segment.length > 1));
+  } catch (err) {
+    // Try again on the next update.
+  } finally {
+    trailBusy = false;
+  }
 }
 
 function updateMap(lat, lon, force, cogDeg, speedKnots) {
   if (!map) return;
+  refreshTrail(false);
   if (lat === null || lat === undefined || lon === null || lon === undefined) return;
   if (!mapFollow && !force) return;
   const pos = [lat, lon];
@@ -653,6 +861,42 @@ function updateSnrHistory(sats) {
   }
 }
 
+async function prefillSnrHistory(sats) {
+  // Seed the SNR history from the server so it survives a reload. Server
+  // times are receiver UTC; align its newest sample with now.
+  const filtered = filterSats(sats);
+  if (!filtered.length) return;
+  const ids = filtered.map((sat) => `snr:${satKey(sat)}`);
+  const seconds = snrHistoryWindowMs / 1000;
+  try {
+    const info = await fetch(apiUrl("/api/history"));
+    if (!info.ok) return;
+    const { end } = await info.json();
+    if (!Number.isFinite(end)) return;
+    const params = { series: ids.join(","), start: end - seconds, end, step: 1 };
+    const res = await fetch(apiUrl("/api/history", params));
+    if (!res.ok) return;
+    const body = await res.json();
+    const now = Date.now();
+    filtered.forEach((sat, i) => {
+      const entry = snrHistory.get(satKey(sat));
+      const series = body.series[ids[i]];
+      if (!entry || !series) return;
+      // Only fill in before the points collected live since connecting.
+      const first = entry.points.length ? entry.points[0].t : now;
+      const points = [];
+      body.t.forEach((t, j) => {
+        const snr = series.mean[j];
+        const at = now - (end - t) * 1000;
+        if (snr !== null && at < first) points.push({ t: at, snr, used: !!sat.used });
+      });
+      entry.points = points.concat(entry.points);
+    });
+  } catch (err) {
+    console.warn("SNR history unavailable", err);
+  }
+}
+
 function renderSnrKey(entries) {
   if (!snrKey) return;
   snrKey.innerHTML = "";
@@ -1510,6 +1754,7 @@ if (snrCanvas && snrPlot && snrTooltip) {
 }
 
 function renderState(state) {
+  if (!lastState) prefillSnrHistory(state.sats || []);
   lastState = state;
   updateHealth(state.health);
   updateFixBadge(state);
@@ -1524,12 +1769,228 @@ function renderState(state) {
   drawCog(state.fix?.cog_deg, state.fix?.speed_knots);
 }
 
+function renderHeartbeat(health) {
+  // Nothing changed upstream; refresh only the link health indicators.
+  if (!lastState) return;
+  lastState.health = health;
+  updateHealth(health);
+  updateFixBadge(lastState);
+  updateCards(lastState);
+}
+
+// Delta protocol: a keyframe carries the full state, deltas patch it in place.
+// Open the page with ?proto=json (full JSON states) or ?proto=bin (binary).
+const pageParams = new URLSearchParams(window.location.search);
+const wsProto = pageParams.get("proto") || "delta";
+// Receiver to show when the server hosts several (?source=NAME); the server
+// picks its first one otherwise.
+const sourceName = pageParams.get("source");
+// Topic subscription for widgets that need only part of the state, e.g.
+// ?topics=fix:2,health for a speed/heading kiosk (see GNSserver/wire.py).
+const wsTopics = pageParams.get("topics");
+let topicState = {};
+
+function apiUrl(path, params = {}) {
+  const query = new URLSearchParams(params);
+  if (sourceName) query.set("source", sourceName);
+  const text = query.toString();
+  return text ? `${path}?${text}` : path;
+}
+let wsSeq = null;
+let keyframePending = false;
+const wsSats = new Map();
+
+function mergePatch(target, patch) {
+  Object.entries(patch).forEach(([key, value]) => {
+    const current = target[key];
+    if (
+      value && typeof value === "object" && !Array.isArray(value) &&
+      current && typeof current === "object" && !Array.isArray(current)
+    ) {
+      mergePatch(current, value);
+    } else {
+      target[key] = value;
+    }
+  });
+}
+
+function applyKeyframe(msg) {
+  wsSeq = msg.seq;
+  keyframePending = false;
+  wsSats.clear();
+  (msg.state.sats || []).forEach((sat) => wsSats.set(sat.id, sat));
+  return msg.state;
+}
+
+function applyDelta(msg, ws) {
+  if (!lastState || wsSeq === null || msg.base !== wsSeq) {
+    // Missed an update; deltas are useless until the next keyframe.
+    if (!keyframePending && ws.readyState === WebSocket.OPEN) {
+      keyframePending = true;
+      ws.send(JSON.stringify({ type: "keyframe" }));
+    }
+    return null;
+  }
+  mergePatch(lastState, msg.patch || {});
+  const sats = msg.sats || { upd: [], del: [] };
+  if (sats.upd.length || sats.del.length) {
+    sats.del.forEach((id) => wsSats.delete(id));
+    sats.upd.forEach((sat) => {
+      const current = wsSats.get(sat.id);
+      if (sat.trail_add) {
+        // Incremental trail: append new points, drop the oldest.
+        const trail = (current?.trail || []).concat(sat.trail_add);
+        sat.trail = trail.slice(Math.max(0, trail.length - sat.trail_len));
+        delete sat.trail_add;
+        delete sat.trail_len;
+      }
+      if (current) Object.assign(current, sat);
+      else wsSats.set(sat.id, sat);
+    });
+    lastState.sats = Array.from(wsSats.values());
+  }
+  wsSeq = msg.seq;
+  return lastState;
+}
+
+// Binary protocol (?proto=bin); layout documented in GNSserver/wire.py.
+const BIN_GNSS = ["GNSS", "GPS", "GLONASS", "GALILEO", "BEIDOU", "SBAS", "QZSS"];
+const BIN_HEALTH = ["LIVE", "STALE", "DEAD"];
+const binText = new TextDecoder("ascii");
+
+function decodeBinaryFrame(buffer) {
+  const view = new DataView(buffer);
+  if (view.getUint8(0) !== 0x4e || view.getUint8(1) !== 0x53 || view.getUint8(2) !== 1) {
+    throw new Error("Unknown binary frame");
+  }
+  const kind = view.getUint8(3);
+  const health = {
+    age_ms: view.getUint32(8, true),
+    avg_dt_ms: view.getUint32(12, true),
+    status: BIN_HEALTH[view.getUint8(16)] || "DEAD",
+  };
+  if (kind === 2) return { type: "heartbeat", health };
+
+  let off = 17;
+  const str = (len) => {
+    const bytes = new Uint8Array(buffer, off, len);
+    off += len;
+    const end = bytes.indexOf(0);
+    const text = binText.decode(end < 0 ? bytes : bytes.subarray(0, end));
+    return text || null;
+  };
+  const i8 = () => {
+    const v = view.getInt8(off);
+    off += 1;
+    return v < 0 ? null : v;
+  };
+  const f64 = () => {
+    const v = view.getFloat64(off, true);
+    off += 8;
+    return Number.isNaN(v) ? null : v;
+  };
+  const f32 = () => {
+    const v = view.getFloat32(off, true);
+    off += 4;
+    return Number.isNaN(v) ? null : v;
+  };
+  const u16 = () => {
+    const v = view.getUint16(off, true);
+    off += 2;
+    return v === 0xffff ? null : v;
+  };
+  const az = () => {
+    const v = view.getUint16(off, true);
+    off += 2;
+    return v === 0xffff ? null : v / 10;
+  };
+  const el = () => {
+    const v = view.getInt16(off, true);
+    off += 2;
+    return v === -0x8000 ? null : v / 10;
+  };
+
+  const state = { t_utc: str(10), date: str(10), health };
+  state.fix = {
+    status: str(1),
+    mode: i8(),
+    quality: i8(),
+    lat: f64(),
+    lon: f64(),
+    alt_m: f32(),
+    speed_knots: f32(),
+    cog_deg: f32(),
+  };
+  state.dop = { pdop: f32(), hdop: f32(), vdop: f32() };
+  state.accuracy = {
+    lat_m: f32(),
+    lon_m: f32(),
+    alt_m: f32(),
+    major_m: f32(),
+    minor_m: f32(),
+    orient_deg: f32(),
+  };
+  state.counts = { used: u16(), in_view: u16() };
+  const count = view.getUint16(off, true);
+  off += 2;
+  state.sats = new Array(count);
+  for (let i = 0; i < count; i += 1) {
+    const gnssid = BIN_GNSS[view.getUint8(off)] || "GNSS";
+    const prn = view.getUint16(off + 1, true);
+    off += 3;
+    const sat = { id: `${gnssid}-${String(prn).padStart(2, "0")}`, gnssid, prn };
+    sat.az = az();
+    sat.el = el();
+    const snr = view.getUint8(off);
+    sat.snr = snr === 0xff ? null : snr;
+    sat.used = (view.getUint8(off + 1) & 1) === 1;
+    const points = view.getUint8(off + 2);
+    off += 3;
+    sat.trail = new Array(points);
+    for (let p = 0; p < points; p += 1) {
+      sat.trail[p] = [az(), el()];
+    }
+    state.sats[i] = sat;
+  }
+  return state;
+}
+
+function applyTopics(update) {
+  // Topic updates carry only the state fields of the topics that changed.
+  const { type, source, ...fields } = update;
+  topicState = { ...topicState, ...fields };
+  if (topicState.trails && topicState.sats) {
+    topicState.sats.forEach((sat) => {
+      sat.trail = topicState.trails[sat.id] || [];
+    });
+  }
+  return topicState;
+}
+
 function connectWs() {
-  const ws = new WebSocket(`ws://${window.location.host}/ws`);
+  const params = wsProto === "json" ? {} : { proto: wsProto };
+  if (wsTopics) params.topics = wsTopics;
+  const ws = new WebSocket(`ws://${window.location.host}${apiUrl("/ws", params)}`);
+  ws.binaryType = "arraybuffer";
+  wsSeq = null;
+  keyframePending = false;
+  topicState = {};
   ws.addEventListener("message", (event) => {
     try {
-      const data = JSON.parse(event.data);
-      renderState(data);
+      const data =
+        event.data instanceof ArrayBuffer ? decodeBinaryFrame(event.data) : JSON.parse(event.data);
+      if (data.type === "heartbeat") {
+        renderHeartbeat(data.health);
+      } else if (data.type === "key") {
+        renderState(applyKeyframe(data));
+      } else if (data.type === "delta") {
+        const state = applyDelta(data, ws);
+        if (state) renderState(state);
+      } else if (data.type === "update") {
+        renderState(applyTopics(data));
+      } else {
+        renderState(data);
+      }
     } catch (err) {
       console.error("Bad payload", err);
     }
@@ -1556,6 +2017,8 @@ initAltimeterControls();
 initTimeControls();
 initSpeedometerControls();
 initCogControls();
+initReplayControls();
+initSourcePicker();
 if (cardsMenuToggle && cardsMenu) {
   cardsMenuToggle.addEventListener("click", (event) => {
     event.stopPropagation();